@@ -1,21 +1,30 @@
 from pathlib import Path
+import functools
 import streamlit as st
-import openai
 from dotenv import load_dotenv, find_dotenv
 import os
-import tempfile
-import subprocess
 import shutil
-import json
 import html
 from typing import Any, Dict, List
 
+from pipeline import sob_demanda
+from pipeline.armazenamento import GerenciadorArmazenamento, iniciar_faxina_em_thread
+from pipeline.conteudo import gerar_conteudo_social as gerar_conteudo_com_cliente
+from pipeline.conteudo import gerar_variantes_conteudo as gerar_variantes_com_cliente
+from pipeline.limites import governador
+from pipeline.metricas import medir
+from pipeline.particionamento import transcrever_em_partes
+from pipeline.multiplataforma import PLATAFORMAS_VALIDAS, TAMANHOS_LEGENDA, gerar_multiplataforma, normalizar_alvos
+from pipeline.perfis_audio import MIME_POR_EXTENSAO, extrair_audio as extrair_audio_com_ffmpeg
+from pipeline.transcricao import BACKEND_PADRAO, BACKENDS_VALIDOS, criar_backends, escolher as escolher_backend
+from pipeline.variantes import VARIANTES_POR_CHAMADA, PoolVariantes
+from pipeline.vad import aparar_silencios
+
 # Carrega as variáveis de ambiente
 _ = load_dotenv(find_dotenv())
 
 PASTA_TEMP = Path(__file__).parent / 'temp'
 PASTA_TEMP.mkdir(exist_ok=True)
-ARQUIVO_AUDIO_TEMP = PASTA_TEMP / 'audio.mp3'
 
 # Inicializa o cliente OpenAI com a chave API
 api_key = os.getenv('OPENAI_API_KEY')
@@ -23,117 +32,40 @@ if not api_key:
     st.error("❌ Chave API da OpenAI não encontrada! Verifique o arquivo .env")
     st.stop()
 
-client = openai.OpenAI(api_key=api_key)
+# Cliente síncrono criado no primeiro uso, fora do caminho do primeiro carregamento da página
+client = sob_demanda.openai_sync
+backends_transcricao = criar_backends(client)
 
-def _parse_json_safe(s: str) -> Dict[str, Any]:
-    try:
-        return json.loads(s)
-    except Exception:
-        start = s.find('{')
-        end = s.rfind('}')
-        if start != -1 and end != -1 and end > start:
-            try:
-                return json.loads(s[start:end+1])
-            except Exception:
-                pass
-        return {}
+# Geração de conteúdo compartilhada com a API (pipeline/conteudo.py), com o cliente síncrono
+gerar_variantes_conteudo = functools.partial(gerar_variantes_com_cliente, client)
+gerar_conteudo_social = functools.partial(gerar_conteudo_com_cliente, client)
 
-def gerar_conteudo_social(
-    transcricao: str,
-    plataforma: str = "Instagram",
-    tom: str = "engajador",
-    tamanho_legenda: str = "média",
-    qtd_hashtags: int = 15,
-) -> Dict[str, Any]:
-    if not isinstance(transcricao, str):
-        raise ValueError("transcricao inválida")
-    texto = transcricao.strip()
-    if not texto:
-        raise ValueError("transcricao vazia")
-    limite = 8000
-    if len(texto) > limite:
-        texto = texto[:limite]
-    plataformas_validas: List[str] = [
-        "Instagram",
-        "TikTok",
-        "YouTube Shorts",
-        "LinkedIn",
-        "Facebook",
-        "X/Twitter",
-        "Threads",
-    ]
-    if plataforma not in plataformas_validas:
-        plataforma = "Instagram"
-    if tamanho_legenda not in ["curta", "média", "media", "longa"]:
-        tamanho_legenda = "média"
-    if tamanho_legenda == "media":
-        tamanho_legenda = "média"
-    if not isinstance(qtd_hashtags, int) or qtd_hashtags < 3:
-        qtd_hashtags = 10
-    if qtd_hashtags > 30:
-        qtd_hashtags = 30
-    instrucao = (
-        "Gere conteúdo para redes sociais em pt-BR com base na transcrição fornecida. "
-        "Adapte ao contexto da plataforma, mantendo alto potencial de engajamento e clareza. "
-        "Respeite o tamanho da legenda solicitado e a quantidade de hashtags. "
-        "Retorne exclusivamente um objeto JSON com as chaves: "
-        "titulo (string), legenda (string), hashtags (array de strings). "
-        "Regras: "
-        f"plataforma={plataforma}; tom={tom}; tamanho_legenda={tamanho_legenda}; qtd_hashtags={qtd_hashtags}. "
-        "Use hashtags relevantes, em minúsculas e sem acentos, com prefixo '#', sem espaços. "
-        "Evite clickbait enganoso; foque no benefício e na curiosidade legítima."
-    )
-    modelo = os.getenv("OPENAI_CONTENT_MODEL", "gpt-4o-mini")
-    resp = client.chat.completions.create(
-        model=modelo,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": instrucao},
-            {"role": "user", "content": f"Transcrição:\n{texto}"},
-        ],
-        temperature=0.7,
-        max_tokens=600,
+@st.cache_resource
+def _armazenamento() -> GerenciadorArmazenamento:
+    # Um por processo: as áreas abertas (e suas reservas) valem entre sessões e reexecuções
+    gerenciador = GerenciadorArmazenamento(
+        PASTA_TEMP / 'trabalho', contabilizar=(PASTA_TEMP / 'jobs', PASTA_TEMP / 'uploads'), legado=(PASTA_TEMP,)
     )
-    conteudo = (
-        resp.choices[0].message.content
-        if getattr(resp, "choices", None)
-        and getattr(resp.choices[0], "message", None)
-        and resp.choices[0].message.content
-        else ""
+    iniciar_faxina_em_thread(gerenciador)
+    return gerenciador
+
+@st.cache_resource
+def _pool_variantes() -> PoolVariantes:
+    # Um pool por processo, compartilhado entre sessões e reexecuções do script
+    return PoolVariantes()
+
+def conteudo_do_pool(
+    transcricao: str, plataforma: str, tom: str, tamanho_legenda: str, qtd_hashtags: int
+) -> Dict[str, Any]:
+    """Próxima variante não usada para esses ajustes; gera um lote só quando o pool acaba."""
+    pool = _pool_variantes()
+    chave = pool.chave(transcricao, plataforma, tom, tamanho_legenda, qtd_hashtags)
+    return pool.obter(
+        chave,
+        lambda: gerar_variantes_conteudo(
+            transcricao, plataforma, tom, tamanho_legenda, qtd_hashtags, n=VARIANTES_POR_CHAMADA
+        ),
     )
-    data = _parse_json_safe(conteudo)
-    titulo = str(data.get("titulo", "")).strip()
-    legenda = str(data.get("legenda", "")).strip()
-    hashtags_raw = data.get("hashtags", [])
-    hashtags_list: List[str] = []
-    if isinstance(hashtags_raw, str):
-        partes = [p.strip() for p in hashtags_raw.replace(",", " ").split()]
-        hashtags_list = [p if p.startswith("#") else f"#{p}" for p in partes if p]
-    elif isinstance(hashtags_raw, list):
-        limpos: List[str] = []
-        for h in hashtags_raw:
-            if not isinstance(h, str):
-                continue
-            h2 = h.strip().replace(" ", "")
-            if not h2:
-                continue
-            if not h2.startswith("#"):
-                h2 = f"#{h2}"
-            limpos.append(h2)
-        hashtags_list = limpos
-    vistos = set()
-    unicos: List[str] = []
-    for h in hashtags_list:
-        k = h.lower()
-        if k not in vistos:
-            vistos.add(k)
-            unicos.append(h)
-    hashtags_final = unicos[:qtd_hashtags]
-    if not titulo:
-        titulo = "Título sugerido"
-    if not legenda:
-        legenda = "Legenda sugerida."
-    return {"titulo": titulo, "legenda": legenda, "hashtags": hashtags_final}
 
 def _conteudo_para_texto(conteudo: Dict[str, Any]) -> str:
     titulo = str(conteudo.get("titulo", "")).strip()
@@ -198,52 +130,157 @@ def render_copy_download(conteudo: Dict[str, Any], key_suffix: str, file_name: s
     )
 
 def transcreve_audio(arquivo_audio, prompt):
-    """Transcreve áudio usando a API da OpenAI"""
-    transcricao = client.audio.transcriptions.create(
-        model='whisper-1',
-        language='pt',
-        response_format='text',
-        file=arquivo_audio,
-        prompt=prompt,
-    )
-    return transcricao
+    """Transcreve áudio com o backend escolhido na barra lateral (API da OpenAI ou motor local)"""
+    backend = escolher_backend(backends_transcricao, st.session_state.get('backend_transcricao'))
+    return backend.transcrever(arquivo_audio, prompt)
+
+def salvar_upload_temporario(arquivo, sufixo: str, pasta: Path) -> str:
+    """Grava o upload na área de trabalho em blocos de 1 MB, sem cópias do arquivo inteiro na memória."""
+    arquivo.seek(0)
+    caminho = Path(pasta) / f"upload{sufixo}"
+    with open(caminho, 'wb') as destino:
+        shutil.copyfileobj(arquivo, destino, 1024 * 1024)
+    return str(caminho)
 
-def extrair_audio_com_ffmpeg(caminho_video, caminho_audio):
-    """Extrai áudio de vídeo usando FFmpeg"""
+def transcrever_sem_silencios(caminho_audio, prompt, tempos=None):
+    """Remove silêncios longos (VAD local) e transcreve; retorna (transcrição, estatísticas do VAD)"""
+    base = os.path.splitext(caminho_audio)[0] + '_vad'
     try:
-        # Verifica se FFmpeg está disponível
-        if not shutil.which('ffmpeg'):
-            return False, "FFmpeg não encontrado no sistema"
-        
-        # Comando FFmpeg para extrair áudio
-        comando = [
-            'ffmpeg',
-            '-i', caminho_video,
-            '-vn',  # Sem vídeo
-            '-acodec', 'mp3',  # Codec de áudio MP3
-            '-ab', '192k',  # Bitrate
-            '-ar', '44100',  # Sample rate
-            '-y',  # Sobrescrever arquivo se existir
-            caminho_audio
-        ]
-        
-        # Executa o comando
-        resultado = subprocess.run(
-            comando, 
-            capture_output=True, 
-            text=True,
-            timeout=1800  # Timeout de 30 minutos para arquivos grandes
+        with medir("vad", tempos):
+            vad = aparar_silencios(caminho_audio, base)
+    except RuntimeError as e:
+        vad = {"caminho": caminho_audio, "aplicado": False, "erro": str(e)}
+    caminho_vad = vad.pop("caminho")
+    try:
+        with medir("transcricao", tempos):
+            transcricao = transcrever_em_partes(caminho_vad, prompt, transcreve_audio)
+    finally:
+        if caminho_vad != caminho_audio:
+            try:
+                os.unlink(caminho_vad)
+            except OSError:
+                pass
+    return transcricao, vad
+
+def _exibir_vad(vad: Dict[str, Any]) -> None:
+    if vad and vad.get("aplicado"):
+        st.caption(
+            f"🔇 Silêncios removidos: {vad['segundos_removidos']:.0f}s "
+            f"({vad['fracao_removida'] * 100:.0f}% do áudio) em {vad['tempo_vad_s']:.1f}s de processamento."
         )
-        
-        if resultado.returncode == 0:
-            return True, "Áudio extraído com sucesso"
-        else:
-            return False, f"Erro FFmpeg: {resultado.stderr}"
-            
-    except subprocess.TimeoutExpired:
-        return False, "Timeout: Vídeo muito longo para processar (limite: 30 minutos)"
-    except Exception as e:
-        return False, f"Erro inesperado: {str(e)}"
+
+def _exibir_debug(memo: Dict[str, Any]) -> None:
+    """Painel opcional (barra lateral) com o tempo de cada etapa desta sessão."""
+    if not st.session_state.get('debug_tempos'):
+        return
+    with st.expander("🔧 Debug: tempos por etapa"):
+        tempos = memo.get('tempos') or {}
+        if tempos:
+            st.table({"etapa": list(tempos), "segundos": list(tempos.values())})
+        if memo.get('vad'):
+            st.json(memo['vad'])
+
+def _memo_upload(aba: str, arquivo, prompt: str) -> Dict[str, Any]:
+    """Memo da sessão para o upload atual da aba.
+
+    Guarda o caminho do áudio extraído, a transcrição e o conteúdo gerado,
+    identificados pelo arquivo enviado e pelo prompt. Reruns causados pelos
+    widgets de personalização reaproveitam tudo; trocar o arquivo ou o prompt
+    descarta o memo anterior (e fecha sua área de trabalho).
+    """
+    identidade = getattr(arquivo, 'file_id', None) or f"{arquivo.name}:{arquivo.size}"
+    chave = f"{identidade}|{prompt}|{st.session_state.get('backend_transcricao', '')}"
+    chave_sessao = f"memo_{aba}"
+    memo = st.session_state.get(chave_sessao)
+    if memo is None or memo.get('chave') != chave:
+        if memo is not None:
+            _limpar_memo(memo)
+        memo = {
+            'chave': chave,
+            'area': None,
+            'audio_path': None,
+            'transcricao': None,
+            'vad': None,
+            'conteudo': None,
+            'conteudo_personalizado': None,
+            'multiplataforma': None,
+            'tempos': {},
+        }
+        st.session_state[chave_sessao] = memo
+    return memo
+
+def _limpar_memo(memo: Dict[str, Any]) -> None:
+    area = memo.get('area')
+    if area is not None:
+        area.fechar()
+
+def _exibir_conteudo(conteudo: Dict[str, Any], titulo_secao: str) -> None:
+    st.write(f"### {titulo_secao}")
+    st.write(f"Título: {conteudo.get('titulo', '')}")
+    st.write("Legenda:")
+    st.write(conteudo.get('legenda', ''))
+    hashtags = conteudo.get('hashtags', [])
+    if isinstance(hashtags, list) and hashtags:
+        st.write("Hashtags:")
+        st.write(' '.join(hashtags))
+    uso = conteudo.get('uso_tokens')
+    if uso:
+        st.caption(f"Tokens usados: {uso['total_tokens']} em {uso['chamadas']} chamada(s) à API.")
+
+def _exibir_resultado(memo: Dict[str, Any], aba: str, nome_arquivo: str) -> None:
+    """Exibe transcrição e conteúdo do memo; só chama a API para o que ainda não existe."""
+    transcricao = memo['transcricao']
+    st.success("✅ Transcrição concluída!")
+    _exibir_vad(memo.get('vad'))
+    st.write("### Resultado:")
+    st.write(transcricao)
+    if memo['conteudo'] is None:
+        with st.spinner('🧠 Gerando título, legenda e hashtags...'):
+            try:
+                with medir("geracao", memo['tempos']):
+                    memo['conteudo'] = conteudo_do_pool(transcricao, "Instagram", "engajador", "média", 15)
+            except Exception as e:
+                st.warning(f"Não foi possível gerar conteúdo social: {str(e)}")
+    if memo['conteudo'] is not None:
+        _exibir_conteudo(memo['conteudo'], "Conteúdo para redes sociais")
+        render_copy_download(memo['conteudo'], f"{aba}_init", f"conteudo_{nome_arquivo}.txt")
+
+    st.write("#### Personalizar conteúdo")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        plataforma_sel = st.selectbox("Plataforma", PLATAFORMAS_VALIDAS, index=0, key=f'plataforma_{aba}')
+    with col2:
+        tom_sel = st.selectbox("Tom", ["engajador", "informativo", "profissional", "humorístico", "persuasivo"], index=0, key=f'tom_{aba}')
+    with col3:
+        tamanho_sel = st.selectbox("Tamanho da legenda", TAMANHOS_LEGENDA, index=1, key=f'tamanho_legenda_{aba}')
+    with col4:
+        qtd_sel = st.slider("Qtd hashtags", 5, 30, 15, key=f'qtd_hashtags_{aba}')
+    if st.button("Regenerar", key=f'regen_{aba}'):
+        with st.spinner('🧠 Regenerando...'):
+            try:
+                memo['conteudo_personalizado'] = conteudo_do_pool(transcricao, plataforma_sel, tom_sel, tamanho_sel, int(qtd_sel))
+            except Exception as e:
+                st.warning(f"Não foi possível regenerar conteúdo social: {str(e)}")
+    if memo['conteudo_personalizado'] is not None:
+        _exibir_conteudo(memo['conteudo_personalizado'], "Conteúdo para redes sociais (personalizado)")
+        render_copy_download(memo['conteudo_personalizado'], f"{aba}_regen", f"conteudo_{nome_arquivo}_personalizado.txt")
+
+    st.write("#### Várias plataformas de uma vez")
+    alvos_sel = st.multiselect("Plataformas", PLATAFORMAS_VALIDAS, default=PLATAFORMAS_VALIDAS, key=f'alvos_{aba}')
+    if st.button("Gerar para todas", key=f'multi_{aba}') and alvos_sel:
+        with st.spinner('🧠 Gerando conteúdo para as plataformas selecionadas...'):
+            alvos = normalizar_alvos(alvos_sel, None, tom_sel, tamanho_sel, int(qtd_sel))
+            memo['multiplataforma'] = gerar_multiplataforma(client, transcricao, alvos, gerar_conteudo_social)
+    if memo.get('multiplataforma') is not None:
+        for plataforma, conteudo in memo['multiplataforma']['conteudos'].items():
+            if 'erro' in conteudo:
+                st.warning(f"{plataforma}: não foi possível gerar conteúdo ({conteudo['erro']})")
+                continue
+            _exibir_conteudo(conteudo, plataforma)
+            sufixo = plataforma.replace('/', '_').replace(' ', '_').lower()
+            render_copy_download(conteudo, f"{aba}_multi_{sufixo}", f"conteudo_{nome_arquivo}_{sufixo}.txt")
+        uso = memo['multiplataforma']['uso_tokens']
+        st.caption(f"Tokens usados: {uso['total_tokens']} em {uso['chamadas']} chamada(s) à API.")
 
 def transcreve_tab_video():
     """Aba para transcrição de vídeos"""
@@ -253,125 +290,72 @@ def transcreve_tab_video():
     arquivo_video = st.file_uploader('Selecione um arquivo de vídeo', type=['mp4', 'mov', 'avi', 'mkv', 'webm'])
     
     if arquivo_video is not None:
-        # Verifica tamanho do arquivo (limite de 25MB - Streamlit Cloud)
-        tamanho_mb = len(arquivo_video.getvalue()) / (1024 * 1024)
+        tamanho_mb = arquivo_video.size / (1024 * 1024)
         if tamanho_mb > 25:
-            st.error(f"❌ Arquivo muito grande ({tamanho_mb:.1f}MB). Limite: 25MB")
-            
-            # Mostra soluções alternativas para arquivos > 25MB
-            st.markdown("### 🛠️ Soluções para arquivos grandes (acima de 25MB):")
-            
-            st.markdown("""
-            👉 **Opção 1: Comprimir o vídeo drasticamente ou usar apenas o áudio.**
-            
-            👉 **Opção 2: Extrair o áudio e fazer upload na aba 'Transcrever Áudio'.**
-            
-            👉 **Opção 3: Dividir o vídeo em clipes menores (cada um com menos de 25MB).**
-            
-            Devido a uma limitação da plataforma Streamlit Cloud, o tamanho máximo de upload é de 25MB.
-            """)
-            
-            return
+            st.info("ℹ️ Arquivo acima de 25MB: o áudio será dividido em partes e transcrito em paralelo.")
         
-        # Aviso para arquivos grandes (entre 10MB e 25MB)
+        # Aviso para arquivos grandes
         if tamanho_mb > 10:
             st.warning(f"⚠️ Arquivo grande ({tamanho_mb:.1f}MB). O processamento pode demorar alguns minutos.")
         
-        with st.spinner('🎬 Processando vídeo e extraindo áudio...'):
-            try:
-                # Cria arquivos temporários
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.mp4') as temp_video:
-                    temp_video.write(arquivo_video.getvalue())
-                    temp_video_path = temp_video.name
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as temp_audio:
-                    temp_audio_path = temp_audio.name
-                
-                # Extrai áudio usando FFmpeg
-                sucesso, mensagem = extrair_audio_com_ffmpeg(temp_video_path, temp_audio_path)
-                
-                if sucesso:
+        memo = _memo_upload('video', arquivo_video, prompt_input)
+        if memo['transcricao'] is None:
+            with st.spinner('🎬 Processando vídeo e extraindo áudio...'):
+                # A área guarda o vídeo e o áudio extraído; o áudio fica para download até o memo ser descartado
+                area = None
+                try:
+                    area = _armazenamento().abrir(arquivo_video.size, memo['tempos'])
+                    with medir("upload", memo['tempos']):
+                        temp_video_path = salvar_upload_temporario(
+                            arquivo_video, Path(arquivo_video.name).suffix or '.mp4', area.pasta
+                        )
+                    
+                    # Extrai áudio usando FFmpeg (a extensão depende do perfil/codec)
+                    with medir("extracao", memo['tempos']):
+                        sucesso, mensagem, temp_audio_path = extrair_audio_com_ffmpeg(
+                            temp_video_path, str(area.pasta / 'audio')
+                        )
+                    try:
+                        os.unlink(temp_video_path)
+                    except OSError:
+                        pass
+                    
+                    if not sucesso:
+                        st.error(f"❌ Erro ao extrair áudio: {mensagem}")
+                        st.info("💡 Tente converter o vídeo online e usar a aba de áudio:")
+                        st.markdown("""
+                        - [Online Audio Converter](https://online-audio-converter.com/)
+                        - [CloudConvert](https://cloudconvert.com/mp4-to-mp3)
+                        """)
+                        return
                     st.success("✅ Áudio extraído com sucesso!")
                     
                     # Transcreve o áudio
                     with st.spinner('🎵 Transcrevendo áudio...'):
-                        with open(temp_audio_path, 'rb') as audio_file:
-                            transcricao = transcreve_audio(audio_file, prompt_input)
-                        
-                        st.success("✅ Transcrição concluída!")
-                        st.write("### Resultado:")
-                        st.write(transcricao)
-                        with st.spinner('🧠 Gerando título, legenda e hashtags...'):
-                            try:
-                                conteudo = gerar_conteudo_social(str(transcricao))
-                                st.write("### Conteúdo para redes sociais")
-                                st.write(f"Título: {conteudo.get('titulo', '')}")
-                                st.write("Legenda:")
-                                st.write(conteudo.get('legenda', ''))
-                                hashtags = conteudo.get('hashtags', [])
-                                if isinstance(hashtags, list) and hashtags:
-                                    st.write("Hashtags:")
-                                    st.write(' '.join(hashtags))
-                            except Exception as e:
-                                st.warning(f"Não foi possível gerar conteúdo social: {str(e)}")
-                        if 'conteudo' in locals():
-                            fname = f"conteudo_{arquivo_video.name}.txt" if hasattr(arquivo_video, 'name') else "conteudo_video.txt"
-                            render_copy_download(conteudo, "video_init", fname)
-                        
-                        st.write("#### Personalizar conteúdo")
-                        colv1, colv2, colv3, colv4 = st.columns(4)
-                        plataformas_v = ["Instagram", "TikTok", "YouTube Shorts", "LinkedIn", "Facebook", "X/Twitter", "Threads"]
-                        with colv1:
-                            plataforma_sel_v = st.selectbox("Plataforma", plataformas_v, index=0, key='plataforma_video')
-                        with colv2:
-                            tom_sel_v = st.selectbox("Tom", ["engajador", "informativo", "profissional", "humorístico", "persuasivo"], index=0, key='tom_video')
-                        with colv3:
-                            tamanho_sel_v = st.selectbox("Tamanho da legenda", ["curta", "média", "longa"], index=1, key='tamanho_legenda_video')
-                        with colv4:
-                            qtd_sel_v = st.slider("Qtd hashtags", 5, 30, 15, key='qtd_hashtags_video')
-                        if st.button("Regenerar", key='regen_video'):
-                            with st.spinner('🧠 Regenerando...'):
-                                try:
-                                    conteudo_v = gerar_conteudo_social(str(transcricao), plataforma_sel_v, tom_sel_v, tamanho_sel_v, int(qtd_sel_v))
-                                    st.write("### Conteúdo para redes sociais (personalizado)")
-                                    st.write(f"Título: {conteudo_v.get('titulo', '')}")
-                                    st.write("Legenda:")
-                                    st.write(conteudo_v.get('legenda', ''))
-                                    hashtags_v = conteudo_v.get('hashtags', [])
-                                    if isinstance(hashtags_v, list) and hashtags_v:
-                                        st.write("Hashtags:")
-                                        st.write(' '.join(hashtags_v))
-                                except Exception as e:
-                                    st.warning(f"Não foi possível regenerar conteúdo social: {str(e)}")
-                            if 'conteudo_v' in locals():
-                                fname_v = f"conteudo_{arquivo_video.name}_personalizado.txt" if hasattr(arquivo_video, 'name') else "conteudo_video_personalizado.txt"
-                                render_copy_download(conteudo_v, "video_regen", fname_v)
+                        transcricao, memo['vad'] = transcrever_sem_silencios(temp_audio_path, prompt_input, memo['tempos'])
+                        memo['transcricao'] = str(transcricao)
+                    memo['area'], memo['audio_path'] = area, temp_audio_path
+                except Exception as e:
+                    st.error(f"❌ Erro ao processar vídeo: {str(e)}")
+                    return
+                finally:
+                    # Qualquer saída antes de concluir (erro, FFmpeg falhou, rerun interrompido) limpa a área
+                    if area is not None and memo['area'] is not area:
+                        area.fechar()
+        
+        _exibir_resultado(memo, 'video', arquivo_video.name)
+        _exibir_debug(memo)
 
-                        # Opção para download do áudio extraído
-                        with open(temp_audio_path, 'rb') as audio_file:
-                            st.download_button(
-                                label="📥 Download do áudio extraído",
-                                data=audio_file.read(),
-                                file_name=f"audio_{arquivo_video.name}.mp3",
-                                mime="audio/mpeg"
-                            )
-                else:
-                    st.error(f"❌ Erro ao extrair áudio: {mensagem}")
-                    st.info("💡 Tente converter o vídeo online e usar a aba de áudio:")
-                    st.markdown("""
-                    - [Online Audio Converter](https://online-audio-converter.com/)
-                    - [CloudConvert](https://cloudconvert.com/mp4-to-mp3)
-                    """)
-                
-                # Limpa arquivos temporários
-                try:
-                    os.unlink(temp_video_path)
-                    os.unlink(temp_audio_path)
-                except:
-                    pass
-                    
-            except Exception as e:
-                st.error(f"❌ Erro ao processar vídeo: {str(e)}")
+        # Opção para download do áudio extraído
+        if memo['audio_path'] and os.path.exists(memo['audio_path']):
+            extensao = os.path.splitext(memo['audio_path'])[1]
+            # Lido do disco só quando o botão é clicado, não a cada rerun da página
+            st.download_button(
+                label="📥 Download do áudio extraído",
+                data=Path(memo['audio_path']).read_bytes,
+                file_name=f"audio_{arquivo_video.name}{extensao}",
+                mime=MIME_POR_EXTENSAO.get(extensao, "application/octet-stream")
+            )
 
 # TRANSCREVE AUDIO =====================================
 def transcreve_tab_audio():
@@ -382,69 +366,30 @@ def transcreve_tab_audio():
     arquivo_audio = st.file_uploader('Selecione um arquivo de áudio', type=['mp3', 'wav', 'm4a', 'ogg'])
     
     if arquivo_audio is not None:
-        # Verifica tamanho do arquivo (limite de 25MB - Streamlit Cloud)
-        tamanho_mb = len(arquivo_audio.getvalue()) / (1024 * 1024)
+        tamanho_mb = arquivo_audio.size / (1024 * 1024)
         if tamanho_mb > 25:
-            st.error(f"❌ Arquivo muito grande ({tamanho_mb:.1f}MB). Limite: 25MB")
-            st.info("💡 Comprima o áudio ou divida em partes menores. Arquivos MP3 geralmente são menores que vídeos.")
-            return
+            st.info("ℹ️ Arquivo acima de 25MB: o áudio será dividido em partes e transcrito em paralelo.")
         
-        # Aviso para arquivos grandes (entre 10MB e 25MB)
+        # Aviso para arquivos grandes
         if tamanho_mb > 10:
             st.warning(f"⚠️ Arquivo grande ({tamanho_mb:.1f}MB). O processamento pode demorar alguns minutos.")
         
-        with st.spinner('🎵 Transcrevendo áudio...'):
-            try:
-                transcricao = transcreve_audio(arquivo_audio, prompt_input)
-                st.success("✅ Transcrição concluída!")
-                st.write("### Resultado:")
-                st.write(transcricao)
-                with st.spinner('🧠 Gerando título, legenda e hashtags...'):
-                    try:
-                        conteudo = gerar_conteudo_social(str(transcricao))
-                        st.write("### Conteúdo para redes sociais")
-                        st.write(f"Título: {conteudo.get('titulo', '')}")
-                        st.write("Legenda:")
-                        st.write(conteudo.get('legenda', ''))
-                        hashtags = conteudo.get('hashtags', [])
-                        if isinstance(hashtags, list) and hashtags:
-                            st.write("Hashtags:")
-                            st.write(' '.join(hashtags))
-                    except Exception as e:
-                        st.warning(f"Não foi possível gerar conteúdo social: {str(e)}")
-                if 'conteudo' in locals():
-                    fname_a = f"conteudo_{arquivo_audio.name}.txt" if hasattr(arquivo_audio, 'name') else "conteudo_audio.txt"
-                    render_copy_download(conteudo, "audio_init", fname_a)
-                st.write("#### Personalizar conteúdo")
-                col1, col2, col3, col4 = st.columns(4)
-                plataformas = ["Instagram", "TikTok", "YouTube Shorts", "LinkedIn", "Facebook", "X/Twitter", "Threads"]
-                with col1:
-                    plataforma_sel = st.selectbox("Plataforma", plataformas, index=0, key='plataforma_audio')
-                with col2:
-                    tom_sel = st.selectbox("Tom", ["engajador", "informativo", "profissional", "humorístico", "persuasivo"], index=0, key='tom_audio')
-                with col3:
-                    tamanho_sel = st.selectbox("Tamanho da legenda", ["curta", "média", "longa"], index=1, key='tamanho_legenda_audio')
-                with col4:
-                    qtd_sel = st.slider("Qtd hashtags", 5, 30, 15, key='qtd_hashtags_audio')
-                if st.button("Regenerar", key='regen_audio'):
-                    with st.spinner('🧠 Regenerando...'):
-                        try:
-                            conteudo2 = gerar_conteudo_social(str(transcricao), plataforma_sel, tom_sel, tamanho_sel, int(qtd_sel))
-                            st.write("### Conteúdo para redes sociais (personalizado)")
-                            st.write(f"Título: {conteudo2.get('titulo', '')}")
-                            st.write("Legenda:")
-                            st.write(conteudo2.get('legenda', ''))
-                            hashtags2 = conteudo2.get('hashtags', [])
-                            if isinstance(hashtags2, list) and hashtags2:
-                                st.write("Hashtags:")
-                                st.write(' '.join(hashtags2))
-                        except Exception as e:
-                            st.warning(f"Não foi possível regenerar conteúdo social: {str(e)}")
-                    if 'conteudo2' in locals():
-                        fname_a2 = f"conteudo_{arquivo_audio.name}_personalizado.txt" if hasattr(arquivo_audio, 'name') else "conteudo_audio_personalizado.txt"
-                        render_copy_download(conteudo2, "audio_regen", fname_a2)
-            except Exception as e:
-                st.error(f"❌ Erro ao transcrever áudio: {str(e)}")
+        memo = _memo_upload('audio', arquivo_audio, prompt_input)
+        if memo['transcricao'] is None:
+            with st.spinner('🎵 Transcrevendo áudio...'):
+                try:
+                    sufixo = Path(arquivo_audio.name).suffix or '.mp3'
+                    with _armazenamento().area(arquivo_audio.size, memo['tempos']) as area:
+                        with medir("upload", memo['tempos']):
+                            temp_audio_path = salvar_upload_temporario(arquivo_audio, sufixo, area.pasta)
+                        transcricao, memo['vad'] = transcrever_sem_silencios(temp_audio_path, prompt_input, memo['tempos'])
+                        memo['transcricao'] = str(transcricao)
+                except Exception as e:
+                    st.error(f"❌ Erro ao transcrever áudio: {str(e)}")
+                    return
+        
+        _exibir_resultado(memo, 'audio', arquivo_audio.name)
+        _exibir_debug(memo)
 
 # MAIN =====================================
 def main():
@@ -457,6 +402,16 @@ def main():
     st.header('Bem-vindo ao Ai Infinitus Transcript 🎙️', divider=True)
     st.markdown('#### Transcreva áudio de vídeos e arquivos de áudio usando IA')
     
+    # Antes das abas: o backend faz parte da chave do memo de cada upload
+    st.sidebar.selectbox(
+        "Transcrição",
+        BACKENDS_VALIDOS,
+        index=BACKENDS_VALIDOS.index(BACKEND_PADRAO)
+        if BACKEND_PADRAO in BACKENDS_VALIDOS else 0,
+        format_func=lambda nome: {"openai": "API da OpenAI", "local": "Local (CPU, faster-whisper)"}[nome],
+        key='backend_transcricao',
+    )
+    
     # Removemos a aba de microfone para evitar problemas com audioop/pyaudioop
     tab_video, tab_audio = st.tabs(['📹 Vídeo', '🎵 Áudio'])
     
@@ -465,5 +420,9 @@ def main():
     with tab_audio:
         transcreve_tab_audio()
 
+    st.sidebar.checkbox("Mostrar tempos por etapa (debug)", key='debug_tempos')
+    with st.sidebar.expander("Fila da OpenAI"):
+        st.json(governador.estatisticas())
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,332 @@
+"""Teste de carga de `/transcrever` com a OpenAI falsa local (sem gastar créditos).
+
+Gera mídias sintéticas, sobe a OpenAI falsa e a aplicação (`uvicorn main:app`
+apontada para ela via `OPENAI_BASE_URL`) e dispara N requisições com a
+concorrência pedida. Reporta requisições/s, p50/p95/p99 da latência total e
+de cada etapa (a partir de `tempos` das respostas), pico de RSS do servidor
+(com os FFmpeg filhos) e pico de uso de disco em `temp/`. O resultado vai
+para `benchmarks/resultados/` em JSON; `--comparar` mostra a diferença para
+uma execução anterior.
+
+Uso:
+    python -m benchmarks.carga --requisicoes 40 --concorrencia 8 --formatos mp4,mp3 --duracao 60
+    python -m benchmarks.carga --taxa-429 0.1 --comparar benchmarks/resultados/carga_20261018_120000.json
+    python -m benchmarks.carga --url http://localhost:8000 --pid 1234   # servidor já em execução
+    ADMISSAO_EXTRACOES=2 ADMISSAO_FILA_EXTRACAO=2 python -m benchmarks.carga --concorrencia 16  # recusas 503
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks import fake_openai
+from benchmarks.midia_sintetica import gerar_conjunto
+
+RAIZ = Path(__file__).resolve().parent.parent
+PASTA_RESULTADOS = Path(__file__).resolve().parent / "resultados"
+TIPOS_MIDIA = {
+    ".mp4": "video/mp4", ".mkv": "video/x-matroska", ".mov": "video/quicktime", ".webm": "video/webm",
+    ".mp3": "audio/mpeg", ".m4a": "audio/mp4", ".ogg": "audio/ogg", ".wav": "audio/wav",
+}
+
+
+def percentis(valores: List[float]) -> Dict[str, float]:
+    """p50/p95/p99 (nearest-rank) e média, em segundos."""
+    if not valores:
+        return {}
+    ordenados = sorted(valores)
+
+    def _p(q: float) -> float:
+        return round(ordenados[min(len(ordenados) - 1, max(0, int(round(q * len(ordenados) + 0.5)) - 1))], 4)
+
+    return {"p50": _p(0.50), "p95": _p(0.95), "p99": _p(0.99),
+            "media": round(sum(ordenados) / len(ordenados), 4), "amostras": len(ordenados)}
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _filhos(pid: int) -> List[int]:
+    """PIDs descendentes de `pid` (via /proc; vazio fora do Linux)."""
+    pais: Dict[int, List[int]] = {}
+    for entrada in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            campos = entrada.read_text().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        pais.setdefault(int(campos[1]), []).append(int(entrada.parent.name))
+    descendentes, pendentes = [], [pid]
+    while pendentes:
+        for filho in pais.get(pendentes.pop(), []):
+            descendentes.append(filho)
+            pendentes.append(filho)
+    return descendentes
+
+
+def _rss_bytes(pid: int) -> int:
+    try:
+        for linha in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if linha.startswith("VmRSS:"):
+                return int(linha.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _tamanho_pasta(pasta: Path) -> int:
+    total = 0
+    for raiz, _, arquivos in os.walk(pasta):
+        for nome in arquivos:
+            try:
+                total += os.path.getsize(os.path.join(raiz, nome))
+            except OSError:
+                pass  # arquivo temporário removido durante a varredura
+    return total
+
+
+class Monitor:
+    """Amostra periodicamente o RSS do servidor (e filhos) e o tamanho de `temp/`."""
+
+    def __init__(self, pid: Optional[int], pasta: Path, intervalo: float = 0.1) -> None:
+        self.pid = pid
+        self.pasta = pasta
+        self.intervalo = intervalo
+        self.pico_rss = 0
+        self.pico_disco = 0
+        self.disco_inicial = _tamanho_pasta(pasta)
+        self._parar = threading.Event()
+        self._thread = threading.Thread(target=self._rodar, daemon=True)
+
+    def _rodar(self) -> None:
+        while not self._parar.is_set():
+            if self.pid:
+                rss = sum(_rss_bytes(p) for p in [self.pid, *_filhos(self.pid)])
+                self.pico_rss = max(self.pico_rss, rss)
+            self.pico_disco = max(self.pico_disco, _tamanho_pasta(self.pasta) - self.disco_inicial)
+            self._parar.wait(self.intervalo)
+
+    def __enter__(self) -> "Monitor":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._parar.set()
+        self._thread.join()
+
+    def resultado(self) -> Dict[str, Any]:
+        return {
+            "pico_rss_mb": round(self.pico_rss / 1024 / 1024, 1) if self.pid else None,
+            "pico_disco_temp_mb": round(self.pico_disco / 1024 / 1024, 1),
+        }
+
+
+def iniciar_openai_falsa(config: fake_openai.Config, porta: int):
+    import uvicorn
+
+    servidor = uvicorn.Server(uvicorn.Config(
+        fake_openai.criar_app(config), host="127.0.0.1", port=porta, log_level="warning"
+    ))
+    thread = threading.Thread(target=servidor.run, daemon=True)
+    thread.start()
+    while not servidor.started:
+        time.sleep(0.05)
+    return servidor, thread
+
+
+def iniciar_aplicacao(porta: int, base_url_openai: str, workers: int) -> subprocess.Popen:
+    env = {**os.environ, "OPENAI_BASE_URL": base_url_openai, "OPENAI_API_KEY": "benchmark"}
+    processo = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(porta),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=RAIZ, env=env,
+    )
+    limite = time.monotonic() + 30
+    while time.monotonic() < limite:
+        if processo.poll() is not None:
+            raise RuntimeError("A aplicação encerrou durante a inicialização.")
+        try:
+            if httpx.get(f"http://127.0.0.1:{porta}/", timeout=1).status_code == 200:
+                return processo
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    processo.terminate()
+    raise RuntimeError("A aplicação não respondeu em 30 s.")
+
+
+async def disparar(
+    url: str, endpoint: str, arquivos: List[Dict[str, Any]], requisicoes: int, concorrencia: int, com_cache: bool
+) -> Dict[str, Any]:
+    semaforo = asyncio.Semaphore(concorrencia)
+    latencias: List[float] = []
+    # 503 do controle de admissão: o que importa é a recusa ser rápida
+    recusas: List[float] = []
+    etapas: Dict[str, List[float]] = {}
+    erros: Dict[str, int] = {}
+    cache_hits = 0
+
+    async def _uma(http: httpx.AsyncClient, indice: int) -> None:
+        nonlocal cache_hits
+        arquivo = arquivos[indice % len(arquivos)]
+        caminho = Path(arquivo["caminho"])
+        # Prompt distinto por requisição evita acertos no cache de transcrições
+        dados = {"prompt": "" if com_cache else f"carga {indice}"}
+        async with semaforo:
+            inicio = time.perf_counter()
+            try:
+                with open(caminho, "rb") as f:
+                    resposta = await http.post(
+                        endpoint, data=dados,
+                        files={"arquivo": (caminho.name, f, TIPOS_MIDIA.get(caminho.suffix, "application/octet-stream"))},
+                    )
+            except httpx.HTTPError as e:
+                erros[type(e).__name__] = erros.get(type(e).__name__, 0) + 1
+                return
+            duracao = time.perf_counter() - inicio
+        if resposta.status_code == 503:
+            recusas.append(duracao)
+        if resposta.status_code != 200:
+            erros[str(resposta.status_code)] = erros.get(str(resposta.status_code), 0) + 1
+            return
+        latencias.append(duracao)
+        corpo = resposta.json()
+        cache_hits += bool(corpo.get("cache_hit"))
+        for etapa, segundos in (corpo.get("tempos") or {}).items():
+            etapas.setdefault(etapa, []).append(segundos)
+
+    async with httpx.AsyncClient(base_url=url, timeout=None) as http:
+        inicio = time.perf_counter()
+        await asyncio.gather(*(_uma(http, i) for i in range(requisicoes)))
+        total = time.perf_counter() - inicio
+    return {
+        "requisicoes": requisicoes,
+        "sucesso": len(latencias),
+        "erros": erros,
+        "cache_hits": cache_hits,
+        "duracao_s": round(total, 3),
+        "requisicoes_por_s": round(len(latencias) / total, 3) if total else 0.0,
+        "latencia_s": percentis(latencias),
+        "latencia_recusas_s": percentis(recusas),
+        "etapas_s": {etapa: percentis(valores) for etapa, valores in sorted(etapas.items())},
+    }
+
+
+def _commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def comparar(atual: Dict[str, Any], anterior: Dict[str, Any]) -> Dict[str, Any]:
+    """Diferença percentual das principais métricas em relação a uma execução anterior."""
+    def _delta(novo, velho):
+        if not isinstance(novo, (int, float)) or not isinstance(velho, (int, float)) or not velho:
+            return None
+        return f"{(novo - velho) / velho * 100:+.1f}%"
+
+    a, b = atual["resultado"], anterior["resultado"]
+    diferencas = {
+        "requisicoes_por_s": _delta(a["requisicoes_por_s"], b["requisicoes_por_s"]),
+        "latencia_p95": _delta(a["latencia_s"].get("p95"), b["latencia_s"].get("p95")),
+        "pico_rss_mb": _delta(atual["recursos"].get("pico_rss_mb"), anterior["recursos"].get("pico_rss_mb")),
+        "pico_disco_temp_mb": _delta(
+            atual["recursos"].get("pico_disco_temp_mb"), anterior["recursos"].get("pico_disco_temp_mb")
+        ),
+    }
+    for etapa, valores in a["etapas_s"].items():
+        diferencas[f"{etapa}_p95"] = _delta(valores.get("p95"), b["etapas_s"].get(etapa, {}).get("p95"))
+    return {"base": anterior.get("inicio"), "commit_base": anterior.get("ambiente", {}).get("commit"), **diferencas}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="servidor já em execução (senão sobe um com a OpenAI falsa)")
+    parser.add_argument("--pid", type=int, help="PID do servidor de --url, para medir o RSS")
+    parser.add_argument("--endpoint", default="/transcrever")
+    parser.add_argument("--requisicoes", type=int, default=20)
+    parser.add_argument("--concorrencia", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=1, help="workers do uvicorn ao subir a aplicação")
+    parser.add_argument("--formatos", default="mp4,mp3")
+    parser.add_argument("--duracao", type=int, default=30, help="segundos de cada mídia sintética")
+    parser.add_argument("--resolucao", default="media")
+    parser.add_argument("--com-cache", action="store_true", help="repete o prompt e permite acertos no cache")
+    parser.add_argument("--saida", type=Path, default=PASTA_RESULTADOS)
+    parser.add_argument("--comparar", type=Path, help="JSON de uma execução anterior")
+    fake_openai.adicionar_argumentos(parser)
+    args = parser.parse_args()
+
+    pasta_midias = tempfile.mkdtemp(prefix="carga_")
+    arquivos = gerar_conjunto(
+        pasta_midias, [f.strip() for f in args.formatos.split(",") if f.strip()], [args.duracao], args.resolucao
+    )
+    config_falsa = fake_openai.config_dos_argumentos(args)
+    servidor_falso = processo = None
+    url, pid = args.url, args.pid
+    try:
+        if url is None:
+            porta_falsa, porta_app = _porta_livre(), _porta_livre()
+            servidor_falso, _ = iniciar_openai_falsa(config_falsa, porta_falsa)
+            processo = iniciar_aplicacao(porta_app, f"http://127.0.0.1:{porta_falsa}/v1", args.workers)
+            url, pid = f"http://127.0.0.1:{porta_app}", processo.pid
+        inicio = time.strftime("%Y-%m-%dT%H:%M:%S")
+        with Monitor(pid, RAIZ / "temp") as monitor:
+            resultado = asyncio.run(disparar(
+                url, args.endpoint, arquivos, args.requisicoes, args.concorrencia, args.com_cache
+            ))
+        openai_falsa = None
+        if servidor_falso is not None:
+            openai_falsa = httpx.get(f"http://127.0.0.1:{porta_falsa}/_stats").json()
+    finally:
+        if processo is not None:
+            processo.terminate()
+            processo.wait(timeout=10)
+        if servidor_falso is not None:
+            servidor_falso.should_exit = True
+        for arquivo in arquivos:
+            os.remove(arquivo["caminho"])
+        os.rmdir(pasta_midias)
+
+    relatorio = {
+        "inicio": inicio,
+        "ambiente": {
+            "commit": _commit(),
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+            "sistema": platform.platform(),
+        },
+        "parametros": {
+            "url": args.url, "endpoint": args.endpoint, "requisicoes": args.requisicoes,
+            "concorrencia": args.concorrencia, "workers": args.workers, "com_cache": args.com_cache,
+            "midias": [{k: a[k] for k in ("formato", "duracao_s", "bytes")} for a in arquivos],
+        },
+        "openai_falsa": openai_falsa,
+        "resultado": resultado,
+        "recursos": monitor.resultado(),
+    }
+    if args.comparar:
+        relatorio["comparacao"] = comparar(relatorio, json.loads(args.comparar.read_text()))
+    args.saida.mkdir(parents=True, exist_ok=True)
+    destino = args.saida / f"carga_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    destino.write_text(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+    print(f"\nResultado salvo em {destino}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
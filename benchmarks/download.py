@@ -0,0 +1,106 @@
+"""Compara o download em um único stream com o download em segmentos paralelos.
+
+Sobe um servidor HTTP local com suporte a Range e banda limitada por conexão
+(como um CDN que limita cada conexão), opcionalmente derrubando conexões no
+meio para exercitar a retomada. Sem `--entrada`, serve bytes de um MP3
+sintético publicado com extensão `.mp4` na URL, para conferir a detecção de
+tipo pelo conteúdo.
+
+Uso:
+    python -m benchmarks.download --tamanho-mb 64 --kbps 20000 --segmentos 1,4,8
+    python -m benchmarks.download --falhar-a-cada-mb 5
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from pipeline import download
+
+
+def criar_servidor(dados: bytes, kbps: int, falhar_a_cada: int) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            inicio, fim = 0, len(dados) - 1
+            faixa = self.headers.get("Range")
+            if faixa:
+                a, _, b = faixa.removeprefix("bytes=").partition("-")
+                inicio, fim = int(a), int(b) if b else len(dados) - 1
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {inicio}-{fim}/{len(dados)}")
+            else:
+                self.send_response(200)
+            self.send_header("Accept-Ranges", "bytes")
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(fim - inicio + 1))
+            self.end_headers()
+            bloco = 64 * 1024
+            enviados = 0
+            for pos in range(inicio, fim + 1, bloco):
+                pedaco = dados[pos:min(fim + 1, pos + bloco)]
+                if falhar_a_cada and enviados >= falhar_a_cada:
+                    self.close_connection = True
+                    return
+                self.wfile.write(pedaco)
+                enviados += len(pedaco)
+                if kbps:
+                    time.sleep(len(pedaco) / (kbps * 1024))
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def _dados_sinteticos(tamanho: int) -> bytes:
+    # Cabeçalho ID3 seguido de bytes aleatórios: basta para a detecção por assinatura
+    return b"ID3\x04\x00\x00\x00\x00\x00\x00" + os.urandom(tamanho - 10)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entrada", help="arquivo a servir (padrão: dados sintéticos)")
+    parser.add_argument("--tamanho-mb", type=int, default=32)
+    parser.add_argument("--kbps", type=int, default=16000, help="banda por conexão em KB/s (0 = sem limite)")
+    parser.add_argument("--segmentos", default="1,4,8")
+    parser.add_argument("--falhar-a-cada-mb", type=float, default=0, help="derruba cada conexão após N MB")
+    args = parser.parse_args()
+
+    dados = Path(args.entrada).read_bytes() if args.entrada else _dados_sinteticos(args.tamanho_mb * 1024 * 1024)
+    esperado = hashlib.sha256(dados).hexdigest()
+    servidor = criar_servidor(dados, args.kbps, int(args.falhar_a_cada_mb * 1024 * 1024))
+    url = f"http://127.0.0.1:{servidor.server_port}/midia.mp4"
+    resultados = []
+    with tempfile.TemporaryDirectory() as pasta:
+        for quantidade in [int(s) for s in args.segmentos.split(",")]:
+            hasher = hashlib.sha256()
+            inicio = time.perf_counter()
+            baixado = download.baixar(
+                url, Path(pasta) / f"seg{quantidade}", hasher, segmentos=quantidade
+            )
+            segundos = time.perf_counter() - inicio
+            resultados.append({
+                "segmentos": baixado["segmentos"],
+                "segundos": round(segundos, 3),
+                "mb_por_s": round(len(dados) / 1024 / 1024 / segundos, 2),
+                "retomadas": baixado["retomadas"],
+                "extensao": baixado["caminho"].suffix,
+                "integro": hasher.hexdigest() == esperado,
+            })
+            baixado["caminho"].unlink()
+    servidor.shutdown()
+    print(json.dumps({"bytes": len(dados), "kbps_por_conexao": args.kbps, "resultados": resultados}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Servidor local que imita a API da OpenAI para benchmarks sem gastar créditos.
+
+Atende `POST /v1/audio/transcriptions` e `POST /v1/chat/completions` (com `n`,
+streaming e `usage`), devolve os cabeçalhos `x-ratelimit-*` que o governador
+lê e pode injetar 429 numa fração das chamadas. A latência é configurável;
+na transcrição cresce com o tamanho do áudio enviado.
+
+Para apontar a aplicação para ele basta `OPENAI_BASE_URL`:
+
+    python -m benchmarks.fake_openai --porta 8900 --latencia-chat 0.3 --taxa-429 0.05
+    OPENAI_BASE_URL=http://127.0.0.1:8900/v1 OPENAI_API_KEY=x uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+TRANSCRICAO_PADRAO = (
+    "Olá, pessoal! Hoje vou mostrar três dicas práticas para gravar vídeos melhores com o celular. "
+    "Primeiro, cuide da luz: grave de frente para a janela. Segundo, use um microfone de lapela barato. "
+    "Terceiro, planeje os primeiros cinco segundos, que decidem se a pessoa continua assistindo. "
+)
+CONTEUDO_PADRAO = {
+    "titulo": "3 dicas para gravar vídeos melhores com o celular",
+    "legenda": "Luz, áudio e um bom gancho: é isso que separa um vídeo amador de um que prende a atenção.",
+    "hashtags": ["#video", "#celular", "#dicas", "#criadordeconteudo", "#filmagem"],
+}
+RESUMO_PADRAO = "- Luz de frente para a janela\n- Microfone de lapela\n- Gancho nos primeiros segundos"
+
+
+@dataclass
+class Config:
+    latencia_transcricao: float = 1.0  # segundos fixos por chamada ao Whisper
+    latencia_por_mb: float = 0.2  # segundos extras por MB de áudio enviado
+    latencia_chat: float = 0.3  # segundos por chamada de chat
+    taxa_429: float = 0.0  # fração das chamadas respondidas com 429
+    retry_after_ms: int = 500
+    limite_rpm: int = 500
+    limite_tpm: int = 200000
+    repeticoes_transcricao: int = 1  # repete o texto padrão (transcrições longas acionam o map-reduce)
+    semente: Optional[int] = None
+
+
+def _tokens(texto: str) -> int:
+    return max(1, len(texto) // 4)
+
+
+def criar_app(config: Optional[Config] = None) -> FastAPI:
+    config = config or Config()
+    sorteio = random.Random(config.semente)
+    contagem: Dict[str, int] = {"transcricoes": 0, "chats": 0, "erros_429": 0, "bytes_audio": 0}
+    lock = threading.Lock()
+    app = FastAPI(title="OpenAI falsa")
+
+    def _contar(campo: str, valor: int = 1) -> None:
+        with lock:
+            contagem[campo] += valor
+
+    def _cabecalhos() -> Dict[str, str]:
+        return {
+            "x-ratelimit-limit-requests": str(config.limite_rpm),
+            "x-ratelimit-remaining-requests": str(config.limite_rpm - 1),
+            "x-ratelimit-reset-requests": "120ms",
+            "x-ratelimit-limit-tokens": str(config.limite_tpm),
+            "x-ratelimit-remaining-tokens": str(config.limite_tpm - 1000),
+            "x-ratelimit-reset-tokens": "6ms",
+        }
+
+    def _limitar() -> Optional[JSONResponse]:
+        if config.taxa_429 <= 0 or sorteio.random() >= config.taxa_429:
+            return None
+        _contar("erros_429")
+        return JSONResponse(
+            status_code=429,
+            content={"error": {
+                "message": "Rate limit reached (simulado)", "type": "requests", "code": "rate_limit_exceeded"
+            }},
+            headers={
+                **_cabecalhos(),
+                "retry-after": str(config.retry_after_ms / 1000),
+                "retry-after-ms": str(config.retry_after_ms),
+                "x-ratelimit-remaining-requests": "0",
+            },
+        )
+
+    @app.post("/v1/audio/transcriptions")
+    async def transcricoes(request: Request):
+        formulario = await request.form()
+        arquivo = formulario.get("file")
+        tamanho = len(await arquivo.read()) if arquivo is not None else 0
+        _contar("transcricoes")
+        _contar("bytes_audio", tamanho)
+        erro = _limitar()
+        if erro is not None:
+            return erro
+        await asyncio.sleep(config.latencia_transcricao + config.latencia_por_mb * tamanho / (1024 * 1024))
+        texto = TRANSCRICAO_PADRAO * max(1, config.repeticoes_transcricao)
+        formato = formulario.get("response_format") or "json"
+        if formato in ("text", "srt", "vtt"):
+            return PlainTextResponse(texto, headers=_cabecalhos())
+        return JSONResponse({"text": texto}, headers=_cabecalhos())
+
+    @app.post("/v1/chat/completions")
+    async def chat(request: Request):
+        corpo = await request.json()
+        _contar("chats")
+        erro = _limitar()
+        if erro is not None:
+            return erro
+        await asyncio.sleep(config.latencia_chat)
+        # Pedidos com response_format JSON são a geração de conteúdo; os demais, resumos do map-reduce
+        if (corpo.get("response_format") or {}).get("type") == "json_object":
+            conteudo = json.dumps(CONTEUDO_PADRAO, ensure_ascii=False)
+        else:
+            conteudo = RESUMO_PADRAO
+        n = max(1, int(corpo.get("n") or 1))
+        prompt = sum(_tokens(str(m.get("content", ""))) for m in corpo.get("messages", []))
+        uso = {"prompt_tokens": prompt, "completion_tokens": _tokens(conteudo) * n,
+               "total_tokens": prompt + _tokens(conteudo) * n}
+        base = {"id": f"chatcmpl-{uuid.uuid4().hex[:12]}", "created": int(time.time()), "model": corpo.get("model", "")}
+        if corpo.get("stream"):
+            return StreamingResponse(
+                _stream(base, conteudo, uso if (corpo.get("stream_options") or {}).get("include_usage") else None),
+                media_type="text/event-stream",
+                headers=_cabecalhos(),
+            )
+        escolhas = [
+            {"index": i, "message": {"role": "assistant", "content": conteudo}, "finish_reason": "stop"}
+            for i in range(n)
+        ]
+        return JSONResponse(
+            {**base, "object": "chat.completion", "choices": escolhas, "usage": uso}, headers=_cabecalhos()
+        )
+
+    async def _stream(base: Dict[str, Any], conteudo: str, uso: Optional[Dict[str, int]]):
+        for i in range(0, len(conteudo), 16):
+            pedaco = {"index": 0, "delta": {"content": conteudo[i:i + 16]}, "finish_reason": None}
+            yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [pedaco]})}\n\n"
+            await asyncio.sleep(0)
+        fim = {"index": 0, "delta": {}, "finish_reason": "stop"}
+        yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [fim]})}\n\n"
+        if uso is not None:
+            yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': uso})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.get("/_stats")
+    async def stats():
+        with lock:
+            return {"config": asdict(config), **contagem}
+
+    return app
+
+
+def adicionar_argumentos(parser: argparse.ArgumentParser) -> None:
+    padrao = Config()
+    parser.add_argument("--latencia-transcricao", type=float, default=padrao.latencia_transcricao)
+    parser.add_argument("--latencia-por-mb", type=float, default=padrao.latencia_por_mb)
+    parser.add_argument("--latencia-chat", type=float, default=padrao.latencia_chat)
+    parser.add_argument("--taxa-429", type=float, default=padrao.taxa_429, help="fração das chamadas com 429")
+    parser.add_argument("--repeticoes-transcricao", type=int, default=padrao.repeticoes_transcricao)
+    parser.add_argument("--semente", type=int)
+
+
+def config_dos_argumentos(args: argparse.Namespace) -> Config:
+    return Config(
+        latencia_transcricao=args.latencia_transcricao,
+        latencia_por_mb=args.latencia_por_mb,
+        latencia_chat=args.latencia_chat,
+        taxa_429=args.taxa_429,
+        repeticoes_transcricao=args.repeticoes_transcricao,
+        semente=args.semente,
+    )
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--porta", type=int, default=8900)
+    adicionar_argumentos(parser)
+    args = parser.parse_args()
+    uvicorn.run(criar_app(config_dos_argumentos(args)), host="127.0.0.1", port=args.porta, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
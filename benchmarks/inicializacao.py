@@ -0,0 +1,199 @@
+"""Tempo de inicialização: importação de `main`/`app` e tempo até a primeira requisição.
+
+Cada medida roda num processo novo (nada em cache de módulos):
+
+- importação: segundos para `import main` e `import app`, tempo total do
+  processo e quais dependências pesadas ficaram carregadas logo após o
+  import (com o carregamento sob demanda, nenhuma deveria aparecer);
+- primeira requisição: sobe `uvicorn main:app` apontado para a OpenAI falsa e
+  mede o tempo desde o início do processo até o primeiro `GET /` com 200, e
+  a duração da primeira e da segunda transcrição, enviadas `--espera`
+  segundos depois de o servidor responder. A primeira paga o que ainda não
+  foi carregado (SDK da OpenAI, NumPy, cliente); com o pré-carregamento em
+  segundo plano (`PRE_CARREGAR_DEPENDENCIAS=1`) isso já terá acontecido se
+  a espera for de um ou dois segundos.
+
+O resultado vai para `benchmarks/resultados/`; `--comparar` mostra a
+diferença das medianas para uma execução anterior.
+
+Uso:
+    python -m benchmarks.inicializacao --repeticoes 5
+    python -m benchmarks.inicializacao --comparar benchmarks/resultados/inicializacao_20261018_120000.json
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks import fake_openai
+from benchmarks.carga import PASTA_RESULTADOS, RAIZ, iniciar_openai_falsa
+from benchmarks.midia_sintetica import gerar
+
+DEPENDENCIAS_PESADAS = ("openai", "numpy", "requests", "streamlit", "fastapi")
+_SCRIPT_IMPORTACAO = (
+    "import json, sys, time\n"
+    "inicio = time.perf_counter()\n"
+    "import {modulo}\n"
+    "duracao = time.perf_counter() - inicio\n"
+    "print(json.dumps({{'import_s': duracao, 'carregados': [m for m in {pesadas!r} if m in sys.modules]}}))\n"
+)
+
+
+def _mediana(valores: List[float]) -> Optional[float]:
+    return round(statistics.median(valores), 4) if valores else None
+
+
+def _porta_livre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _ambiente(base_url_openai: Optional[str] = None) -> Dict[str, str]:
+    env = {**os.environ, "OPENAI_API_KEY": "benchmark"}
+    if base_url_openai:
+        env["OPENAI_BASE_URL"] = base_url_openai
+    return env
+
+
+def medir_importacao(modulo: str, repeticoes: int) -> Dict[str, Any]:
+    importacoes: List[float] = []
+    processos: List[float] = []
+    carregados: List[str] = []
+    script = _SCRIPT_IMPORTACAO.format(modulo=modulo, pesadas=DEPENDENCIAS_PESADAS)
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        saida = subprocess.run(
+            [sys.executable, "-c", script], cwd=RAIZ, env=_ambiente(), capture_output=True, text=True, check=True
+        )
+        processos.append(time.perf_counter() - inicio)
+        dados = json.loads(saida.stdout.strip().splitlines()[-1])
+        importacoes.append(dados["import_s"])
+        carregados = dados["carregados"]
+    return {
+        "import_s": _mediana(importacoes),
+        "processo_s": _mediana(processos),
+        "carregados_apos_import": carregados,
+    }
+
+
+def _transcrever(url: str, audio: Path) -> float:
+    # Prompt único: sem acerto no cache persistente de transcrições
+    inicio = time.perf_counter()
+    with open(audio, "rb") as f:
+        resposta = httpx.post(
+            f"{url}/transcrever",
+            files={"arquivo": (audio.name, f, "audio/mpeg")},
+            data={"prompt": uuid.uuid4().hex},
+            timeout=120,
+        )
+    resposta.raise_for_status()
+    return time.perf_counter() - inicio
+
+
+def medir_primeira_requisicao(repeticoes: int, base_url_openai: str, audio: Path, espera: float) -> Dict[str, Any]:
+    ate_resposta: List[float] = []
+    primeiras: List[float] = []
+    segundas: List[float] = []
+    for _ in range(repeticoes):
+        porta = _porta_livre()
+        url = f"http://127.0.0.1:{porta}"
+        inicio = time.perf_counter()
+        processo = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(porta),
+             "--log-level", "warning"],
+            cwd=RAIZ, env=_ambiente(base_url_openai),
+        )
+        try:
+            while True:
+                if processo.poll() is not None:
+                    raise RuntimeError("A aplicação encerrou durante a inicialização.")
+                if time.perf_counter() - inicio > 60:
+                    raise RuntimeError("A aplicação não respondeu em 60 s.")
+                try:
+                    if httpx.get(f"{url}/", timeout=1).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    time.sleep(0.01)
+            ate_resposta.append(time.perf_counter() - inicio)
+            time.sleep(espera)
+            primeiras.append(_transcrever(url, audio))
+            segundas.append(_transcrever(url, audio))
+        finally:
+            processo.terminate()
+            processo.wait(timeout=10)
+    return {
+        "ate_primeira_resposta_s": _mediana(ate_resposta),
+        "primeira_transcricao_s": _mediana(primeiras),
+        "segunda_transcricao_s": _mediana(segundas),
+    }
+
+
+def comparar(atual: Dict[str, Any], anterior: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    def _delta(novo: Optional[float], velho: Optional[float]) -> Optional[str]:
+        if not novo or not velho:
+            return None
+        return f"{(novo - velho) / velho * 100:+.1f}%"
+
+    diferencas: Dict[str, Optional[str]] = {}
+    for modulo, dados in atual["importacao"].items():
+        base = anterior.get("importacao", {}).get(modulo, {})
+        diferencas[f"import_{modulo}"] = _delta(dados["import_s"], base.get("import_s"))
+    for chave, valor in atual.get("primeira_requisicao", {}).items():
+        if chave != "espera_s":
+            diferencas[chave] = _delta(valor, anterior.get("primeira_requisicao", {}).get(chave))
+    return {"base": anterior.get("inicio"), **diferencas}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeticoes", type=int, default=5)
+    parser.add_argument("--modulos", default="main,app", help="módulos cuja importação é medida")
+    parser.add_argument("--sem-servidor", action="store_true", help="mede só a importação")
+    parser.add_argument("--espera", type=float, default=2.0, help="segundos entre o servidor responder e a 1ª transcrição")
+    parser.add_argument("--saida", type=Path, default=PASTA_RESULTADOS)
+    parser.add_argument("--comparar", type=Path, help="JSON de uma execução anterior")
+    args = parser.parse_args()
+
+    resultado: Dict[str, Any] = {
+        "inicio": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "repeticoes": args.repeticoes,
+        "python": sys.version.split()[0],
+        "importacao": {
+            m: medir_importacao(m, args.repeticoes) for m in (m.strip() for m in args.modulos.split(",")) if m
+        },
+    }
+    if not args.sem_servidor:
+        config = fake_openai.Config(latencia_transcricao=0.05, latencia_por_mb=0.0, latencia_chat=0.05)
+        porta_falsa = _porta_livre()
+        servidor_falso, _ = iniciar_openai_falsa(config, porta_falsa)
+        try:
+            with tempfile.TemporaryDirectory() as pasta:
+                audio = Path(gerar(str(Path(pasta) / "inicializacao.mp3"), 5))
+                resultado["primeira_requisicao"] = medir_primeira_requisicao(
+                    args.repeticoes, f"http://127.0.0.1:{porta_falsa}/v1", audio, args.espera
+                )
+                resultado["primeira_requisicao"]["espera_s"] = args.espera
+        finally:
+            servidor_falso.should_exit = True
+    if args.comparar:
+        resultado["comparacao"] = comparar(resultado, json.loads(args.comparar.read_text()))
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+    args.saida.mkdir(parents=True, exist_ok=True)
+    destino = args.saida / f"inicializacao_{time.strftime('%Y%m%d_%H%M%S')}.json"
+    destino.write_text(json.dumps(resultado, indent=2, ensure_ascii=False))
+    print(f"\nResultado salvo em {destino}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Mede a latência de `GET /` enquanto N transcrições rodam em paralelo.
+
+Usa a OpenAI falsa de `fake_openai` (latência configurável, em memória), então
+não gasta créditos. Com o pipeline assíncrono, o p50 de `/` deve ficar
+praticamente igual com e sem transcrições em andamento.
+
+Uso:
+    python -m benchmarks.latencia_concorrente --transcricoes 8 --latencia-api 2
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+import httpx  # noqa: E402
+from openai import AsyncOpenAI  # noqa: E402
+
+import main  # noqa: E402
+from benchmarks import fake_openai  # noqa: E402
+
+
+def _cliente_falso(latencia: float) -> AsyncOpenAI:
+    """Cliente OpenAI real apontado, em memória, para a OpenAI falsa de `fake_openai`."""
+    config = fake_openai.Config(latencia_transcricao=latencia, latencia_por_mb=0.0, latencia_chat=latencia / 4)
+    transporte = httpx.ASGITransport(app=fake_openai.criar_app(config))
+    return AsyncOpenAI(
+        api_key="benchmark",
+        base_url="http://openai-falsa/v1",
+        http_client=httpx.AsyncClient(transport=transporte, timeout=None),
+        max_retries=0,
+    )
+
+
+async def _latencias_home(http: httpx.AsyncClient, amostras: int, intervalo: float):
+    tempos = []
+    for _ in range(amostras):
+        inicio = time.perf_counter()
+        resposta = await http.get("/")
+        resposta.raise_for_status()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        await asyncio.sleep(intervalo)
+    return tempos
+
+
+async def _transcrever(http: httpx.AsyncClient, tamanho_mb: int) -> None:
+    # Bytes aleatórios: evita acerto no cache de transcrições
+    dados = os.urandom(tamanho_mb * 1024 * 1024)
+    resposta = await http.post(
+        "/transcrever",
+        files={"arquivo": ("audio.mp3", dados, "audio/mpeg")},
+        timeout=None,
+    )
+    resposta.raise_for_status()
+
+
+async def executar(transcricoes: int, latencia_api: float, tamanho_mb: int, amostras: int) -> dict:
+    main.client.definir(_cliente_falso(latencia_api))
+    transporte = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as http:
+        ocioso = await _latencias_home(http, amostras, 0.02)
+        tarefas = [asyncio.create_task(_transcrever(http, tamanho_mb)) for _ in range(transcricoes)]
+        await asyncio.sleep(0.05)
+        sob_carga = await _latencias_home(http, amostras, 0.02)
+        await asyncio.gather(*tarefas)
+    return {
+        "transcricoes": transcricoes,
+        "p50_ms_ocioso": round(statistics.median(ocioso), 2),
+        "p50_ms_sob_carga": round(statistics.median(sob_carga), 2),
+        "max_ms_sob_carga": round(max(sob_carga), 2),
+    }
+
+
+def main_cli() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--transcricoes", type=int, default=8)
+    parser.add_argument("--latencia-api", type=float, default=2.0, help="segundos por chamada falsa ao Whisper")
+    parser.add_argument("--tamanho-mb", type=int, default=20, help="tamanho de cada upload sintético")
+    parser.add_argument("--amostras", type=int, default=30)
+    args = parser.parse_args()
+    resultado = asyncio.run(executar(args.transcricoes, args.latencia_api, args.tamanho_mb, args.amostras))
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main_cli()
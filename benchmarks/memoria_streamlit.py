@@ -0,0 +1,79 @@
+"""Pico de memória por sessão no caminho de upload do Streamlit: antes x depois.
+
+Reproduz o que uma sessão da aba de vídeo faz com o arquivo enviado (checar
+o tamanho, gravar em disco para o FFmpeg) e com o áudio extraído (botão de
+download), com `tracemalloc` medindo o pico de alocações Python e quanto
+fica retido entre reruns.
+
+- antes: `len(getvalue())`, `write(getvalue())` e `open(audio).read()` a cada rerun
+- depois: `.size`, `salvar_upload_temporario` (blocos de 1 MB) e download sob demanda
+
+Uso:
+    python -m benchmarks.memoria_streamlit --upload-mb 500 --audio-mb 15
+"""
+import argparse
+import json
+import os
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from streamlit.runtime.uploaded_file_manager import UploadedFile, UploadedFileRec  # noqa: E402
+
+import app  # noqa: E402
+
+
+def _arquivo_enviado(tamanho: int) -> UploadedFile:
+    # Mesmo objeto que o st.file_uploader entrega (BytesIO sobre os bytes recebidos)
+    return UploadedFile(UploadedFileRec("bench", "video.mp4", "video/mp4", os.urandom(tamanho)), None)
+
+
+def antes(arquivo: UploadedFile, audio: str, pasta: str):
+    tamanho_mb = len(arquivo.getvalue()) / (1024 * 1024)
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4", dir=pasta) as temp:
+        temp.write(arquivo.getvalue())
+    with open(audio, "rb") as f:
+        dados_download = f.read()
+    os.unlink(temp.name)
+    return tamanho_mb, dados_download
+
+
+def depois(arquivo: UploadedFile, audio: str, pasta: str):
+    tamanho_mb = arquivo.size / (1024 * 1024)
+    caminho = app.salvar_upload_temporario(arquivo, ".mp4", pasta)
+    dados_download = Path(audio).read_bytes  # só é chamado no clique
+    os.unlink(caminho)
+    return tamanho_mb, dados_download
+
+
+def medir(funcao, arquivo: UploadedFile, audio: str, pasta: str, reruns: int) -> dict:
+    tracemalloc.start()
+    retidos = [funcao(arquivo, audio, pasta) for _ in range(reruns)]
+    atual, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retidos
+    return {"pico_mb": round(pico / 2**20, 1), "retido_mb": round(atual / 2**20, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--upload-mb", type=int, default=200)
+    parser.add_argument("--audio-mb", type=int, default=15, help="tamanho do áudio extraído")
+    parser.add_argument("--reruns", type=int, default=3, help="reruns da página com o mesmo upload")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as pasta:
+        audio = Path(pasta) / "audio.mp3"
+        audio.write_bytes(os.urandom(args.audio_mb * 1024 * 1024))
+        resultado = {"upload_mb": args.upload_mb, "audio_mb": args.audio_mb, "reruns": args.reruns}
+        for nome, funcao in (("antes", antes), ("depois", depois)):
+            # Arquivo novo a cada medição: getvalue()/getbuffer() alteram o estado interno do BytesIO
+            arquivo = _arquivo_enviado(args.upload_mb * 1024 * 1024)
+            resultado[nome] = medir(funcao, arquivo, str(audio), pasta, args.reruns)
+            del arquivo
+    print(json.dumps(resultado, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Gera mídias de teste com o FFmpeg em vários formatos, durações e tamanhos.
+
+O áudio alterna trechos de tom com ruído e pausas (6 s de som, 2 s de
+silêncio), de modo que o VAD tenha o que cortar. Vídeos levam uma imagem de
+teste na resolução pedida, o que controla o tamanho do arquivo.
+
+Uso:
+    python -m benchmarks.midia_sintetica --destino temp/bench --formatos mp4,mp3,wav --duracoes 30,300
+"""
+import argparse
+import json
+import os
+import subprocess
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# formato -> (é vídeo, argumentos de codec)
+FORMATOS: Dict[str, tuple] = {
+    "mp4": (True, ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k"]),
+    "mkv": (True, ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k"]),
+    "mov": (True, ["-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k"]),
+    "webm": (True, ["-c:v", "libvpx", "-deadline", "realtime", "-cpu-used", "8", "-c:a", "libopus", "-b:a", "64k"]),
+    "mp3": (False, ["-c:a", "libmp3lame", "-b:a", "128k"]),
+    "m4a": (False, ["-c:a", "aac", "-b:a", "128k"]),
+    "ogg": (False, ["-c:a", "libopus", "-b:a", "64k"]),
+    "wav": (False, ["-c:a", "pcm_s16le"]),
+}
+RESOLUCOES = {"baixa": "320x180", "media": "640x360", "alta": "1280x720"}
+
+# Tom de 220 Hz + ruído, mudo nos 2 últimos segundos de cada janela de 8 s
+_FILTRO_FALA = "[0:a][1:a]amix=inputs=2,volume='if(lt(mod(t,8),6),1,0)':eval=frame[a]"
+
+
+def gerar(
+    destino: str,
+    duracao: int,
+    formato: Optional[str] = None,
+    resolucao: str = "media",
+    frequencia: int = 220,
+) -> Path:
+    """Gera um arquivo em `destino` (o formato vem da extensão se não for informado)."""
+    caminho = Path(destino)
+    formato = formato or caminho.suffix.lstrip(".").lower()
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato não suportado: {formato}")
+    video, codecs = FORMATOS[formato]
+    entradas = [
+        "-f", "lavfi", "-i", f"sine=frequency={frequencia}:sample_rate=44100:duration={duracao}",
+        "-f", "lavfi", "-i", f"anoisesrc=amplitude=0.05:sample_rate=44100:duration={duracao}",
+    ]
+    mapas = ["-map", "[a]"]
+    if video:
+        tamanho = RESOLUCOES.get(resolucao, resolucao)
+        entradas += ["-f", "lavfi", "-i", f"testsrc=size={tamanho}:rate=25:duration={duracao}"]
+        mapas = ["-map", "2:v", "-map", "[a]"]
+    caminho.parent.mkdir(parents=True, exist_ok=True)
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", *entradas,
+         "-filter_complex", _FILTRO_FALA, *mapas, *codecs, "-y", str(caminho)],
+        check=True,
+    )
+    return caminho
+
+
+def gerar_conjunto(
+    pasta: str,
+    formatos: Iterable[str],
+    duracoes: Iterable[int],
+    resolucao: str = "media",
+) -> List[Dict[str, object]]:
+    """Gera a combinação formatos x durações e retorna [{caminho, formato, duracao_s, bytes}]."""
+    arquivos = []
+    for formato in formatos:
+        for duracao in duracoes:
+            nome = f"sintetico_{duracao}s_{resolucao}.{formato}"
+            caminho = gerar(os.path.join(pasta, nome), duracao, formato, resolucao)
+            arquivos.append({
+                "caminho": str(caminho),
+                "formato": formato,
+                "duracao_s": duracao,
+                "bytes": caminho.stat().st_size,
+            })
+    return arquivos
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--destino", default="temp/bench")
+    parser.add_argument("--formatos", default="mp4,mp3", help=f"separados por vírgula: {','.join(FORMATOS)}")
+    parser.add_argument("--duracoes", default="30", help="segundos, separados por vírgula")
+    parser.add_argument("--resolucao", default="media", help=f"{', '.join(RESOLUCOES)} ou LxA")
+    args = parser.parse_args()
+    arquivos = gerar_conjunto(
+        args.destino,
+        [f.strip() for f in args.formatos.split(",") if f.strip()],
+        [int(d) for d in args.duracoes.split(",") if d.strip()],
+        args.resolucao,
+    )
+    print(json.dumps(arquivos, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
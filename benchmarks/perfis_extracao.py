@@ -0,0 +1,69 @@
+"""Compara os perfis de extração de áudio: tempo de FFmpeg e tamanho do arquivo gerado.
+
+Sem `--entrada`, gera um vídeo sintético (tom + ruído, AAC) com o próprio FFmpeg.
+
+Uso:
+    python -m benchmarks.perfis_extracao --entrada webinar.mp4
+    python -m benchmarks.perfis_extracao --duracao 600
+"""
+import argparse
+import json
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+from pipeline.perfis_audio import PERFIS, comando_extracao, sondar_audio
+
+
+def gerar_video_sintetico(destino: str, duracao: int) -> None:
+    subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-f", "lavfi", "-i", f"testsrc=size=640x360:rate=25:duration={duracao}",
+            "-f", "lavfi", "-i", f"sine=frequency=220:duration={duracao}",
+            "-f", "lavfi", "-i", f"anoisesrc=amplitude=0.05:duration={duracao}",
+            "-filter_complex", "[1:a][2:a]amix=inputs=2[a]",
+            "-map", "0:v", "-map", "[a]",
+            "-c:v", "libx264", "-preset", "ultrafast", "-c:a", "aac", "-b:a", "128k",
+            "-y", destino,
+        ],
+        check=True,
+    )
+
+
+def medir(comando, saida: str) -> dict:
+    inicio = time.perf_counter()
+    resultado = subprocess.run(comando, capture_output=True, text=True)
+    segundos = time.perf_counter() - inicio
+    if resultado.returncode != 0:
+        return {"erro": resultado.stderr.strip().splitlines()[-1:]}
+    return {"segundos": round(segundos, 3), "bytes": os.path.getsize(saida)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entrada", help="arquivo de vídeo/áudio a extrair")
+    parser.add_argument("--duracao", type=int, default=300, help="segundos do vídeo sintético")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        entrada = args.entrada
+        if not entrada:
+            entrada = str(Path(pasta) / "sintetico.mp4")
+            gerar_video_sintetico(entrada, args.duracao)
+        relatorio = {"entrada": entrada, "bytes_entrada": os.path.getsize(entrada), "perfis": {}}
+        for nome in PERFIS:
+            comando, saida = comando_extracao(entrada, str(Path(pasta) / f"saida_{nome}"), nome)
+            relatorio["perfis"][nome] = medir(comando, saida)
+        sonda = sondar_audio(entrada)
+        if sonda:
+            comando, saida = comando_extracao(entrada, str(Path(pasta) / "saida_copia"), sonda=sonda)
+            if "copy" in comando:
+                relatorio["perfis"]["passthrough"] = medir(comando, saida)
+    print(json.dumps(relatorio, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""Compara os backends de transcrição: fator de tempo real (RTF) e custo por hora de áudio.
+
+Para cada backend transcreve os mesmos áudios e mede:
+
+- RTF sequencial: tempo de parede / duração do áudio, um arquivo por vez;
+- vazão com `--concorrencia` pedidos simultâneos (no motor local, com e sem
+  micro-lotes de trechos curtos);
+- custo por hora de áudio: preço por minuto da API (`PRECO_WHISPER_MINUTO`)
+  ou, no local, núcleos ocupados x `--preco-vcpu-hora` x tempo de parede.
+
+Sem `--openai-real`, o backend "openai" usa a OpenAI falsa em memória
+(`fake_openai`), com a latência informada: serve para exercitar o caminho, não
+para medir a API de verdade. Sem `--entrada`, usa tons sintéticos (o motor
+local ainda roda encoder e decoder completos, mas a transcrição sai vazia ou
+sem sentido); para números representativos use gravações de fala.
+
+Uso:
+    python -m benchmarks.transcricao_backends --entrada fala1.mp3 fala2.mp3 --concorrencia 8
+    python -m benchmarks.transcricao_backends --duracoes 10,10,10,10,300 --preco-vcpu-hora 0.04
+    python -m benchmarks.transcricao_backends --openai-real --entrada fala.mp3
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+from openai import AsyncOpenAI
+
+from benchmarks import fake_openai
+from benchmarks.midia_sintetica import gerar
+from pipeline import transcricao
+from pipeline.admissao import nucleos_disponiveis
+from pipeline.vad import PRECO_WHISPER_MINUTO, TAXA_AMOSTRAGEM, decodificar_pcm
+
+
+def _cliente_openai(real: bool, latencia: float, latencia_por_mb: float) -> AsyncOpenAI:
+    if real:
+        return AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
+    config = fake_openai.Config(latencia_transcricao=latencia, latencia_por_mb=latencia_por_mb)
+    transporte = httpx.ASGITransport(app=fake_openai.criar_app(config))
+    return AsyncOpenAI(
+        api_key="benchmark",
+        base_url="http://openai-falsa/v1",
+        http_client=httpx.AsyncClient(transport=transporte, timeout=None),
+        max_retries=0,
+    )
+
+
+async def _transcrever(backend, caminho: str) -> str:
+    with open(caminho, "rb") as f:
+        return await backend.transcrever_async(f, "")
+
+
+async def medir_backend(backend, audios: List[Dict[str, Any]], concorrencia: int) -> Dict[str, Any]:
+    total_audio = sum(a["duracao_s"] for a in audios)
+    inicio = time.perf_counter()
+    for audio in audios:
+        await _transcrever(backend, audio["caminho"])
+    sequencial = time.perf_counter() - inicio
+
+    semaforo = asyncio.Semaphore(concorrencia)
+
+    async def _um(audio: Dict[str, Any]) -> None:
+        async with semaforo:
+            await _transcrever(backend, audio["caminho"])
+
+    inicio = time.perf_counter()
+    await asyncio.gather(*(_um(a) for a in audios))
+    paralelo = time.perf_counter() - inicio
+    return {
+        "audio_s": round(total_audio, 1),
+        "sequencial_s": round(sequencial, 3),
+        "rtf_sequencial": round(sequencial / total_audio, 4),
+        "concorrente_s": round(paralelo, 3),
+        "rtf_concorrente": round(paralelo / total_audio, 4),
+    }
+
+
+def custo_local_hora(rtf: float, nucleos: int, preco_vcpu_hora: float) -> float:
+    """USD por hora de áudio: a máquina inteira fica ocupada por `rtf` horas."""
+    return round(rtf * nucleos * preco_vcpu_hora, 4)
+
+
+def preparar_audios(args: argparse.Namespace, pasta: str) -> List[Dict[str, Any]]:
+    if args.entrada:
+        caminhos = [str(Path(c).resolve()) for c in args.entrada]
+    else:
+        caminhos = [
+            str(gerar(str(Path(pasta) / f"tom_{i}_{d}s.mp3"), int(d), frequencia=180 + 40 * i))
+            for i, d in enumerate(args.duracoes.split(","))
+        ]
+    # Duração pelo PCM decodificado (mesma decodificação que o motor local faz)
+    return [{"caminho": c, "duracao_s": len(decodificar_pcm(c)) / TAXA_AMOSTRAGEM} for c in caminhos]
+
+
+async def executar(args: argparse.Namespace) -> Dict[str, Any]:
+    nucleos = nucleos_disponiveis()
+    with tempfile.TemporaryDirectory() as pasta:
+        audios = preparar_audios(args, pasta)
+        resultado: Dict[str, Any] = {
+            "audios": [{"arquivo": Path(a["caminho"]).name, "duracao_s": round(a["duracao_s"], 1)} for a in audios],
+            "concorrencia": args.concorrencia,
+            "nucleos": nucleos,
+        }
+
+        openai_backend = transcricao.BackendOpenAI(
+            _cliente_openai(args.openai_real, args.latencia_openai, args.latencia_openai_por_mb)
+        )
+        medicao = await medir_backend(openai_backend, audios, args.concorrencia)
+        resultado["openai"] = {
+            **medicao,
+            "api": "real" if args.openai_real else "falsa",
+            "usd_por_hora_audio": round(PRECO_WHISPER_MINUTO * 60, 4),
+        }
+
+        try:
+            transcricao.motor_local.carregar()
+        except transcricao.ErroTranscricao as e:
+            resultado["local"] = {"disponivel": False, "erro": str(e)}
+            return resultado
+        local: Dict[str, Any] = {"modelo": transcricao.motor_local.modelo}
+        for rotulo, lote_max in (("sem_lotes", 1), ("com_lotes", transcricao.LOTE_MAX)):
+            transcricao.motor_local.lote_max = lote_max
+            medicao = await medir_backend(transcricao.BackendLocal(transcricao.motor_local), audios, args.concorrencia)
+            medicao["usd_por_hora_audio"] = custo_local_hora(
+                medicao["rtf_concorrente"], nucleos, args.preco_vcpu_hora
+            )
+            local[rotulo] = medicao
+        local["motor"] = transcricao.motor_local.estatisticas()
+        resultado["local"] = local
+    return resultado
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entrada", nargs="*", help="áudios de fala (padrão: tons sintéticos)")
+    parser.add_argument("--duracoes", default="10,10,10,10,10,10,10,10,120", help="segundos dos áudios sintéticos")
+    parser.add_argument("--concorrencia", type=int, default=8)
+    parser.add_argument("--preco-vcpu-hora", type=float, default=0.04, help="USD por vCPU-hora da máquina")
+    parser.add_argument("--openai-real", action="store_true", help="usa a API de verdade (gasta créditos)")
+    parser.add_argument("--latencia-openai", type=float, default=1.0, help="OpenAI falsa: segundos por chamada")
+    parser.add_argument("--latencia-openai-por-mb", type=float, default=0.2)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(executar(args)), indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
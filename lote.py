@@ -0,0 +1,248 @@
+"""Transcrição em lote de pastas, globs ou listas de URLs, com manifesto retomável.
+
+A extração de áudio (FFmpeg) e o VAD rodam num pool de processos; downloads,
+Whisper e a geração de conteúdo rodam no event loop, com concorrência
+própria. Assim CPU e rede trabalham ao mesmo tempo. Cada item concluído vira
+uma linha no manifesto JSONL, gravada na hora: se a execução cair, rodar o
+mesmo comando de novo pula o que já terminou (itens com erro são refeitos).
+
+Só usa o `pipeline/` (nada de `main`): os processos do pool importam este
+módulo, e não devem subir a API, os bancos, a fila de jobs e a faxina. As
+pastas de trabalho saem do mesmo gerenciador de armazenamento da API
+(`temp/trabalho`), então o lote entra na mesma cota de disco.
+
+Uso:
+    python lote.py gravacoes/ --manifesto gravacoes.jsonl
+    python lote.py "aulas/**/*.mp4" @urls.txt --plataforma LinkedIn --concorrencia-api 16
+    python lote.py @urls.txt --sem-conteudo --processos 2
+    python lote.py gravacoes/ --backend local --sem-conteudo   # transcrição na CPU, sem API
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from dotenv import find_dotenv, load_dotenv
+
+_ = load_dotenv(find_dotenv())
+
+from pipeline import metricas, sob_demanda  # noqa: E402
+from pipeline.armazenamento import Area, GerenciadorArmazenamento  # noqa: E402
+from pipeline.conteudo import gerar_conteudo_social_async  # noqa: E402
+from pipeline.download import baixar  # noqa: E402
+from pipeline.particionamento import transcrever_em_partes_async  # noqa: E402
+from pipeline.perfis_audio import extrair_audio  # noqa: E402
+from pipeline.transcricao import BACKENDS_VALIDOS, ErroTranscricao, criar_backends, escolher  # noqa: E402
+from pipeline.vad import aparar_silencios  # noqa: E402
+
+EXTENSOES_VIDEO = {".mp4", ".mov", ".avi", ".mkv", ".webm"}
+EXTENSOES_AUDIO = {".mp3", ".wav", ".m4a", ".ogg"}
+EXTENSOES_SUPORTADAS = EXTENSOES_VIDEO | EXTENSOES_AUDIO
+# Mesmas pastas da API (main.py): uma cota só para tudo o que fica em temp/
+PASTA_TEMP = Path("temp")
+
+
+def _e_url(entrada: str) -> bool:
+    return entrada.startswith(("http://", "https://"))
+
+
+def expandir_entradas(entradas: Iterable[str]) -> List[str]:
+    """Pastas (recursivo), globs, arquivos, URLs e `@lista.txt` (uma entrada por linha)."""
+    itens: List[str] = []
+    for entrada in entradas:
+        if entrada.startswith("@"):
+            linhas = Path(entrada[1:]).read_text(encoding="utf-8").splitlines()
+            itens.extend(expandir_entradas(l.strip() for l in linhas if l.strip() and not l.startswith("#")))
+        elif _e_url(entrada):
+            itens.append(entrada)
+        elif os.path.isdir(entrada):
+            itens.extend(
+                str(p.resolve()) for p in sorted(Path(entrada).rglob("*"))
+                if p.suffix.lower() in EXTENSOES_SUPORTADAS
+            )
+        elif glob.has_magic(entrada):
+            itens.extend(
+                str(Path(p).resolve()) for p in sorted(glob.glob(entrada, recursive=True))
+                if Path(p).suffix.lower() in EXTENSOES_SUPORTADAS and os.path.isfile(p)
+            )
+        else:
+            itens.append(str(Path(entrada).resolve()))
+    return list(dict.fromkeys(itens))
+
+
+def ler_concluidos(manifesto: Path) -> Set[str]:
+    """Origens já concluídas com sucesso (linhas truncadas por uma queda são ignoradas)."""
+    concluidos: Set[str] = set()
+    if not manifesto.exists():
+        return concluidos
+    with open(manifesto, encoding="utf-8") as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue
+            if registro.get("status") == "ok":
+                concluidos.add(registro["origem"])
+    return concluidos
+
+
+class Manifesto:
+    """Acrescenta registros ao JSONL com flush + fsync a cada item."""
+
+    def __init__(self, caminho: Path) -> None:
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+
+    def gravar(self, registro: Dict[str, Any]) -> None:
+        self._arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+
+    def fechar(self) -> None:
+        self._arquivo.close()
+
+
+def preparar_audio(caminho: str, pasta: str) -> Dict[str, Any]:
+    """Roda no pool de processos: extrai o áudio (se vídeo) e remove silêncios."""
+    tempos: Dict[str, float] = {}
+    audio = caminho
+    if Path(caminho).suffix.lower() in EXTENSOES_VIDEO:
+        with metricas.medir("extracao", tempos):
+            sucesso, erro, audio = extrair_audio(caminho, os.path.join(pasta, "audio"))
+        if not sucesso:
+            raise RuntimeError(f"Erro ao extrair áudio: {erro}")
+    elif Path(caminho).suffix.lower() not in EXTENSOES_AUDIO:
+        raise RuntimeError("Formato não suportado.")
+    try:
+        with metricas.medir("vad", tempos):
+            vad = aparar_silencios(audio, os.path.join(pasta, "audio_vad"))
+        audio = vad.pop("caminho")
+    except RuntimeError as e:
+        vad = {"aplicado": False, "erro": str(e)}
+    return {"audio": audio, "vad": vad, "tempos": tempos}
+
+
+def baixar_midia(url: str, pasta: Path, tempos: Dict[str, float]) -> Path:
+    with metricas.medir("download", tempos):
+        baixado = baixar(url, pasta / "download", hashlib.sha256())
+    metricas.registrar_bytes("download", entrada=baixado["bytes"])
+    return baixado["caminho"]
+
+
+async def processar_item(
+    origem: str,
+    args: argparse.Namespace,
+    processos: ProcessPoolExecutor,
+    vagas_api: asyncio.Semaphore,
+    armazenamento: GerenciadorArmazenamento,
+    backends: Dict[str, Any],
+) -> Dict[str, Any]:
+    tempos: Dict[str, float] = {}
+    area: Optional[Area] = None
+    try:
+        tamanho = None if _e_url(origem) else await asyncio.to_thread(os.path.getsize, origem)
+        # Lote não tem pressa: espera espaço na cota em vez de desistir do item
+        area = await armazenamento.abrir_async(tamanho, tempos, limitar_espera=False)
+        if _e_url(origem):
+            async with vagas_api:
+                caminho = await asyncio.to_thread(baixar_midia, origem, area.pasta, tempos)
+        else:
+            caminho = Path(origem)
+        preparado = await asyncio.get_running_loop().run_in_executor(
+            processos, preparar_audio, str(caminho), str(area.pasta)
+        )
+        tempos.update(preparado["tempos"])
+        motor = escolher(backends, args.backend)
+        async with vagas_api:
+            with metricas.medir("transcricao", tempos):
+                transcricao = await transcrever_em_partes_async(preparado["audio"], args.prompt, motor.transcrever_async)
+            registro: Dict[str, Any] = {"transcricao": transcricao, "vad": preparado["vad"]}
+            if not args.sem_conteudo:
+                with metricas.medir("geracao", tempos):
+                    conteudo = await gerar_conteudo_social_async(
+                        sob_demanda.openai_async, transcricao,
+                        args.plataforma, args.tom, args.tamanho_legenda, args.qtd_hashtags,
+                    )
+                registro["uso_tokens"] = conteudo.pop("uso_tokens")
+                registro["conteudo_social"] = conteudo
+        return {"origem": origem, "status": "ok", **registro, "tempos": tempos}
+    except Exception as e:
+        return {"origem": origem, "status": "erro", "erro": str(e), "tempos": tempos}
+    finally:
+        if area is not None:
+            await asyncio.to_thread(area.fechar)
+
+
+async def executar(args: argparse.Namespace) -> Dict[str, int]:
+    itens = expandir_entradas(args.entradas)
+    concluidos = ler_concluidos(args.manifesto)
+    pendentes = [i for i in itens if i not in concluidos]
+    print(f"{len(itens)} itens, {len(itens) - len(pendentes)} já no manifesto, {len(pendentes)} a processar.",
+          file=sys.stderr)
+    manifesto = Manifesto(args.manifesto)
+    vagas_api = asyncio.Semaphore(args.concorrencia_api)
+    # Limita itens em andamento para não acumular áudios extraídos em disco
+    em_andamento = asyncio.Semaphore(args.processos + args.concorrencia_api)
+    processos = ProcessPoolExecutor(max_workers=args.processos)
+    armazenamento = GerenciadorArmazenamento(
+        PASTA_TEMP / "trabalho", contabilizar=(PASTA_TEMP / "jobs", PASTA_TEMP / "uploads")
+    )
+    backends = criar_backends(sob_demanda.openai_async)
+    contagem = {"ok": 0, "erro": 0}
+
+    async def _item(origem: str) -> None:
+        async with em_andamento:
+            inicio = time.perf_counter()
+            registro = await processar_item(origem, args, processos, vagas_api, armazenamento, backends)
+        registro["segundos"] = round(time.perf_counter() - inicio, 3)
+        registro["concluido_em"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        manifesto.gravar(registro)
+        contagem[registro["status"]] += 1
+        feitos = contagem["ok"] + contagem["erro"]
+        print(f"[{feitos}/{len(pendentes)}] {registro['status']}: {origem}"
+              + (f" ({registro['erro']})" if registro["status"] == "erro" else ""), file=sys.stderr)
+
+    try:
+        await asyncio.gather(*(_item(origem) for origem in pendentes))
+    finally:
+        processos.shutdown(cancel_futures=True)
+        manifesto.fechar()
+    return contagem
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("entradas", nargs="+", help="pastas, globs, arquivos, URLs ou @lista.txt")
+    parser.add_argument("--manifesto", type=Path, default=Path("lote.jsonl"))
+    parser.add_argument("--prompt", default="")
+    parser.add_argument("--plataforma", default="Instagram")
+    parser.add_argument("--tom", default="engajador")
+    parser.add_argument("--tamanho-legenda", default="média")
+    parser.add_argument("--qtd-hashtags", type=int, default=15)
+    parser.add_argument("--backend", default="", help="transcrição: openai ou local (padrão: TRANSCRICAO_BACKEND)")
+    parser.add_argument("--sem-conteudo", action="store_true", help="só transcreve")
+    parser.add_argument("--processos", type=int, default=os.cpu_count() or 2, help="extrações/VAD simultâneos")
+    parser.add_argument(
+        "--concorrencia-api", type=int, default=8, help="downloads e chamadas à OpenAI simultâneos"
+    )
+    args = parser.parse_args(argv)
+    try:
+        escolher(dict.fromkeys(BACKENDS_VALIDOS), args.backend)
+    except ErroTranscricao as e:
+        parser.error(str(e))
+    inicio = time.perf_counter()
+    contagem = asyncio.run(executar(args))
+    print(f"Concluído em {time.perf_counter() - inicio:.1f}s: {contagem['ok']} ok, {contagem['erro']} com erro. "
+          f"Manifesto: {args.manifesto}", file=sys.stderr)
+    return 1 if contagem["erro"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
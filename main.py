@@ -1,168 +1,475 @@
+import asyncio
+import functools
 import os
-import tempfile
 import shutil
 from pathlib import Path
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Callable, Awaitable
 import json
 import html
+import hashlib
+import sqlite3
 
 import uvicorn
 from fastapi import FastAPI, File, UploadFile, Form, HTTPException
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, JSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from fastapi import Request
 
-from openai import OpenAI
-import ffmpeg
+from pipeline import admissao, coalescencia, sob_demanda
+from pipeline.admissao import ErroAdmissao
+from pipeline.armazenamento import FATOR_RESERVA, Area, GerenciadorArmazenamento, faxina_periodica
+from pipeline.cache import copiar_com_hash, criar_cache
+from pipeline.conteudo import gerar_conteudo_social_async
+from pipeline.download import ErroDownload, baixar as baixar_url
+from pipeline.historico import ErroBusca, LIMITE_PADRAO as LIMITE_HISTORICO, RepositorioTranscricoes
+from pipeline.ingestao import receber_em_streaming
+from pipeline.jobs import ETAPA_NA_FILA, FilaJobs, RepositorioJobs
+from pipeline.limites import governador
+from pipeline import metricas
+from pipeline.multiplataforma import gerar_multiplataforma_async, normalizar_alvos
+from pipeline.perfis_audio import comando_extracao, extrair_audio_async as extrair_audio_com_ffmpeg
+from pipeline.transcricao import (
+    BACKEND_PADRAO as BACKEND_TRANSCRICAO_PADRAO, IDIOMA, ErroTranscricao, criar_backends, escolher as escolher_backend,
+    motor_local,
+)
+from pipeline.uploads import ErroUpload, RepositorioUploads
+from pipeline.vad import aparar_silencios_async
+from pipeline.particionamento import transcrever_em_partes_async
 
 # Configurações
 app = FastAPI(title="Ai Infinitus Transcript")
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+# Cliente da OpenAI criado no primeiro uso (o SDK leva boa parte do tempo de importação)
+client = sob_demanda.openai_async
 PASTA_TEMP = Path("temp")
 PASTA_TEMP.mkdir(exist_ok=True)
+IDIOMA_TRANSCRICAO = IDIOMA
+# "openai" ou "local" (faster-whisper); padrão em TRANSCRICAO_BACKEND, ou `backend` por requisição
+backends_transcricao = criar_backends(client)
+cache = criar_cache(PASTA_TEMP / "cache")
+# Histórico pesquisável (FTS5) de tudo que o pipeline produz; sobrevive à limpeza das pastas temporárias
+repositorio_transcricoes = RepositorioTranscricoes(PASTA_TEMP / "historico" / "transcricoes.db")
+# Pastas de trabalho dos pedidos: mídias pequenas em tmpfs, cota de disco (jobs e uploads entram na conta) e faxina
+armazenamento = GerenciadorArmazenamento(
+    PASTA_TEMP / "trabalho", contabilizar=(PASTA_TEMP / "jobs", PASTA_TEMP / "uploads"), legado=(PASTA_TEMP,)
+)
 
 # Templates
 templates = Jinja2Templates(directory="templates")
 
-# Funções existentes (reutilizadas)
-def _parse_json_safe(conteudo: str) -> Dict[str, Any]:
+# Geração de conteúdo compartilhada com o Streamlit (pipeline/conteudo.py), com o cliente assíncrono
+gerar_conteudo_social = functools.partial(gerar_conteudo_social_async, client)
+
+def backend_transcricao(nome: Optional[str] = None):
     try:
-        return json.loads(conteudo)
-    except json.JSONDecodeError:
-        return {}
-
-def gerar_conteudo_social(
-    transcricao: str,
-    plataforma: str = "Instagram",
-    tom: str = "engajador",
-    tamanho_legenda: str = "média",
-    qtd_hashtags: int = 15,
-) -> Dict[str, Any]:
-    if not isinstance(transcricao, str):
-        raise ValueError("transcricao inválida")
-    texto = transcricao.strip()
-    if not texto:
-        raise ValueError("transcricao vazia")
-    limite = 8000
-    if len(texto) > limite:
-        texto = texto[:limite]
-    plataformas_validas = [
-        "Instagram", "TikTok", "YouTube Shorts", "LinkedIn", "Facebook", "X/Twitter", "Threads"
-    ]
-    if plataforma not in plataformas_validas:
-        plataforma = "Instagram"
-    if tamanho_legenda not in ["curta", "média", "longa"]:
-        tamanho_legenda = "média"
-    if not isinstance(qtd_hashtags, int) or qtd_hashtags < 3:
-        qtd_hashtags = 10
-    if qtd_hashtags > 30:
-        qtd_hashtags = 30
-    instrucao = (
-        "Gere conteúdo para redes sociais em pt-BR com base na transcrição fornecida. "
-        "Adapte ao contexto da plataforma, mantendo alto potencial de engajamento e clareza. "
-        "Respeite o tamanho da legenda solicitado e a quantidade de hashtags. "
-        "Retorne exclusivamente um objeto JSON com as chaves: "
-        "titulo (string), legenda (string), hashtags (array de strings). "
-        f"plataforma={plataforma}; tom={tom}; tamanho_legenda={tamanho_legenda}; qtd_hashtags={qtd_hashtags}. "
-        "Use hashtags relevantes, em minúsculas e sem acentos, com prefixo '#', sem espaços. "
-        "Evite clickbait enganoso; foque no benefício e na curiosidade legítima."
-    )
-    modelo = os.getenv("OPENAI_CONTENT_MODEL", "gpt-4o-mini")
-    resp = client.chat.completions.create(
-        model=modelo,
-        response_format={"type": "json_object"},
-        messages=[
-            {"role": "system", "content": instrucao},
-            {"role": "user", "content": f"Transcrição:\n{texto}"},
-        ],
-        temperature=0.7,
-        max_tokens=600,
-    )
-    conteudo = (
-        resp.choices[0].message.content
-        if getattr(resp, "choices", None)
-        and getattr(resp.choices[0], "message", None)
-        and resp.choices[0].message.content
-        else ""
-    )
-    data = _parse_json_safe(conteudo)
-    titulo = str(data.get("titulo", "")).strip()
-    legenda = str(data.get("legenda", "")).strip()
-    hashtags_raw = data.get("hashtags", [])
-    hashtags_list: List[str] = []
-    if isinstance(hashtags_raw, str):
-        partes = [p.strip() for p in hashtags_raw.replace(",", " ").split()]
-        hashtags_list = [p if p.startswith("#") else f"#{p}" for p in partes if p]
-    elif isinstance(hashtags_raw, list):
-        limpos: List[str] = []
-        for h in hashtags_raw:
-            if not isinstance(h, str):
-                continue
-            h2 = h.strip().replace(" ", "")
-            if not h2:
-                continue
-            if not h2.startswith("#"):
-                h2 = f"#{h2}"
-            limpos.append(h2)
-        hashtags_list = limpos
-    vistos = set()
-    unicos: List[str] = []
-    for h in hashtags_list:
-        k = h.lower()
-        if k not in vistos:
-            vistos.add(k)
-            unicos.append(h)
-    hashtags_final = unicos[:qtd_hashtags]
-    if not titulo:
-        titulo = "Título sugerido"
-    if not legenda:
-        legenda = "Legenda sugerida."
-    return {"titulo": titulo, "legenda": legenda, "hashtags": hashtags_final}
-
-def transcreve_audio(arquivo, prompt: str = "") -> str:
+        return escolher_backend(backends_transcricao, nome)
+    except ErroTranscricao as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+
+def portao_transcricao(backend: Optional[str] = None) -> admissao.Portao:
+    """O motor local disputa a CPU, não a vazão da OpenAI: tem portão próprio."""
+    return admissao.local if backend_transcricao(backend).nome == "local" else admissao.api
+
+async def transcreve_audio(arquivo, prompt: str = "", backend: Optional[str] = None) -> str:
+    motor = backend_transcricao(backend)
     try:
-        transcript = client.audio.transcriptions.create(
-            model="whisper-1",
-            file=arquivo,
-            language="pt",
-            response_format="text",
-            prompt=prompt,
-        )
-        return transcript
+        return await motor.transcrever_async(arquivo, prompt)
+    except ErroTranscricao as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erro na transcrição: {str(e)}")
 
-def extrair_audio_com_ffmpeg(video_path: str, audio_path: str) -> tuple[bool, str]:
+def salvar_upload(origem, destino: Path, hasher) -> int:
+    with open(destino, "wb") as f:
+        return copiar_com_hash(origem, f, hasher)
+
+async def salvar_arquivo_enviado(
+    arquivo: UploadFile, pasta: Path, hasher, tempos: Optional[Dict[str, float]] = None
+) -> Path:
+    if arquivo.size and arquivo.size > 1024 * 1024 * 1024:  # 1GB
+        raise HTTPException(status_code=413, detail="Arquivo maior que 1GB.")
+    suffix = Path(arquivo.filename).suffix if arquivo.filename else ".tmp"
+    arquivo_path = Path(pasta) / f"upload{suffix}"
+    with metricas.medir("upload", tempos):
+        copiados = await asyncio.to_thread(salvar_upload, arquivo.file, arquivo_path, hasher)
+    metricas.registrar_bytes("upload", entrada=copiados)
+    return arquivo_path
+
+def validar_url(url: Optional[str]) -> str:
+    if not url or not url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="URL inválida.")
+    return url
+
+async def baixar_midia(url: str, pasta: Path, hasher, tempos: Optional[Dict[str, float]] = None) -> Path:
+    # Segmentos paralelos com retomada; a extensão vem do conteúdo, não do texto da URL
+    try:
+        with metricas.medir("download", tempos):
+            baixado = await asyncio.to_thread(baixar_url, url, Path(pasta) / "download", hasher)
+    except ErroDownload as e:
+        raise HTTPException(status_code=e.status, detail=f"Falha ao baixar arquivo da URL: {e}")
+    metricas.registrar_bytes("download", entrada=baixado["bytes"])
+    return baixado["caminho"]
+
+async def registrar_historico(
+    chave: str, origem: str, hash_midia: str, prompt: str, modelo: str, transcricao: str, conteudo: Dict[str, Any]
+) -> Optional[int]:
+    """Grava no histórico; uma falha do SQLite (contada em `transcricao_erros_total`) não derruba o pedido."""
     try:
-        (
-            ffmpeg
-            .input(video_path)
-            .output(audio_path, acodec="mp3")
-            .overwrite_output()
-            .run(capture_stdout=True, capture_stderr=True)
+        with metricas.medir("historico"):
+            return await asyncio.to_thread(
+                repositorio_transcricoes.salvar, chave, origem or hash_midia[:12], hash_midia, prompt, modelo,
+                transcricao, conteudo,
+            )
+    except sqlite3.Error:
+        return None
+
+def _sem_notificacao(etapa: str) -> None:
+    pass
+
+def _sem_eventos(tipo: str, dados: Dict[str, Any]) -> None:
+    pass
+
+async def processar_midia(
+    arquivo_path: Path,
+    pasta: Path,
+    hash_midia: str,
+    prompt: str,
+    plataforma: str,
+    tom: str,
+    tamanho_legenda: str,
+    qtd_hashtags: int,
+    notificar: Callable[[str], None] = _sem_notificacao,
+    emitir: Callable[[str, Dict[str, Any]], None] = _sem_eventos,
+    alvos: Optional[Dict[str, Dict[str, Any]]] = None,
+    tempos: Optional[Dict[str, float]] = None,
+    limitar_fila: bool = True,
+    backend: Optional[str] = None,
+    origem: str = "",
+) -> Dict[str, Any]:
+    """Extrai o áudio (se vídeo), transcreve e gera o conteúdo social de uma mídia já em disco.
+
+    `notificar(etapa)` recebe as mudanças de etapa; `emitir(tipo, dados)`
+    recebe eventos finos (progresso do FFmpeg, trechos da transcrição e
+    tokens do conteúdo) para quem faz streaming. Com `alvos`
+    ({plataforma: ajustes}), gera o conteúdo de todas as plataformas em
+    paralelo e retorna `conteudos` no lugar de `conteudo_social`.
+    `tempos` recebe a duração de cada etapa (já pode trazer upload/download)
+    e volta no resultado, junto com a espera por vagas (`fila_extracao`,
+    `fila_api`). Com `limitar_fila=False` (jobs) a espera por vaga não tem
+    limite; nas rotas síncronas a fila cheia vira ErroAdmissao (503).
+    `backend` escolhe o motor de transcrição (vazio = `TRANSCRICAO_BACKEND`).
+    O resultado fica no histórico pesquisável (`transcript_id`), identificado
+    por `origem` (nome do arquivo ou URL).
+    """
+    tempos = {} if tempos is None else tempos
+    with metricas.em_andamento.acompanhar():
+        resultado = await _processar_midia(
+            arquivo_path, pasta, hash_midia, prompt, plataforma, tom, tamanho_legenda, qtd_hashtags,
+            notificar, emitir, alvos, tempos, limitar_fila, backend, origem,
+        )
+    resultado["tempos"] = tempos
+    return resultado
+
+async def _processar_midia(
+    arquivo_path: Path,
+    pasta: Path,
+    hash_midia: str,
+    prompt: str,
+    plataforma: str,
+    tom: str,
+    tamanho_legenda: str,
+    qtd_hashtags: int,
+    notificar: Callable[[str], None],
+    emitir: Callable[[str, Dict[str, Any]], None],
+    alvos: Optional[Dict[str, Dict[str, Any]]],
+    tempos: Dict[str, float],
+    limitar_fila: bool,
+    backend: Optional[str],
+    origem: str,
+) -> Dict[str, Any]:
+    # Cache: mesma mídia + prompt + idioma + modelo dispensa FFmpeg e Whisper
+    ext = arquivo_path.suffix.lower()
+    motor = backend_transcricao(backend)
+    chave_cache = cache.chave(hash_midia, prompt, IDIOMA_TRANSCRICAO, motor.modelo)
+    transcricao = await asyncio.to_thread(cache.obter, chave_cache)
+    cache_hit = transcricao is not None
+    if cache_hit:
+        arquivo_transcrever = None
+    elif ext in [".mp4", ".mov", ".avi", ".mkv", ".webm"]:
+        # Vídeo: extrair áudio
+        notificar("extraindo")
+        async with admissao.extracao.vaga(tempos, limitar_fila):
+            with metricas.medir("extracao", tempos):
+                sucesso, erro, audio_path = await extrair_audio_com_ffmpeg(
+                    str(arquivo_path),
+                    str(Path(pasta) / "audio"),
+                    lambda fracao: emitir("progresso", {"etapa": "extraindo", "fracao": round(fracao, 3)}),
+                )
+                if not sucesso:
+                    raise HTTPException(status_code=500, detail=f"Erro ao extrair áudio: {erro}")
+        arquivo_transcrever = Path(audio_path)
+        metricas.registrar_bytes(
+            "extracao", entrada=arquivo_path.stat().st_size, saida=arquivo_transcrever.stat().st_size
+        )
+    elif ext in [".mp3", ".wav", ".m4a", ".ogg"]:
+        # Áudio direto
+        arquivo_transcrever = arquivo_path
+    else:
+        raise HTTPException(status_code=400, detail="Formato não suportado.")
+    
+    # Remover silêncios longos (VAD local) antes de pagar pelo Whisper
+    vad: Optional[Dict[str, Any]] = None
+    if not cache_hit:
+        notificar("removendo_silencios")
+        entrada_vad = arquivo_transcrever.stat().st_size
+        try:
+            async with admissao.extracao.vaga(tempos, limitar_fila):
+                with metricas.medir("vad", tempos):
+                    vad = await aparar_silencios_async(str(arquivo_transcrever), str(Path(pasta) / "audio_vad"))
+        except RuntimeError as e:
+            # Sem VAD o pipeline continua com o áudio original
+            vad = {"aplicado": False, "erro": str(e)}
+        else:
+            arquivo_transcrever = Path(vad.pop("caminho"))
+            metricas.registrar_bytes("vad", entrada=entrada_vad, saida=arquivo_transcrever.stat().st_size)
+    
+    # Transcrever (em partes paralelas quando passar do limite do Whisper)
+    if not cache_hit:
+        notificar("transcrevendo")
+        if vad and "duracao_final_s" in vad:
+            metricas.duracao_audio.observar(vad["duracao_final_s"])
+        try:
+            async with portao_transcricao(motor.nome).vaga(tempos, limitar_fila):
+                with metricas.medir("transcricao", tempos):
+                    transcricao = await transcrever_em_partes_async(
+                        str(arquivo_transcrever),
+                        prompt,
+                        functools.partial(transcreve_audio, backend=motor.nome),
+                        ao_concluir_parte=lambda indice, total, texto: emitir(
+                            "parte", {"indice": indice, "total": total, "texto": texto}
+                        ),
+                        # O pedido já foi admitido: os cortes esperam a vez em vez de rejeitá-lo no meio
+                        vaga_extracao=lambda: admissao.extracao.vaga(tempos, limitar_fila=False),
+                    )
+        except ErroAdmissao:
+            raise
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=f"Erro na transcrição: {str(e)}")
+        metricas.registrar_bytes(
+            "transcricao", entrada=arquivo_transcrever.stat().st_size, saida=len(transcricao.encode("utf-8"))
+        )
+        await asyncio.to_thread(cache.guardar, chave_cache, transcricao, arquivo_path.stat().st_size)
+    
+    # Gerar conteúdo social
+    notificar("gerando")
+    if alvos:
+        async with admissao.api.vaga(tempos, limitar_fila):
+            with metricas.medir("geracao", tempos):
+                multiplataforma = await gerar_multiplataforma_async(
+                    client, transcricao, alvos, gerar_conteudo_social
+                )
+        resultado = {
+            "transcricao": transcricao,
+            "conteudos": multiplataforma["conteudos"],
+            "cache_hit": cache_hit,
+            "vad": vad,
+            "uso_tokens": multiplataforma["uso_tokens"],
+        }
+        resultado["transcript_id"] = await registrar_historico(
+            chave_cache, origem, hash_midia, prompt, motor.modelo, transcricao, {"conteudos": resultado["conteudos"]}
         )
-        return True, ""
-    except ffmpeg.Error as e:
-        return False, e.stderr.decode() if e.stderr else str(e)
+        return resultado
+    async with admissao.api.vaga(tempos, limitar_fila):
+        with metricas.medir("geracao", tempos):
+            conteudo_social = await gerar_conteudo_social(
+                transcricao,
+                plataforma,
+                tom,
+                tamanho_legenda,
+                qtd_hashtags,
+                ao_token=(lambda token: emitir("token", {"texto": token})) if emitir is not _sem_eventos else None,
+            )
+    uso_tokens = conteudo_social.pop("uso_tokens")
+    
+    return {
+        "transcricao": transcricao,
+        "conteudo_social": conteudo_social,
+        "cache_hit": cache_hit,
+        "vad": vad,
+        "uso_tokens": uso_tokens,
+        "transcript_id": await registrar_historico(
+            chave_cache, origem, hash_midia, prompt, motor.modelo, transcricao, {"conteudo_social": conteudo_social}
+        ),
+    }
+
+# Jobs em segundo plano
+PASTA_JOBS = PASTA_TEMP / "jobs"
 
-def baixar_arquivo_url(url: str, destino: Path) -> bool:
+async def executar_job(job: Dict[str, Any], notificar: Callable[[str], None]) -> Dict[str, Any]:
+    params = job["params"]
+    pasta = PASTA_JOBS / job["id"]
+    pasta.mkdir(parents=True, exist_ok=True)
+    tempos: Dict[str, float] = {}
+    if job["caminho_midia"]:
+        arquivo_path = Path(job["caminho_midia"])
+        if not arquivo_path.exists():
+            raise HTTPException(status_code=400, detail="Arquivo do job não encontrado.")
+        # A mídia já está na pasta; falta o espaço do áudio extraído e do áudio sem silêncios
+        a_gravar: Optional[int] = int(arquivo_path.stat().st_size * max(0.0, FATOR_RESERVA - 1))
+    elif not params["url"]:
+        raise HTTPException(status_code=400, detail="Upload do job não foi concluído.")
+    else:
+        a_gravar = None
+    # Download e processamento gravam na pasta do job: reserva na cota, esperando sem prazo como as vagas
+    reserva = await armazenamento.reservar_async(pasta, a_gravar, tempos, limitar_espera=False)
     try:
-        import requests
-        response = requests.get(url, stream=True, timeout=60)
-        response.raise_for_status()
-        with open(destino, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
-        return True
-    except Exception as e:
-        print(f"Erro ao baixar {url}: {e}")
-        return False
+        if job["caminho_midia"]:
+            hash_midia = job["hash_midia"]
+        else:
+            notificar("baixando")
+            hasher = hashlib.sha256()
+            arquivo_path = await baixar_midia(params["url"], pasta, hasher, tempos)
+            hash_midia = hasher.hexdigest()
+        return await processar_midia(
+            arquivo_path,
+            pasta,
+            hash_midia,
+            params["prompt"],
+            params["plataforma"],
+            params["tom"],
+            params["tamanho_legenda"],
+            params["qtd_hashtags"],
+            notificar,
+            alvos=params.get("alvos"),
+            tempos=tempos,
+            # O job já esperou na fila de jobs: aguarda a vaga em vez de falhar com 503
+            limitar_fila=False,
+            backend=params.get("backend"),
+            origem=params.get("origem") or params["url"] or "",
+        )
+    finally:
+        reserva.fechar()
+
+def limpar_job(job: Dict[str, Any]) -> None:
+    shutil.rmtree(PASTA_JOBS / job["id"], ignore_errors=True)
+
+repositorio_jobs = RepositorioJobs(PASTA_JOBS / "jobs.db")
+fila_jobs = FilaJobs(
+    repositorio_jobs,
+    executar_job,
+    limpar_job,
+    max_workers=int(os.getenv("JOBS_MAX_WORKERS", "2")),
+)
+
+# Uploads em partes (retomáveis); finalizar vira um job
+repositorio_uploads = RepositorioUploads(PASTA_TEMP / "uploads")
+
+tarefa_faxina: Optional["asyncio.Task[None]"] = None
+
+@app.on_event("startup")
+async def iniciar_fila_jobs():
+    global tarefa_faxina
+    await asyncio.to_thread(repositorio_uploads.expirar)
+    await fila_jobs.iniciar()
+    # Sobras de processos que caíram saem logo na primeira passada
+    tarefa_faxina = asyncio.create_task(faxina_periodica(armazenamento))
+    if sob_demanda.PRE_CARREGAR:
+        # Em segundo plano: a aplicação já aceita requisições enquanto o SDK e o NumPy carregam
+        asyncio.get_running_loop().run_in_executor(
+            None, sob_demanda.pre_carregar, sob_demanda.openai, sob_demanda.numpy, sob_demanda.requests, client
+        )
+
+@app.on_event("shutdown")
+async def parar_fila_jobs():
+    if tarefa_faxina is not None:
+        tarefa_faxina.cancel()
+    await fila_jobs.parar()
+
+@app.exception_handler(ErroAdmissao)
+async def recusar_por_capacidade(request: Request, e: ErroAdmissao):
+    return JSONResponse(
+        status_code=e.status,
+        content={"detail": str(e)},
+        headers={"Retry-After": str(e.retry_after)} if e.retry_after else None,
+    )
+
+def verificar_capacidade(backend: Optional[str] = None) -> None:
+    """Recusa com 503 antes de receber o upload se alguma fila de admissão estiver cheia."""
+    admissao.extracao.verificar()
+    admissao.api.verificar()
+    portao_transcricao(backend).verificar()
+
+async def transcrever_coalescido(
+    arquivo: Optional[UploadFile],
+    url: Optional[str],
+    prompt: str,
+    plataforma: str,
+    tom: str,
+    tamanho_legenda: str,
+    qtd_hashtags: int,
+    alvos: Optional[Dict[str, Dict[str, Any]]] = None,
+    backend: str = "",
+) -> Dict[str, Any]:
+    """Recebe/baixa a mídia e processa, juntando pedidos idênticos em andamento.
+
+    A chave é a URL normalizada (antes de baixar) ou o SHA-256 do upload,
+    mais prompt, idioma, modelo e parâmetros do conteúdo. Quem chega com um
+    processamento igual em andamento recebe o mesmo resultado com
+    `coalescido: true`. A área de trabalho passa a ser do processamento
+    compartilhado assim que ele começa: é ele quem a fecha ao terminar. Para
+    URLs, só quem abre o voo reserva espaço (quem se junta não baixa nada).
+    """
+    motor = backend_transcricao(backend)
+    parametros = {
+        "prompt": prompt, "idioma": IDIOMA_TRANSCRICAO, "backend": motor.nome, "modelo": motor.modelo,
+        "plataforma": plataforma, "tom": tom, "tamanho_legenda": tamanho_legenda, "qtd_hashtags": qtd_hashtags,
+        "alvos": alvos,
+    }
+    hasher = hashlib.sha256()
+    tempos: Dict[str, float] = {}
+    area: Optional[Area] = None
+    pasta_cedida = False
+
+    async def _processar(arquivo_path: Optional[Path]) -> Dict[str, Any]:
+        nonlocal area
+        try:
+            if arquivo_path is None:
+                area = await armazenamento.abrir_async(None, tempos)
+                arquivo_path = await baixar_midia(url, area.pasta, hasher, tempos)
+            return await processar_midia(
+                arquivo_path, area.pasta, hasher.hexdigest(), prompt, plataforma, tom, tamanho_legenda, qtd_hashtags,
+                alvos=alvos, tempos=tempos, backend=backend, origem=arquivo.filename if arquivo else url,
+            )
+        finally:
+            if area is not None:
+                await asyncio.to_thread(area.fechar)
+
+    def _iniciar(arquivo_path: Optional[Path]) -> Awaitable[Dict[str, Any]]:
+        nonlocal pasta_cedida
+        pasta_cedida = True
+        return _processar(arquivo_path)
+
+    try:
+        if arquivo:
+            area = await armazenamento.abrir_async(arquivo.size, tempos)
+            arquivo_path = await salvar_arquivo_enviado(arquivo, area.pasta, hasher, tempos)
+            chave_voo = coalescencia.chave(f"sha256:{hasher.hexdigest()}", parametros)
+            resultado, coalescido = await coalescencia.coalescedor.executar(
+                chave_voo, lambda: _iniciar(arquivo_path), "upload"
+            )
+        else:
+            url = validar_url(url)
+            chave_voo = coalescencia.chave(f"url:{coalescencia.normalizar_url(url)}", parametros)
+            resultado, coalescido = await coalescencia.coalescedor.executar(chave_voo, lambda: _iniciar(None), "url")
+    finally:
+        if not pasta_cedida and area is not None:
+            await asyncio.to_thread(area.fechar)
+    return {**resultado, "coalescido": True} if coalescido else resultado
 
 # Rotas
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+    return templates.TemplateResponse(request, "index.html")
 
 @app.post("/transcrever")
 async def transcrever(
@@ -173,73 +480,469 @@ async def transcrever(
     tom: str = Form("engajador"),
     tamanho_legenda: str = Form("média"),
     qtd_hashtags: int = Form(15),
+    backend: str = Form(""),
 ):
     if not arquivo and not url:
         raise HTTPException(status_code=400, detail="Envie um arquivo ou uma URL.")
+    backend_transcricao(backend)
+    verificar_capacidade(backend)
     
-    temp_dir = tempfile.mkdtemp(dir=PASTA_TEMP)
+    return await transcrever_coalescido(
+        arquivo, url, prompt, plataforma, tom, tamanho_legenda, qtd_hashtags, backend=backend
+    )
+
+def _alvos_formulario(
+    plataformas: Optional[str], configuracoes: str, tom: str, tamanho_legenda: str, qtd_hashtags: int
+) -> Dict[str, Dict[str, Any]]:
     try:
-        # Determinar tipo e caminho do arquivo
-        if arquivo:
-            # Upload direto
-            if arquivo.size and arquivo.size > 1024 * 1024 * 1024:  # 1GB
-                raise HTTPException(status_code=413, detail="Arquivo maior que 1GB.")
-            suffix = Path(arquivo.filename).suffix if arquivo.filename else ".tmp"
-            arquivo_path = Path(temp_dir) / f"upload{suffix}"
-            with open(arquivo_path, "wb") as f:
-                shutil.copyfileobj(arquivo.file, f)
-        else:
-            # Download por URL
-            if not url or not url.startswith(("http://", "https://")):
-                raise HTTPException(status_code=400, detail="URL inválida.")
-            # Tentar inferir sufixo pela URL
-            suffix = ".mp4"  # padrão
-            if any(ext in url.lower() for ext in [".mp3", ".wav", ".m4a", ".ogg"]):
-                suffix = ".mp3"
-            elif any(ext in url.lower() for ext in [".mp4", ".mov", ".avi", ".mkv", ".webm"]):
-                suffix = ".mp4"
-            arquivo_path = Path(temp_dir) / f"download{suffix}"
-            if not baixar_arquivo_url(url, arquivo_path):
-                raise HTTPException(status_code=400, detail="Falha ao baixar arquivo da URL.")
-        
-        # Verificar se é vídeo ou áudio
-        ext = arquivo_path.suffix.lower()
-        if ext in [".mp4", ".mov", ".avi", ".mkv", ".webm"]:
-            # Vídeo: extrair áudio
-            audio_path = Path(temp_dir) / "audio.mp3"
-            sucesso, erro = extrair_audio_com_ffmpeg(str(arquivo_path), str(audio_path))
-            if not sucesso:
-                raise HTTPException(status_code=500, detail=f"Erro ao extrair áudio: {erro}")
-            arquivo_transcrever = audio_path
-        elif ext in [".mp3", ".wav", ".m4a", ".ogg"]:
-            # Áudio direto
-            arquivo_transcrever = arquivo_path
-        else:
-            raise HTTPException(status_code=400, detail="Formato não suportado.")
-        
-        # Transcrever
-        with open(arquivo_transcrever, "rb") as f:
-            transcricao = transcreve_audio(f, prompt)
-        
-        # Gerar conteúdo social
-        conteudo_social = gerar_conteudo_social(
-            transcricao,
-            plataforma,
-            tom,
-            tamanho_legenda,
+        return normalizar_alvos(plataformas, configuracoes, tom, tamanho_legenda, qtd_hashtags)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.post("/transcrever/multiplataforma")
+async def transcrever_multiplataforma(
+    arquivo: Optional[UploadFile] = File(None),
+    url: Optional[str] = Form(None),
+    prompt: str = Form(""),
+    plataformas: str = Form(""),
+    configuracoes: str = Form(""),
+    tom: str = Form("engajador"),
+    tamanho_legenda: str = Form("média"),
+    qtd_hashtags: int = Form(15),
+    backend: str = Form(""),
+):
+    """Transcreve uma vez e gera o conteúdo de várias plataformas em paralelo.
+
+    `plataformas`: lista separada por vírgulas ou JSON (vazio = todas).
+    `configuracoes`: JSON {plataforma: {tom, tamanho_legenda, qtd_hashtags}}
+    que sobrescreve os valores padrão do formulário.
+    """
+    if not arquivo and not url:
+        raise HTTPException(status_code=400, detail="Envie um arquivo ou uma URL.")
+    alvos = _alvos_formulario(plataformas, configuracoes, tom, tamanho_legenda, qtd_hashtags)
+    backend_transcricao(backend)
+    verificar_capacidade(backend)
+    
+    return await transcrever_coalescido(
+        arquivo, url, prompt, next(iter(alvos)), tom, tamanho_legenda, qtd_hashtags, alvos=alvos, backend=backend
+    )
+
+def comando_extracao_stdin(pasta: Path) -> tuple[List[str], str]:
+    # Sem ffprobe possível num pipe: sempre reencoda no perfil configurado
+    return comando_extracao("pipe:0", str(pasta / "audio"))
+
+@app.post("/transcrever/direto")
+async def transcrever_direto(request: Request):
+    """Upload multipart (campos iguais aos de `/transcrever`, sem URL) com extração em streaming.
+
+    WebM/MKV e MP4/MOV "faststart" são enviados ao stdin do FFmpeg conforme
+    chegam; os demais formatos são gravados em disco e seguem o fluxo normal.
+    """
+    content_type = request.headers.get("content-type", "")
+    if not content_type.startswith("multipart/form-data"):
+        raise HTTPException(status_code=400, detail="Envie o arquivo como multipart/form-data.")
+    verificar_capacidade()
+    
+    hasher = hashlib.sha256()
+    tempos: Dict[str, float] = {}
+    # Content-Length inclui os campos do formulário: estimativa um pouco acima do arquivo
+    tamanho = request.headers.get("content-length")
+    area = await armazenamento.abrir_async(int(tamanho) if tamanho and tamanho.isdigit() else None, tempos)
+    temp_dir = area.pasta
+    try:
+        try:
+            # Upload e extração em streaming acontecem juntos e contam como "upload"; a vaga de
+            # extração só é ocupada se o FFmpeg começar a ler o stream (um upload lento gravado
+            # em disco não segura núcleo nenhum)
+            with metricas.medir("upload", tempos):
+                recebido = await receber_em_streaming(
+                    content_type,
+                    request.stream(),
+                    temp_dir,
+                    hasher,
+                    comando_extracao_stdin,
+                    limite_bytes=1024 * 1024 * 1024,  # 1GB
+                    vaga_extracao=lambda: admissao.extracao.vaga(tempos),
+                )
+        except ErroAdmissao:
+            raise
+        except OverflowError:
+            raise HTTPException(status_code=413, detail="Arquivo maior que 1GB.")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except RuntimeError as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        campos = recebido["campos"]
+        backend = campos.get("backend", "")
+        backend_transcricao(backend)
+        try:
+            qtd_hashtags = int(campos.get("qtd_hashtags", 15))
+        except ValueError:
+            qtd_hashtags = 15
+        resultado = await processar_midia(
+            recebido["audio_path"] or recebido["arquivo_path"],
+            temp_dir,
+            hasher.hexdigest(),
+            campos.get("prompt", ""),
+            campos.get("plataforma", "Instagram"),
+            campos.get("tom", "engajador"),
+            campos.get("tamanho_legenda", "média"),
             qtd_hashtags,
+            tempos=tempos,
+            backend=backend,
+            origem=recebido["nome_arquivo"],
         )
-        
-        return {
-            "transcricao": transcricao,
-            "conteudo_social": conteudo_social,
-        }
+        resultado["extracao_streaming"] = recebido["streaming"]
+        return resultado
     finally:
-        # Limpar temp
+        await asyncio.to_thread(area.fechar)
+
+def _evento_sse(tipo: str, dados: Dict[str, Any]) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(dados, ensure_ascii=False)}\n\n"
+
+@app.post("/transcrever/stream")
+async def transcrever_stream(
+    arquivo: Optional[UploadFile] = File(None),
+    url: Optional[str] = Form(None),
+    prompt: str = Form(""),
+    plataforma: str = Form("Instagram"),
+    tom: str = Form("engajador"),
+    tamanho_legenda: str = Form("média"),
+    qtd_hashtags: int = Form(15),
+    plataformas: Optional[str] = Form(None),
+    configuracoes: str = Form(""),
+    backend: str = Form(""),
+):
+    """Mesmo pipeline de `/transcrever`, com eventos Server-Sent Events em tempo real.
+
+    Eventos: `etapa`, `progresso` (FFmpeg), `parte` (trecho transcrito),
+    `token` (conteúdo social em streaming), `resultado` e `erro`.
+    Com `plataformas` (ou `configuracoes`), o resultado traz `conteudos` por
+    plataforma, como em `/transcrever/multiplataforma`, sem eventos `token`.
+    """
+    if not arquivo and not url:
+        raise HTTPException(status_code=400, detail="Envie um arquivo ou uma URL.")
+    if not arquivo:
+        validar_url(url)
+    alvos = (
+        _alvos_formulario(plataformas, configuracoes, tom, tamanho_legenda, qtd_hashtags)
+        if plataformas is not None or configuracoes
+        else None
+    )
+    backend_transcricao(backend)
+    verificar_capacidade(backend)
+    
+    hasher = hashlib.sha256()
+    tempos: Dict[str, float] = {}
+    area = await armazenamento.abrir_async(arquivo.size if arquivo else None, tempos)
+    temp_dir = area.pasta
+    arquivo_path: Optional[Path] = None
+    if arquivo:
+        # O upload já foi recebido pelo servidor; salvar antes de abrir o stream
+        try:
+            arquivo_path = await salvar_arquivo_enviado(arquivo, temp_dir, hasher, tempos)
+        except BaseException:
+            area.fechar()
+            raise
+    
+    fila: "asyncio.Queue[Optional[str]]" = asyncio.Queue()
+    
+    def emitir(tipo: str, dados: Dict[str, Any]) -> None:
+        fila.put_nowait(_evento_sse(tipo, dados))
+    
+    def notificar(etapa: str) -> None:
+        emitir("etapa", {"etapa": etapa})
+    
+    async def executar() -> None:
+        nonlocal arquivo_path
+        try:
+            if arquivo_path is None:
+                notificar("baixando")
+                arquivo_path = await baixar_midia(url, temp_dir, hasher, tempos)
+            resultado = await processar_midia(
+                arquivo_path,
+                temp_dir,
+                hasher.hexdigest(),
+                prompt,
+                plataforma,
+                tom,
+                tamanho_legenda,
+                qtd_hashtags,
+                notificar,
+                emitir,
+                alvos=alvos,
+                tempos=tempos,
+                backend=backend,
+                origem=arquivo.filename if arquivo else url,
+            )
+            emitir("resultado", resultado)
+        except ErroAdmissao as e:
+            emitir("erro", {"detail": str(e), "status": e.status, "retry_after": e.retry_after})
+        except HTTPException as e:
+            emitir("erro", {"detail": e.detail})
+        except Exception as e:
+            emitir("erro", {"detail": str(e)})
+        finally:
+            await asyncio.to_thread(area.fechar)
+            fila.put_nowait(None)
+    
+    async def eventos():
+        tarefa = asyncio.create_task(executar())
+        try:
+            while True:
+                evento = await fila.get()
+                if evento is None:
+                    break
+                yield evento
+        finally:
+            # Cliente desconectou: interrompe o pipeline (e o FFmpeg em andamento)
+            if not tarefa.done():
+                tarefa.cancel()
+    
+    return StreamingResponse(
+        eventos(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.post("/jobs", status_code=202)
+async def criar_job(
+    arquivo: Optional[UploadFile] = File(None),
+    url: Optional[str] = Form(None),
+    prompt: str = Form(""),
+    plataforma: str = Form("Instagram"),
+    tom: str = Form("engajador"),
+    tamanho_legenda: str = Form("média"),
+    qtd_hashtags: int = Form(15),
+    backend: str = Form(""),
+):
+    if not arquivo and not url:
+        raise HTTPException(status_code=400, detail="Envie um arquivo ou uma URL.")
+    backend_transcricao(backend)
+    params = {
+        "url": None if arquivo else validar_url(url),
+        "prompt": prompt,
+        "plataforma": plataforma,
+        "tom": tom,
+        "tamanho_legenda": tamanho_legenda,
+        "qtd_hashtags": qtd_hashtags,
+        "backend": backend,
+        "origem": arquivo.filename if arquivo else url,
+    }
+    job_id = await asyncio.to_thread(repositorio_jobs.criar, params)
+    if arquivo:
+        # O upload fica na pasta do job para sobreviver a um reinício do worker
+        pasta = PASTA_JOBS / job_id
+        pasta.mkdir(parents=True, exist_ok=True)
+        hasher = hashlib.sha256()
+        try:
+            # A pasta do job entra na cota de disco: reserva (ou espera, ou 503) como as áreas de trabalho
+            reserva = await armazenamento.reservar_async(pasta, arquivo.size)
+            try:
+                arquivo_path = await salvar_arquivo_enviado(arquivo, pasta, hasher)
+            finally:
+                reserva.fechar()
+        except BaseException:
+            await asyncio.to_thread(repositorio_jobs.falhar, job_id, "Falha ao receber o arquivo.")
+            shutil.rmtree(pasta, ignore_errors=True)
+            raise
+        await asyncio.to_thread(repositorio_jobs.anexar_midia, job_id, hasher.hexdigest(), str(arquivo_path))
+    fila_jobs.enviar(job_id)
+    return {"id": job_id, "etapa": ETAPA_NA_FILA}
+
+async def _executar_upload(funcao: Callable[..., Any], *args: Any) -> Any:
+    try:
+        return await asyncio.to_thread(funcao, *args)
+    except ErroUpload as e:
+        raise HTTPException(status_code=e.status, detail=str(e))
+
+def _estado_upload(upload: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        campo: upload[campo]
+        for campo in (
+            "id", "nome", "tamanho", "tamanho_parte", "total_partes", "recebidas", "bytes_recebidos", "offset"
+        )
+    }
+
+@app.post("/uploads", status_code=201)
+async def criar_upload(request: Request):
+    """Inicia um upload em partes: JSON {nome, tamanho, sha256 (opcional, do arquivo inteiro)}."""
+    try:
+        corpo = await request.json()
+        nome, tamanho = str(corpo["nome"]), int(corpo["tamanho"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Informe nome e tamanho do arquivo.")
+    # O arquivo não é pré-alocado: a cota é conferida aqui, antes de aceitar as partes
+    await asyncio.to_thread(armazenamento.verificar, tamanho)
+    upload = await _executar_upload(repositorio_uploads.criar, nome, tamanho, corpo.get("sha256"))
+    return _estado_upload(upload)
+
+TAMANHO_BLOCO_PARTE = 1024 * 1024
+
+@app.put("/uploads/{upload_id}/partes/{indice}")
+async def enviar_parte(upload_id: str, indice: int, request: Request):
+    """Recebe a parte `indice` (corpo bruto); `X-Checksum-SHA256` é conferido quando enviado."""
+    upload = await asyncio.to_thread(repositorio_uploads.obter, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload não encontrado.")
+    # O arquivo cresce a cada parte: reserva na cota, com a mesma contrapressão das áreas de trabalho
+    reserva = await armazenamento.reservar_async(
+        repositorio_uploads.caminho_dados(upload_id).parent, upload["tamanho_parte"]
+    )
+    try:
+        gravacao = await _executar_upload(repositorio_uploads.abrir_parte, upload_id, indice)
         try:
-            shutil.rmtree(temp_dir)
-        except:
-            pass
+            # Blocos vão direto para a posição da parte no arquivo; em memória fica só um buffer
+            buffer = bytearray()
+            with metricas.medir("upload"):
+                async for bloco in request.stream():
+                    buffer += bloco
+                    if len(buffer) >= TAMANHO_BLOCO_PARTE:
+                        await _executar_upload(gravacao.escrever, buffer)
+                        buffer.clear()
+                if buffer:
+                    await _executar_upload(gravacao.escrever, buffer)
+                parte = await _executar_upload(gravacao.concluir, request.headers.get("x-checksum-sha256"))
+        except BaseException:
+            gravacao.descartar()
+            raise
+    finally:
+        reserva.fechar()
+    metricas.registrar_bytes("upload", entrada=parte["tamanho"])
+    return parte
+
+@app.get("/uploads/{upload_id}")
+async def consultar_upload(upload_id: str):
+    """Partes já recebidas e `offset` contíguo, para retomar um upload interrompido."""
+    upload = await asyncio.to_thread(repositorio_uploads.obter, upload_id)
+    if upload is None:
+        raise HTTPException(status_code=404, detail="Upload não encontrado.")
+    return _estado_upload(upload)
+
+@app.post("/uploads/{upload_id}/finalizar", status_code=202)
+async def finalizar_upload(
+    upload_id: str,
+    prompt: str = Form(""),
+    plataforma: str = Form("Instagram"),
+    tom: str = Form("engajador"),
+    tamanho_legenda: str = Form("média"),
+    qtd_hashtags: int = Form(15),
+    plataformas: Optional[str] = Form(None),
+    configuracoes: str = Form(""),
+    backend: str = Form(""),
+):
+    """Confere as partes, move o arquivo para a pasta do job (sem copiar) e enfileira o job."""
+    params: Dict[str, Any] = {
+        "url": None,
+        "prompt": prompt,
+        "plataforma": plataforma,
+        "tom": tom,
+        "tamanho_legenda": tamanho_legenda,
+        "qtd_hashtags": qtd_hashtags,
+        "backend": backend,
+    }
+    backend_transcricao(backend)
+    if plataformas or configuracoes:
+        params["alvos"] = _alvos_formulario(plataformas, configuracoes, tom, tamanho_legenda, qtd_hashtags)
+    upload = await _executar_upload(repositorio_uploads.verificar, upload_id)
+    params["origem"] = upload["nome"]
+    job_id = await asyncio.to_thread(repositorio_jobs.criar, params)
+    hasher = hashlib.sha256()
+    try:
+        arquivo_path = await _executar_upload(
+            repositorio_uploads.concluir, upload_id, PASTA_JOBS / job_id / "upload", hasher
+        )
+    except BaseException:
+        await asyncio.to_thread(repositorio_jobs.falhar, job_id, "Upload incompleto.")
+        shutil.rmtree(PASTA_JOBS / job_id, ignore_errors=True)
+        raise
+    await asyncio.to_thread(repositorio_jobs.anexar_midia, job_id, hasher.hexdigest(), str(arquivo_path))
+    fila_jobs.enviar(job_id)
+    return {"id": job_id, "etapa": ETAPA_NA_FILA}
+
+@app.delete("/uploads/{upload_id}")
+async def cancelar_upload(upload_id: str):
+    if not await asyncio.to_thread(repositorio_uploads.remover, upload_id):
+        raise HTTPException(status_code=404, detail="Upload não encontrado.")
+    return {"id": upload_id, "cancelado": True}
+
+@app.get("/jobs/{job_id}")
+async def consultar_job(job_id: str):
+    job = await asyncio.to_thread(repositorio_jobs.obter, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado.")
+    return {
+        "id": job["id"],
+        "etapa": job["etapa"],
+        "tempos": job["tempos"],
+        "resultado": job["resultado"],
+        "erro": job["erro"],
+        "criado": job["criado"],
+        "atualizado": job["atualizado"],
+    }
+
+@app.post("/jobs/{job_id}/cancel")
+async def cancelar_job(job_id: str):
+    if not await fila_jobs.cancelar(job_id):
+        raise HTTPException(status_code=404, detail="Job não encontrado ou já finalizado.")
+    return {"id": job_id, "cancelado": True}
+
+@app.get("/transcripts")
+async def buscar_transcricoes(q: str = "", limite: int = LIMITE_HISTORICO, cursor: Optional[str] = None):
+    """Busca no histórico por relevância (sem `q`, as mais recentes).
+
+    Cada item traz `trecho` com os termos em <mark> (HTML já escapado); a
+    próxima página vem passando `proximo` em `cursor`.
+    """
+    try:
+        return await asyncio.to_thread(repositorio_transcricoes.buscar, q, limite, cursor)
+    except ErroBusca as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/transcripts/{transcript_id}")
+async def obter_transcricao(transcript_id: int):
+    registro = await asyncio.to_thread(repositorio_transcricoes.obter, transcript_id)
+    if registro is None:
+        raise HTTPException(status_code=404, detail="Transcrição não encontrada.")
+    return registro
+
+@app.get("/cache/stats")
+async def cache_stats():
+    return await asyncio.to_thread(cache.estatisticas)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Métricas do pipeline no formato de texto do Prometheus."""
+    estatisticas = governador.estatisticas()
+    for categoria, dados in estatisticas["categorias"].items():
+        metricas.fila_openai.definir(dados["na_fila"], categoria=categoria)
+    await asyncio.to_thread(armazenamento.atualizar_metricas)
+    return PlainTextResponse(metricas.registro.exportar(), media_type="text/plain; version=0.0.4")
+
+@app.get("/openai/stats")
+async def openai_stats():
+    """Fila de chamadas à OpenAI: profundidade, esperas, retentativas e limites atuais."""
+    return governador.estatisticas()
+
+@app.get("/transcricao/stats")
+async def transcricao_stats():
+    """Backend padrão e estado do motor local (modelo carregado, lotes formados)."""
+    return {"padrao": BACKEND_TRANSCRICAO_PADRAO, "local": await asyncio.to_thread(motor_local.estatisticas)}
+
+@app.get("/admissao/stats")
+async def admissao_stats():
+    """Vagas, filas, esperas e recusas do controle de admissão (extração e API)."""
+    return admissao.estatisticas()
+
+@app.get("/armazenamento/stats")
+async def armazenamento_stats():
+    """Uso, reservas e cota das pastas de trabalho (disco e memória) e o que a faxina removeu."""
+    return await asyncio.to_thread(armazenamento.estatisticas)
+
+@app.get("/coalescencia/stats")
+async def coalescencia_stats():
+    """Processamentos compartilhados em andamento e pedidos que se juntaram a eles."""
+    return coalescencia.coalescedor.estatisticas()
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
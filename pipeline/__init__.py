@@ -0,0 +1 @@
+"""Núcleo compartilhado do pipeline de transcrição (usado por `main.py` e `app.py`)."""
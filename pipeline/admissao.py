@@ -0,0 +1,235 @@
+"""Controle de admissão: vagas limitadas por recurso, fila curta e recusa rápida.
+
+Três recursos independentes:
+
+- `extracao`: FFmpeg e VAD, limitados pela CPU. As vagas são os núcleos
+  disponíveis divididos por `FFMPEG_THREADS` (cada FFmpeg roda com esse
+  número de threads), para não haver mais threads que núcleos.
+- `api`: transcrição e geração em andamento (a vazão real da OpenAI continua
+  com o governador de `pipeline/limites.py`; aqui só se limita quantos
+  pedidos disputam essa vazão).
+- `transcricao_local`: transcrições no motor local (faster-whisper), que
+  disputam a CPU e não a OpenAI. As vagas padrão são o tamanho do micro-lote
+  (`TRANSCRICAO_LOTE_MAX`): trechos curtos simultâneos viram um só lote.
+
+Quem não encontra vaga espera numa fila FIFO limitada. Com a fila cheia, ou
+depois de `ADMISSAO_ESPERA_MAX_S` esperando, o pedido é recusado com
+ErroAdmissao (HTTP 503) e um `Retry-After` estimado pela duração média
+recente das vagas. Um pico de requisições vira respostas 503 rápidas em vez de
+deixar todas as requisições lentas ao mesmo tempo.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from . import metricas
+from .particionamento import FFMPEG_THREADS
+from .transcricao import LOTE_MAX
+
+RECURSO_EXTRACAO = "extracao"
+RECURSO_API = "api"
+RECURSO_LOCAL = "transcricao_local"
+
+
+def nucleos_disponiveis() -> int:
+    """Núcleos que o processo pode usar (respeita cgroups/taskset via affinity)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+VAGAS_EXTRACAO = int(os.getenv("ADMISSAO_EXTRACOES", "0")) or max(1, nucleos_disponiveis() // FFMPEG_THREADS)
+FILA_EXTRACAO = int(os.getenv("ADMISSAO_FILA_EXTRACAO", str(max(8, VAGAS_EXTRACAO * 4))))
+VAGAS_API = int(os.getenv("ADMISSAO_API", "16"))
+FILA_API = int(os.getenv("ADMISSAO_FILA_API", "64"))
+VAGAS_LOCAL = int(os.getenv("ADMISSAO_LOCAL", "0")) or LOTE_MAX
+FILA_LOCAL = int(os.getenv("ADMISSAO_FILA_LOCAL", str(VAGAS_LOCAL * 4)))
+ESPERA_MAX_S = float(os.getenv("ADMISSAO_ESPERA_MAX_S", "120"))
+# Limites do Retry-After sugerido (segundos)
+RETRY_AFTER_MIN_S = 1
+RETRY_AFTER_MAX_S = 300
+
+
+class ErroAdmissao(RuntimeError):
+    """Pedido recusado por falta de capacidade; `status` 503 e `retry_after` em segundos."""
+
+    def __init__(self, mensagem: str, retry_after: int, status: int = 503) -> None:
+        super().__init__(mensagem)
+        self.retry_after = retry_after
+        self.status = status
+
+
+class _Ticket:
+    __slots__ = ("futuro", "concedido")
+
+    def __init__(self, futuro: "asyncio.Future[None]") -> None:
+        self.futuro = futuro
+        self.concedido = False
+
+
+def _conceder(futuro: "asyncio.Future[None]") -> None:
+    if not futuro.done():
+        futuro.set_result(None)
+
+
+class Portao:
+    """Vagas de um recurso com fila FIFO limitada.
+
+    O estado fica sob um `threading.Lock` e cada espera é um Future do event
+    loop de quem espera: o mesmo portão serve a mais de um loop (ex.: testes
+    e scripts que chamam `asyncio.run` várias vezes).
+    """
+
+    def __init__(self, recurso: str, vagas: int, max_fila: int, espera_max_s: float = ESPERA_MAX_S) -> None:
+        self.recurso = recurso
+        self.vagas = max(1, vagas)
+        self.max_fila = max(0, max_fila)
+        self.espera_max_s = espera_max_s
+        self._lock = threading.Lock()
+        self._ocupadas = 0
+        self._fila: Deque[_Ticket] = deque()
+        # Durações recentes das vagas, para estimar o Retry-After
+        self._duracoes: Deque[float] = deque(maxlen=50)
+        self._stats = {"admitidos": 0, "recusados_fila_cheia": 0, "recusados_espera": 0,
+                       "espera_total_s": 0.0, "espera_max_s": 0.0}
+
+    def _atualizar_medidores(self) -> None:
+        metricas.vagas_em_uso.definir(self._ocupadas, recurso=self.recurso)
+        metricas.fila_admissao.definir(len(self._fila), recurso=self.recurso)
+
+    def retry_after(self) -> int:
+        """Segundos até uma vaga provavelmente abrir para quem chegar agora."""
+        with self._lock:
+            media = sum(self._duracoes) / len(self._duracoes) if self._duracoes else 10.0
+            estimativa = media * (len(self._fila) + 1) / self.vagas
+        return int(min(RETRY_AFTER_MAX_S, max(RETRY_AFTER_MIN_S, math.ceil(estimativa))))
+
+    def _recusar(self, motivo: str, mensagem: str) -> ErroAdmissao:
+        metricas.recusas_admissao.inc(recurso=self.recurso, motivo=motivo)
+        return ErroAdmissao(mensagem, self.retry_after())
+
+    def verificar(self) -> None:
+        """Recusa já (sem reservar nada) se a fila do recurso estiver cheia.
+
+        Usado na entrada das rotas, antes de receber o upload ou baixar a URL.
+        """
+        with self._lock:
+            cheia = self._ocupadas >= self.vagas and len(self._fila) >= self.max_fila
+            if cheia:
+                self._stats["recusados_fila_cheia"] += 1
+        if cheia:
+            raise self._recusar("fila_cheia", "Servidor ocupado; tente novamente em instantes.")
+
+    async def entrar(self, limitar_fila: bool = True) -> float:
+        """Ocupa uma vaga (esperando na fila se preciso) e retorna o tempo de espera.
+
+        Com `limitar_fila=False` (jobs em segundo plano) espera o quanto for
+        preciso, sem limite de fila nem de tempo.
+        """
+        inicio = time.monotonic()
+        with self._lock:
+            if self._ocupadas < self.vagas and not self._fila:
+                self._ocupadas += 1
+                ticket = None
+            elif limitar_fila and len(self._fila) >= self.max_fila:
+                self._stats["recusados_fila_cheia"] += 1
+                ticket = False
+            else:
+                ticket = _Ticket(asyncio.get_running_loop().create_future())
+                self._fila.append(ticket)
+            self._atualizar_medidores()
+        if ticket is False:
+            raise self._recusar("fila_cheia", "Servidor ocupado; tente novamente em instantes.")
+        if ticket is not None:
+            try:
+                if limitar_fila:
+                    await asyncio.wait_for(ticket.futuro, self.espera_max_s)
+                else:
+                    await ticket.futuro
+            except BaseException as e:
+                with self._lock:
+                    concedido = ticket.concedido
+                    if not concedido:
+                        self._fila.remove(ticket)
+                        self._atualizar_medidores()
+                esgotada = isinstance(e, asyncio.TimeoutError)
+                if concedido and not esgotada:
+                    # A vaga chegou junto com o cancelamento: repassa ao próximo
+                    self.sair()
+                    raise
+                if not concedido:
+                    if not esgotada:
+                        raise
+                    with self._lock:
+                        self._stats["recusados_espera"] += 1
+                    raise self._recusar("espera_esgotada", "Servidor ocupado há muito tempo; tente novamente.")
+                # Vaga concedida no mesmo instante em que o prazo acabou: fica com ela
+        espera = time.monotonic() - inicio
+        metricas.espera_admissao.observar(espera, recurso=self.recurso)
+        with self._lock:
+            self._stats["admitidos"] += 1
+            self._stats["espera_total_s"] += espera
+            self._stats["espera_max_s"] = max(self._stats["espera_max_s"], espera)
+        return espera
+
+    def sair(self, duracao: Optional[float] = None) -> None:
+        """Libera a vaga; se houver fila, ela passa direto ao primeiro da fila."""
+        with self._lock:
+            if duracao:
+                self._duracoes.append(duracao)
+            if self._fila:
+                ticket = self._fila.popleft()
+                ticket.concedido = True
+                ticket.futuro.get_loop().call_soon_threadsafe(_conceder, ticket.futuro)
+            else:
+                self._ocupadas -= 1
+            self._atualizar_medidores()
+
+    @asynccontextmanager
+    async def vaga(
+        self, tempos: Optional[Dict[str, float]] = None, limitar_fila: bool = True
+    ) -> AsyncIterator[None]:
+        """`async with portao.vaga(tempos):` — anota a espera em `tempos["fila_<recurso>"]`."""
+        espera = await self.entrar(limitar_fila)
+        if tempos is not None and espera >= 0.001:
+            chave = f"fila_{self.recurso}"
+            tempos[chave] = round(tempos.get(chave, 0.0) + espera, 3)
+        inicio = time.monotonic()
+        try:
+            yield
+        finally:
+            self.sair(time.monotonic() - inicio)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            admitidos = self._stats["admitidos"]
+            return {
+                "vagas": self.vagas,
+                "em_uso": self._ocupadas,
+                "na_fila": len(self._fila),
+                "max_fila": self.max_fila,
+                "admitidos": admitidos,
+                "recusados_fila_cheia": self._stats["recusados_fila_cheia"],
+                "recusados_espera": self._stats["recusados_espera"],
+                "espera_media_s": round(self._stats["espera_total_s"] / admitidos, 3) if admitidos else 0.0,
+                "espera_max_s": round(self._stats["espera_max_s"], 3),
+            }
+
+
+extracao = Portao(RECURSO_EXTRACAO, VAGAS_EXTRACAO, FILA_EXTRACAO)
+api = Portao(RECURSO_API, VAGAS_API, FILA_API)
+local = Portao(RECURSO_LOCAL, VAGAS_LOCAL, FILA_LOCAL)
+
+
+def estatisticas() -> Dict[str, Any]:
+    return {
+        "nucleos": nucleos_disponiveis(),
+        "ffmpeg_threads": FFMPEG_THREADS,
+        "recursos": {p.recurso: p.estatisticas() for p in (extracao, api, local)},
+    }
@@ -0,0 +1,592 @@
+"""Pastas de trabalho dos pedidos: memória (tmpfs) para mídias pequenas, cota de disco e faxina.
+
+Cada pedido recebe uma área própria (`abrir`/`abrir_async`) com uma reserva
+do espaço que deve ocupar (tamanho da mídia × `ARMAZENAMENTO_FATOR_RESERVA`:
+original, áudio extraído e áudio sem silêncios). Mídias pequenas vão para
+uma pasta em tmpfs (`/dev/shm`), como um SpooledTemporaryFile, mas com
+caminho de verdade para o FFmpeg e o VAD; as demais vão para o disco.
+
+A cota de disco vale para tudo o que está na pasta de trabalho e nas pastas
+contabilizadas (jobs, uploads em partes), medido no próprio sistema de
+arquivos, mais o que ainda falta das reservas. Sem espaço, o pedido espera
+uma área ser liberada; depois de `ARMAZENAMENTO_ESPERA_MAX_S` é recusado
+com ErroArmazenamento (503 + Retry-After, como no controle de admissão).
+A memória não espera: sem espaço no tmpfs, a área vai para o disco.
+
+A API, o Streamlit e o lote usam as mesmas pastas, cada processo numa
+subpasta própria (`proc-<pid>-*`) marcada por uma trava (`flock`) que o
+sistema solta quando o processo termina. A faxina (`faxinar`) de um processo
+nunca entra na subpasta de outro que ainda está vivo; a de um processo
+encerrado é removida inteira. Dentro da própria subpasta, áreas esquecidas
+(sessão do Streamlit abandonada, exceção sem finally) são removidas quando
+ficam sem modificação por mais de `FAXINA_TTL_S`; as áreas vivas nunca são
+tocadas, e uma área também é removida quando o objeto é coletado.
+"""
+import asyncio
+import functools
+import os
+import shutil
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+from . import metricas
+from .admissao import ESPERA_MAX_S as ESPERA_MAX_ADMISSAO_S, ErroAdmissao
+
+try:
+    import fcntl
+except ImportError:  # Windows: sem trava, subpastas de outros processos só saem pelo TTL
+    fcntl = None
+
+MB = 1024 * 1024
+COTA_DISCO_BYTES = int(os.getenv("ARMAZENAMENTO_COTA_MB", "10240")) * MB
+# Vazio desativa o uso de memória; a pasta precisa ser um tmpfs para fazer sentido
+PASTA_RAM = os.getenv("ARMAZENAMENTO_PASTA_RAM", "/dev/shm")
+COTA_RAM_BYTES = int(os.getenv("ARMAZENAMENTO_RAM_MB", "256")) * MB
+RAM_POR_MIDIA_BYTES = int(os.getenv("ARMAZENAMENTO_RAM_MIDIA_MB", "32")) * MB
+FATOR_RESERVA = float(os.getenv("ARMAZENAMENTO_FATOR_RESERVA", "2"))
+# Reserva de quem ainda não sabe o tamanho (download de URL)
+RESERVA_SEM_TAMANHO_BYTES = int(os.getenv("ARMAZENAMENTO_RESERVA_URL_MB", "256")) * MB
+ESPERA_MAX_S = float(os.getenv("ARMAZENAMENTO_ESPERA_MAX_S", str(ESPERA_MAX_ADMISSAO_S)))
+FAXINA_TTL_S = float(os.getenv("FAXINA_TTL_S", str(6 * 3600)))
+FAXINA_INTERVALO_S = float(os.getenv("FAXINA_INTERVALO_S", "600"))
+
+LOCAL_DISCO = "disco"
+LOCAL_MEMORIA = "memoria"
+RECURSO = "armazenamento"
+# Uso medido vale por esse tempo; abrir ou fechar uma área força nova medição
+INTERVALO_MEDICAO_S = 1.0
+INTERVALO_ESPERA_S = 0.25
+RETRY_AFTER_S = 30
+# Nomes deixados por versões antigas direto em temp/ (mkdtemp/NamedTemporaryFile)
+PREFIXO_LEGADO = "tmp"
+PREFIXO_PROCESSO = "proc-"
+ARQUIVO_VIVO = ".vivo"
+# Subpasta sem trava só é removida depois desse tempo parada (cobre o instante entre criar e travar)
+GRACA_PROCESSO_S = 60.0
+
+
+class ErroArmazenamento(ErroAdmissao):
+    """Sem espaço temporário para o pedido; tratado como as recusas de admissão (503)."""
+
+
+def _tamanho(caminho: str) -> int:
+    """Bytes de um arquivo ou pasta (recursivo); o que sumir durante a medição conta zero."""
+    try:
+        if not os.path.isdir(caminho) or os.path.islink(caminho):
+            return os.lstat(caminho).st_size
+        total = 0
+        with os.scandir(caminho) as entradas:
+            for entrada in entradas:
+                if entrada.is_dir(follow_symlinks=False):
+                    total += _tamanho(entrada.path)
+                else:
+                    total += entrada.stat(follow_symlinks=False).st_size
+        return total
+    except FileNotFoundError:
+        return 0
+
+
+def _ultima_modificacao(caminho: str) -> float:
+    """mtime mais recente do arquivo ou de qualquer coisa dentro da pasta."""
+    try:
+        ultima = os.lstat(caminho).st_mtime
+        if os.path.isdir(caminho) and not os.path.islink(caminho):
+            with os.scandir(caminho) as entradas:
+                for entrada in entradas:
+                    ultima = max(ultima, _ultima_modificacao(entrada.path))
+        return ultima
+    except FileNotFoundError:
+        return time.time()
+
+
+def _remover(caminho: str) -> None:
+    if os.path.isdir(caminho) and not os.path.islink(caminho):
+        shutil.rmtree(caminho, ignore_errors=True)
+    else:
+        try:
+            os.unlink(caminho)
+        except FileNotFoundError:
+            pass
+
+
+def _livre(pasta: Path) -> int:
+    try:
+        return shutil.disk_usage(pasta).free
+    except OSError:
+        return 0
+
+
+def _pasta_ram(pasta: str) -> Optional[Path]:
+    if not pasta or not os.path.isdir(pasta) or not os.access(pasta, os.W_OK):
+        return None
+    # Um nome por usuário: a pasta do tmpfs é compartilhada com o resto da máquina
+    raiz = Path(pasta) / f"transcricao-{os.getuid() if hasattr(os, 'getuid') else 0}"
+    try:
+        raiz.mkdir(mode=0o700, exist_ok=True)
+    except OSError:
+        return None
+    return raiz
+
+
+def _criar_pasta_processo(raiz: Path) -> Tuple[Path, Optional[int]]:
+    """Subpasta deste processo, travada enquanto ele viver; retorna (pasta, descritor da trava)."""
+    pasta = Path(tempfile.mkdtemp(prefix=f"{PREFIXO_PROCESSO}{os.getpid()}-", dir=raiz))
+    if fcntl is None:
+        return pasta, None
+    fd = os.open(pasta / ARQUIVO_VIVO, os.O_RDWR | os.O_CREAT, 0o600)
+    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    return pasta, fd
+
+
+def _processo_vivo(pasta: str) -> bool:
+    """A trava da subpasta ainda está com algum processo?"""
+    if fcntl is None:
+        return True
+    try:
+        fd = os.open(os.path.join(pasta, ARQUIVO_VIVO), os.O_RDWR)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    finally:
+        # Fechar também solta a trava, se foi obtida aqui
+        os.close(fd)
+    return False
+
+
+def _encerrar_processo(pastas: Sequence[Path], travas: Sequence[int]) -> None:
+    for pasta in pastas:
+        _remover(str(pasta))
+    for fd in travas:
+        os.close(fd)
+
+
+def _entradas(raiz: Path) -> Iterator[str]:
+    """Itens de primeiro nível da raiz, com as subpastas de processo abertas um nível."""
+    with os.scandir(raiz) as entradas:
+        for entrada in entradas:
+            if entrada.name.startswith(PREFIXO_PROCESSO) and entrada.is_dir(follow_symlinks=False):
+                try:
+                    with os.scandir(entrada.path) as internas:
+                        yield from (e.path for e in internas)
+                except FileNotFoundError:
+                    continue
+            else:
+                yield entrada.path
+
+
+class Reserva:
+    """Espaço da cota reservado para gravar `reserva` bytes em `pasta`; `fechar()` devolve.
+
+    Conta como pendente o que ainda não apareceu na pasta desde a reserva
+    (`base` é o tamanho dela naquele momento). Não remove nada ao fechar.
+    """
+
+    def __init__(
+        self, pasta: Path, local: str, reserva: int, gerenciador: "GerenciadorArmazenamento", base: int = 0
+    ) -> None:
+        self.pasta = pasta
+        self.local = local
+        self.reserva = reserva
+        self.base = base
+        self._gerenciador = gerenciador
+        self._aberta = True
+
+    @property
+    def fechada(self) -> bool:
+        return not self._aberta
+
+    def fechar(self) -> None:
+        if self._aberta:
+            self._aberta = False
+            self._gerenciador._descartar(self)
+
+
+class Area(Reserva):
+    """Pasta de trabalho de um pedido; `fechar()` a remove e libera a reserva."""
+
+    def __init__(self, pasta: Path, local: str, reserva: int, gerenciador: "GerenciadorArmazenamento") -> None:
+        super().__init__(pasta, local, reserva, gerenciador)
+        # Sessão abandonada ou exceção sem finally: a pasta some junto com o objeto
+        self._finalizador = weakref.finalize(self, _remover, str(pasta))
+
+    @property
+    def fechada(self) -> bool:
+        return not self._finalizador.alive
+
+    def fechar(self) -> None:
+        if self._finalizador.alive:
+            self._finalizador()
+            self._gerenciador._descartar(self)
+
+
+class GerenciadorArmazenamento:
+    """Áreas de trabalho sob `pasta` (disco) e na pasta de memória, com cota e faxina.
+
+    `contabilizar`: outras pastas cujo conteúdo entra na cota de disco (não
+    são gerenciadas nem faxinadas aqui). `legado`: pastas onde a faxina
+    também remove sobras antigas com prefixo `tmp`.
+    """
+
+    def __init__(
+        self,
+        pasta: Path,
+        cota_disco: int = COTA_DISCO_BYTES,
+        pasta_ram: Optional[str] = PASTA_RAM,
+        cota_ram: int = COTA_RAM_BYTES,
+        ram_por_midia: int = RAM_POR_MIDIA_BYTES,
+        contabilizar: Sequence[Path] = (),
+        legado: Sequence[Path] = (),
+        espera_max_s: float = ESPERA_MAX_S,
+        ttl_s: float = FAXINA_TTL_S,
+    ) -> None:
+        # Caminhos absolutos: reservas em pastas contabilizadas são achadas pelo caminho medido
+        self.pasta = Path(os.path.abspath(pasta))
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self.pasta_ram = _pasta_ram(pasta_ram) if pasta_ram and cota_ram > 0 else None
+        # Áreas deste processo ficam numa subpasta travada de cada raiz
+        self._processo: Dict[str, Path] = {}
+        travas = []
+        for local, raiz in ((LOCAL_DISCO, self.pasta), (LOCAL_MEMORIA, self.pasta_ram)):
+            if raiz is not None:
+                self._processo[local], trava = _criar_pasta_processo(raiz)
+                if trava is not None:
+                    travas.append(trava)
+        weakref.finalize(self, _encerrar_processo, list(self._processo.values()), travas)
+        self.cotas = {LOCAL_DISCO: cota_disco, LOCAL_MEMORIA: cota_ram if self.pasta_ram else 0}
+        self.ram_por_midia = ram_por_midia
+        self.contabilizar = [Path(os.path.abspath(p)) for p in contabilizar]
+        self.legado = [Path(p) for p in legado]
+        self.espera_max_s = espera_max_s
+        self.ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._areas: "weakref.WeakValueDictionary[str, Area]" = weakref.WeakValueDictionary()
+        # Áreas e reservas avulsas; uma reserva esquecida some junto com o objeto
+        self._reservas: "weakref.WeakSet[Reserva]" = weakref.WeakSet()
+        self._uso = {LOCAL_DISCO: 0, LOCAL_MEMORIA: 0}
+        self._uso_por_pasta: Dict[str, int] = {}
+        self._medido_em = 0.0
+        self._stats = {
+            "areas_disco": 0, "areas_memoria": 0, "esperas": 0, "recusas": 0,
+            "faxina_itens": 0, "faxina_bytes": 0,
+        }
+        for local, cota in self.cotas.items():
+            metricas.cota_armazenamento.definir(cota, local=local)
+
+    def _raizes(self, local: str) -> Sequence[Path]:
+        if local == LOCAL_MEMORIA:
+            return [self.pasta_ram] if self.pasta_ram else []
+        return [self.pasta, *self.contabilizar]
+
+    def _medir(self, forcar: bool = False) -> None:
+        """Mede o uso real (fora do lock: percorre o sistema de arquivos)."""
+        if not forcar and time.monotonic() - self._medido_em < INTERVALO_MEDICAO_S:
+            return
+        uso = {}
+        por_pasta: Dict[str, int] = {}
+        for local in (LOCAL_DISCO, LOCAL_MEMORIA):
+            total = 0
+            for raiz in self._raizes(local):
+                try:
+                    for caminho in _entradas(raiz):
+                        tamanho = _tamanho(caminho)
+                        por_pasta[caminho] = tamanho
+                        total += tamanho
+                except FileNotFoundError:
+                    continue
+            uso[local] = total
+        with self._lock:
+            self._uso = uso
+            self._uso_por_pasta = por_pasta
+            self._medido_em = time.monotonic()
+            self._atualizar_medidores()
+
+    def _pendente(self, local: str) -> int:
+        """Parte das reservas vivas ainda não ocupada no disco (com o lock).
+
+        Reservas na mesma pasta (partes simultâneas de um upload) somam e
+        descontam juntas o que a pasta cresceu desde a mais antiga.
+        """
+        por_pasta: Dict[str, list] = {}
+        for reserva in list(self._reservas):
+            if reserva.local == local:
+                por_pasta.setdefault(str(reserva.pasta), []).append(reserva)
+        pendente = 0
+        for pasta, reservas in por_pasta.items():
+            base = min(r.base for r in reservas)
+            crescimento = max(0, self._uso_por_pasta.get(pasta, base) - base)
+            pendente += max(0, sum(r.reserva for r in reservas) - crescimento)
+        return pendente
+
+    def _comprometido(self, local: str) -> int:
+        return self._uso[local] + self._pendente(local)
+
+    def _atualizar_medidores(self) -> None:
+        areas = list(self._areas.values())
+        for local in (LOCAL_DISCO, LOCAL_MEMORIA):
+            metricas.uso_armazenamento.definir(self._uso[local], local=local)
+            metricas.reserva_armazenamento.definir(self._pendente(local), local=local)
+            metricas.areas_armazenamento.definir(sum(1 for a in areas if a.local == local), local=local)
+
+    def _criar(self, local: str, reserva: int) -> Area:
+        area = Area(Path(tempfile.mkdtemp(prefix="area-", dir=self._processo[local])), local, reserva, self)
+        self._areas[str(area.pasta)] = area
+        self._reservas.add(area)
+        self._stats[f"areas_{local}"] += 1
+        self._atualizar_medidores()
+        return area
+
+    def _tentar_abrir(self, tamanho: Optional[int]) -> Optional[Area]:
+        self._medir()
+        reserva = int(tamanho * FATOR_RESERVA) if tamanho else RESERVA_SEM_TAMANHO_BYTES
+        with self._lock:
+            if tamanho and tamanho <= self.ram_por_midia and self.pasta_ram is not None:
+                # Cabe na cota e no que o tmpfs ainda tem livre (descontadas as reservas)
+                espaco = min(
+                    self.cotas[LOCAL_MEMORIA] - self._comprometido(LOCAL_MEMORIA),
+                    _livre(self.pasta_ram) - self._pendente(LOCAL_MEMORIA),
+                )
+                if reserva <= espaco:
+                    return self._criar(LOCAL_MEMORIA, reserva)
+            # Maior que a cota inteira: entra quando o disco estiver livre, em vez de nunca
+            reserva = min(reserva, self.cotas[LOCAL_DISCO])
+            if self._comprometido(LOCAL_DISCO) + reserva <= self.cotas[LOCAL_DISCO]:
+                return self._criar(LOCAL_DISCO, reserva)
+        return None
+
+    def _recusar(self, motivo: str = "espera_esgotada") -> ErroArmazenamento:
+        with self._lock:
+            self._stats["recusas"] += 1
+        metricas.recusas_admissao.inc(recurso=RECURSO, motivo=motivo)
+        if motivo == "maior_que_cota":
+            return ErroArmazenamento("Arquivo maior que o espaço temporário do servidor.", 0, status=507)
+        return ErroArmazenamento("Sem espaço temporário no servidor; tente novamente em instantes.", RETRY_AFTER_S)
+
+    def verificar(self, tamanho: int) -> None:
+        """Recusa na hora o que não cabe na cota de disco: 507 se nunca caberia, 503 se falta espaço agora.
+
+        Para quem vai ocupar espaço aos poucos (upload em partes) e não deve
+        reservar tudo de uma vez.
+        """
+        if tamanho > self.cotas[LOCAL_DISCO]:
+            raise self._recusar("maior_que_cota")
+        if not self._cabe(tamanho):
+            raise self._recusar("sem_espaco")
+
+    def _cabe(self, tamanho: int) -> bool:
+        self._medir()
+        with self._lock:
+            return self._comprometido(LOCAL_DISCO) + tamanho <= self.cotas[LOCAL_DISCO]
+
+    def _registrar_espera(self, inicio: float, esperou: bool, tempos: Optional[Dict[str, float]]) -> None:
+        espera = time.monotonic() - inicio if esperou else 0.0
+        metricas.espera_admissao.observar(espera, recurso=RECURSO)
+        if esperou:
+            with self._lock:
+                self._stats["esperas"] += 1
+            if tempos is not None:
+                tempos[f"fila_{RECURSO}"] = round(tempos.get(f"fila_{RECURSO}", 0.0) + espera, 3)
+
+    def _esperar(self, tentar: Callable[[], Any], tempos: Optional[Dict[str, float]], limitar_espera: bool) -> Any:
+        """Repete `tentar()` até dar certo; recusa depois de `espera_max_s` (se limitado)."""
+        inicio = time.monotonic()
+        esperou = False
+        while True:
+            resultado = tentar()
+            if resultado:
+                self._registrar_espera(inicio, esperou, tempos)
+                return resultado
+            if limitar_espera and time.monotonic() - inicio >= self.espera_max_s:
+                raise self._recusar()
+            esperou = True
+            time.sleep(INTERVALO_ESPERA_S)
+
+    async def _esperar_async(
+        self, tentar: Callable[[], Any], tempos: Optional[Dict[str, float]], limitar_espera: bool
+    ) -> Any:
+        inicio = time.monotonic()
+        esperou = False
+        while True:
+            resultado = await asyncio.to_thread(tentar)
+            if resultado:
+                self._registrar_espera(inicio, esperou, tempos)
+                return resultado
+            if limitar_espera and time.monotonic() - inicio >= self.espera_max_s:
+                raise self._recusar()
+            esperou = True
+            await asyncio.sleep(INTERVALO_ESPERA_S)
+
+    def abrir(
+        self, tamanho: Optional[int] = None, tempos: Optional[Dict[str, float]] = None, limitar_espera: bool = True
+    ) -> Area:
+        """Nova área para uma mídia de `tamanho` bytes (None = desconhecido), esperando espaço se preciso."""
+        return self._esperar(functools.partial(self._tentar_abrir, tamanho), tempos, limitar_espera)
+
+    async def abrir_async(
+        self, tamanho: Optional[int] = None, tempos: Optional[Dict[str, float]] = None, limitar_espera: bool = True
+    ) -> Area:
+        return await self._esperar_async(functools.partial(self._tentar_abrir, tamanho), tempos, limitar_espera)
+
+    def _tentar_reservar(self, pasta: Path, tamanho: int) -> Optional[Reserva]:
+        base = _tamanho(str(pasta))
+        self._medir()
+        with self._lock:
+            if self._comprometido(LOCAL_DISCO) + tamanho > self.cotas[LOCAL_DISCO]:
+                return None
+            reserva = Reserva(pasta, LOCAL_DISCO, tamanho, self, base)
+            self._reservas.add(reserva)
+            self._atualizar_medidores()
+            return reserva
+
+    async def reservar_async(
+        self,
+        pasta: Path,
+        tamanho: Optional[int],
+        tempos: Optional[Dict[str, float]] = None,
+        limitar_espera: bool = True,
+    ) -> Reserva:
+        """Reserva `tamanho` bytes (None = desconhecido) a gravar em `pasta`, numa pasta contabilizada.
+
+        Para quem grava fora das áreas (jobs, partes de upload): mesma
+        contrapressão (espera e depois 503), e 507 se nunca caberia. Feche a
+        reserva quando a gravação terminar; o que foi gravado passa a contar
+        pela medição.
+        """
+        tamanho = RESERVA_SEM_TAMANHO_BYTES if tamanho is None else tamanho
+        if tamanho > self.cotas[LOCAL_DISCO]:
+            raise self._recusar("maior_que_cota")
+        pasta = Path(os.path.abspath(pasta))
+        return await self._esperar_async(
+            functools.partial(self._tentar_reservar, pasta, tamanho), tempos, limitar_espera
+        )
+
+    @contextmanager
+    def area(self, tamanho: Optional[int] = None, tempos: Optional[Dict[str, float]] = None) -> Iterator[Area]:
+        area = self.abrir(tamanho, tempos)
+        try:
+            yield area
+        finally:
+            area.fechar()
+
+    def _descartar(self, area: Reserva) -> None:
+        # Outras reservas na mesma pasta deixam de contar o que esta gravou como se fosse delas
+        tamanho = None if isinstance(area, Area) else _tamanho(str(area.pasta))
+        with self._lock:
+            self._reservas.discard(area)
+            if tamanho is not None:
+                irmas = [r for r in list(self._reservas) if str(r.pasta) == str(area.pasta)]
+                if irmas:
+                    base = min(area.base, *(r.base for r in irmas))
+                    consumido = min(area.reserva, max(0, tamanho - base))
+                    for reserva in irmas:
+                        reserva.base += consumido
+            if self._areas.get(str(area.pasta)) is area:
+                del self._areas[str(area.pasta)]
+            # O espaço liberado precisa aparecer para quem está esperando
+            self._medido_em = 0.0
+            self._atualizar_medidores()
+
+    def _candidatos_faxina(self) -> Iterator[Tuple[str, float]]:
+        """(caminho, segundos parado para remover) de tudo que a faxina pode levar."""
+        proprias = {str(p) for p in self._processo.values()}
+        for raiz in (self.pasta, self.pasta_ram):
+            if raiz is None or not raiz.is_dir():
+                continue
+            with os.scandir(raiz) as entradas:
+                caminhos = [(e.path, e.name) for e in entradas]
+            for caminho, nome in caminhos:
+                if caminho in proprias:
+                    # Áreas deste processo: as vivas ficam, as esquecidas saem pelo TTL
+                    with os.scandir(caminho) as internas:
+                        yield from ((e.path, self.ttl_s) for e in internas if e.name != ARQUIVO_VIVO)
+                elif nome.startswith(PREFIXO_PROCESSO) and fcntl is not None:
+                    # Outro processo: intocável enquanto vivo, removido inteiro quando encerrado
+                    if not _processo_vivo(caminho):
+                        yield caminho, GRACA_PROCESSO_S
+                else:
+                    yield caminho, self.ttl_s
+        for raiz in self.legado:
+            if raiz.is_dir():
+                with os.scandir(raiz) as entradas:
+                    yield from ((e.path, self.ttl_s) for e in entradas if e.name.startswith(PREFIXO_LEGADO))
+
+    def faxinar(self) -> Dict[str, int]:
+        """Remove o que não é área viva de processo vivo e está parado há tempo suficiente."""
+        agora = time.time()
+        itens = removidos = 0
+        for caminho, parado_s in list(self._candidatos_faxina()):
+            with self._lock:
+                viva = caminho in self._areas
+            if viva or _ultima_modificacao(caminho) > agora - parado_s:
+                continue
+            tamanho = _tamanho(caminho)
+            _remover(caminho)
+            itens += 1
+            removidos += tamanho
+        if itens:
+            metricas.faxina_itens.inc(itens)
+            metricas.faxina_bytes.inc(removidos)
+            with self._lock:
+                self._stats["faxina_itens"] += itens
+                self._stats["faxina_bytes"] += removidos
+            self._medir(forcar=True)
+        return {"itens": itens, "bytes": removidos}
+
+    def atualizar_metricas(self) -> None:
+        self._medir()
+
+    def estatisticas(self) -> Dict[str, Any]:
+        self._medir()
+        with self._lock:
+            areas = list(self._areas.values())
+            return {
+                "pasta": str(self.pasta),
+                "pasta_ram": str(self.pasta_ram) if self.pasta_ram else None,
+                "pastas_processo": {local: str(p) for local, p in self._processo.items()},
+                "locais": {
+                    local: {
+                        "cota_bytes": self.cotas[local],
+                        "uso_bytes": self._uso[local],
+                        "reservado_bytes": self._pendente(local),
+                        "areas": sum(1 for a in areas if a.local == local),
+                    }
+                    for local in (LOCAL_DISCO, LOCAL_MEMORIA)
+                },
+                "ttl_s": self.ttl_s,
+                **self._stats,
+            }
+
+
+async def faxina_periodica(gerenciador: GerenciadorArmazenamento, intervalo_s: float = FAXINA_INTERVALO_S) -> None:
+    """Laço da faxina para a API (tarefa do event loop); a primeira passada é imediata."""
+    while True:
+        try:
+            await asyncio.to_thread(gerenciador.faxinar)
+        except OSError:
+            pass
+        await asyncio.sleep(intervalo_s)
+
+
+def iniciar_faxina_em_thread(
+    gerenciador: GerenciadorArmazenamento, intervalo_s: float = FAXINA_INTERVALO_S
+) -> threading.Thread:
+    """Mesmo laço numa thread daemon, para quem não tem event loop (Streamlit)."""
+
+    def _laco() -> None:
+        while True:
+            try:
+                gerenciador.faxinar()
+            except OSError:
+                pass
+            time.sleep(intervalo_s)
+
+    thread = threading.Thread(target=_laco, name="faxina-armazenamento", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,135 @@
+"""Cache persistente de transcrições, endereçado pelo conteúdo da mídia.
+
+A chave é o SHA-256 dos bytes da mídia combinado com prompt, idioma e
+modelo. As entradas ficam em SQLite com limite de tamanho total e remoção
+das menos usadas recentemente (LRU).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Optional
+
+TAMANHO_BLOCO = 1024 * 1024
+
+
+def copiar_com_hash(origem: BinaryIO, destino: BinaryIO, hasher: "hashlib._Hash", tamanho_bloco: int = TAMANHO_BLOCO) -> int:
+    """Copia `origem` para `destino` atualizando `hasher`; retorna o total de bytes."""
+    total = 0
+    while True:
+        bloco = origem.read(tamanho_bloco)
+        if not bloco:
+            return total
+        hasher.update(bloco)
+        destino.write(bloco)
+        total += len(bloco)
+
+
+class CacheTranscricao:
+    """Armazena transcrições em SQLite com limite de bytes e despejo LRU."""
+
+    def __init__(self, caminho_db: Path, limite_bytes: int) -> None:
+        self.caminho_db = Path(caminho_db)
+        self.caminho_db.parent.mkdir(parents=True, exist_ok=True)
+        self.limite_bytes = limite_bytes
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS transcricoes (
+                    chave TEXT PRIMARY KEY,
+                    texto TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    bytes_midia INTEGER NOT NULL,
+                    criado REAL NOT NULL,
+                    acessado REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_transcricoes_acessado ON transcricoes (acessado);
+                CREATE TABLE IF NOT EXISTS estatisticas (
+                    nome TEXT PRIMARY KEY,
+                    valor INTEGER NOT NULL
+                );
+                """
+            )
+
+    def _conectar(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.caminho_db, timeout=30)
+
+    @staticmethod
+    def chave(hash_midia: str, prompt: str, idioma: str, modelo: str) -> str:
+        partes = "\x1f".join([hash_midia, prompt or "", idioma, modelo])
+        return hashlib.sha256(partes.encode("utf-8")).hexdigest()
+
+    def _incrementar(self, conn: sqlite3.Connection, nome: str, valor: int = 1) -> None:
+        conn.execute(
+            "INSERT INTO estatisticas (nome, valor) VALUES (?, ?) "
+            "ON CONFLICT(nome) DO UPDATE SET valor = valor + excluded.valor",
+            (nome, valor),
+        )
+
+    def obter(self, chave: str) -> Optional[str]:
+        """Retorna a transcrição em cache (e atualiza o LRU) ou None."""
+        with self._lock, self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT texto, bytes_midia FROM transcricoes WHERE chave = ?", (chave,)
+            ).fetchone()
+            if linha is None:
+                self._incrementar(conn, "misses")
+                return None
+            conn.execute("UPDATE transcricoes SET acessado = ? WHERE chave = ?", (time.time(), chave))
+            self._incrementar(conn, "hits")
+            self._incrementar(conn, "bytes_economizados", int(linha[1]))
+            return linha[0]
+
+    def guardar(self, chave: str, texto: str, bytes_midia: int) -> None:
+        tamanho = len(texto.encode("utf-8"))
+        if tamanho > self.limite_bytes:
+            return
+        agora = time.time()
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO transcricoes (chave, texto, tamanho, bytes_midia, criado, acessado) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (chave, texto, tamanho, bytes_midia, agora, agora),
+            )
+            self._despejar(conn)
+
+    def _despejar(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM transcricoes").fetchone()[0]
+        if total <= self.limite_bytes:
+            return
+        removidos = 0
+        for chave, tamanho in conn.execute(
+            "SELECT chave, tamanho FROM transcricoes ORDER BY acessado ASC"
+        ).fetchall():
+            if total <= self.limite_bytes:
+                break
+            conn.execute("DELETE FROM transcricoes WHERE chave = ?", (chave,))
+            total -= tamanho
+            removidos += 1
+        self._incrementar(conn, "despejos", removidos)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock, self._conectar() as conn:
+            valores = dict(conn.execute("SELECT nome, valor FROM estatisticas").fetchall())
+            entradas, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tamanho), 0) FROM transcricoes"
+            ).fetchone()
+        return {
+            "hits": valores.get("hits", 0),
+            "misses": valores.get("misses", 0),
+            "bytes_economizados": valores.get("bytes_economizados", 0),
+            "despejos": valores.get("despejos", 0),
+            "entradas": entradas,
+            "bytes_usados": total,
+            "limite_bytes": self.limite_bytes,
+        }
+
+
+def criar_cache(pasta: Path) -> CacheTranscricao:
+    """Cria o cache em `pasta` (ou `CACHE_DIR`), com limite `CACHE_MAX_MB` (padrão 200 MB)."""
+    pasta = Path(os.getenv("CACHE_DIR", str(pasta)))
+    limite_mb = int(os.getenv("CACHE_MAX_MB", "200"))
+    return CacheTranscricao(pasta / "transcricoes.db", limite_mb * 1024 * 1024)
@@ -0,0 +1,110 @@
+"""Coalescência (single-flight) de processamentos idênticos em andamento.
+
+Quando chegam pedidos iguais ao mesmo tempo (o mesmo link colado por várias
+pessoas, o mesmo arquivo enviado duas vezes), só o primeiro baixa, extrai,
+transcreve e gera; os outros se juntam ao mesmo processamento e recebem o
+mesmo resultado, ou o mesmo erro.
+
+O processamento roda numa tarefa própria, separada de quem o pediu: se um
+dos clientes desistir, os outros continuam esperando; a tarefa só é cancelada
+quando não sobra ninguém interessado. Terminado o voo, a chave sai da tabela
+e o próximo pedido igual começa do zero (e aí quem ajuda é o cache).
+"""
+import asyncio
+import hashlib
+import json
+from typing import Any, Awaitable, Callable, Dict, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from . import metricas
+
+# Parâmetros de rastreamento que não mudam o conteúdo baixado
+_PARAMETROS_RASTREIO = ("utm_", "fbclid", "gclid", "igshid")
+_PORTAS_PADRAO = {"http": 80, "https": 443}
+
+
+def normalizar_url(url: str) -> str:
+    """Forma canônica do link: esquema/host em minúsculas, sem porta padrão,
+    fragmento nem parâmetros de rastreamento, e query em ordem alfabética."""
+    partes = urlsplit(url.strip())
+    esquema = partes.scheme.lower()
+    host = (partes.hostname or "").lower()
+    if partes.port and partes.port != _PORTAS_PADRAO.get(esquema):
+        host = f"{host}:{partes.port}"
+    if partes.username:
+        credenciais = partes.username + (f":{partes.password}" if partes.password else "")
+        host = f"{credenciais}@{host}"
+    query = sorted(
+        (nome, valor)
+        for nome, valor in parse_qsl(partes.query, keep_blank_values=True)
+        if not nome.lower().startswith(_PARAMETROS_RASTREIO)
+    )
+    return urlunsplit((esquema, host, partes.path or "/", urlencode(query), ""))
+
+
+def chave(midia: str, parametros: Dict[str, Any]) -> str:
+    """Chave do voo: a mídia (`url:...` ou `sha256:...`) e tudo que muda o resultado."""
+    assinatura = json.dumps(parametros, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(f"{midia}\x1f{assinatura}".encode("utf-8")).hexdigest()
+
+
+class _Voo:
+    __slots__ = ("tarefa", "assinantes")
+
+    def __init__(self, tarefa: "asyncio.Task[Any]") -> None:
+        self.tarefa = tarefa
+        self.assinantes = 0
+
+
+class Coalescedor:
+    """Tabela de voos em andamento por chave (um event loop: o do servidor)."""
+
+    def __init__(self) -> None:
+        self._voos: Dict[str, _Voo] = {}
+        self._stats = {"lideres": 0, "coalescidas": 0, "abandonadas": 0, "canceladas": 0}
+
+    def _encerrar(self, chave_voo: str, voo: _Voo) -> None:
+        if self._voos.get(chave_voo) is voo:
+            del self._voos[chave_voo]
+
+    async def executar(
+        self, chave_voo: str, fabrica: Callable[[], Awaitable[Any]], tipo: str = "midia"
+    ) -> Tuple[Any, bool]:
+        """Retorna (resultado, coalescido).
+
+        `fabrica()` só é chamada por quem abre o voo e devolve a corrotina do
+        processamento; quem chega depois com a mesma chave apenas espera.
+        `tipo` rotula a métrica (ex.: "url", "upload").
+        """
+        voo = self._voos.get(chave_voo)
+        coalescido = voo is not None
+        if voo is None:
+            voo = _Voo(asyncio.ensure_future(fabrica()))
+            self._voos[chave_voo] = voo
+            voo.tarefa.add_done_callback(lambda _tarefa: self._encerrar(chave_voo, voo))
+            self._stats["lideres"] += 1
+        else:
+            self._stats["coalescidas"] += 1
+            metricas.requisicoes_coalescidas.inc(tipo=tipo)
+        voo.assinantes += 1
+        try:
+            return await asyncio.shield(voo.tarefa), coalescido
+        except asyncio.CancelledError:
+            if not voo.tarefa.done():
+                # Este cliente desistiu; o processamento só para quando ninguém mais espera
+                voo.assinantes -= 1
+                self._stats["abandonadas"] += 1
+                if voo.assinantes == 0:
+                    self._stats["canceladas"] += 1
+                    voo.tarefa.cancel()
+            raise
+
+    def estatisticas(self) -> Dict[str, Any]:
+        return {
+            "em_andamento": len(self._voos),
+            "assinantes": sum(v.assinantes for v in self._voos.values()),
+            **self._stats,
+        }
+
+
+coalescedor = Coalescedor()
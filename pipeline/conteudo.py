@@ -0,0 +1,234 @@
+"""Geração de título, legenda e hashtags a partir da transcrição (API e Streamlit).
+
+As duas interfaces montam o mesmo pedido ao chat e tratam a resposta do
+mesmo jeito; só muda o cliente (síncrono no Streamlit, assíncrono na API,
+com streaming opcional dos tokens). Transcrições longas são condensadas em
+blocos paralelos antes (`pipeline/resumo_longo.py`) em vez de truncadas.
+"""
+import json
+import os
+from contextlib import aclosing
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .limites import CATEGORIA_CONTEUDO, governador
+from .multiplataforma import PLATAFORMAS_VALIDAS
+from .resumo_longo import condensar, condensar_async, somar_uso, uso_zerado
+
+MODELO_CONTEUDO = os.getenv("OPENAI_CONTENT_MODEL", "gpt-4o-mini")
+TAMANHOS_ACEITOS = ("curta", "média", "longa")
+
+
+def ler_json(texto: str) -> Dict[str, Any]:
+    """JSON da resposta do modelo; recupera o objeto mesmo com texto em volta ({} se não houver)."""
+    try:
+        return json.loads(texto)
+    except (TypeError, ValueError):
+        inicio = texto.find("{") if isinstance(texto, str) else -1
+        fim = texto.rfind("}") if inicio != -1 else -1
+        if fim > inicio:
+            try:
+                return json.loads(texto[inicio:fim + 1])
+            except ValueError:
+                pass
+        return {}
+
+
+def normalizar_conteudo(data: Dict[str, Any], qtd_hashtags: int) -> Dict[str, Any]:
+    """Limpa título, legenda e hashtags (prefixo '#', sem espaços, sem repetição)."""
+    if not isinstance(data, dict):
+        data = {}
+    titulo = str(data.get("titulo", "")).strip()
+    legenda = str(data.get("legenda", "")).strip()
+    hashtags_raw = data.get("hashtags", [])
+    hashtags_list: List[str] = []
+    if isinstance(hashtags_raw, str):
+        partes = [p.strip() for p in hashtags_raw.replace(",", " ").split()]
+        hashtags_list = [p if p.startswith("#") else f"#{p}" for p in partes if p]
+    elif isinstance(hashtags_raw, list):
+        limpos: List[str] = []
+        for h in hashtags_raw:
+            if not isinstance(h, str):
+                continue
+            h2 = h.strip().replace(" ", "")
+            if not h2:
+                continue
+            if not h2.startswith("#"):
+                h2 = f"#{h2}"
+            limpos.append(h2)
+        hashtags_list = limpos
+    vistos = set()
+    unicos: List[str] = []
+    for h in hashtags_list:
+        k = h.lower()
+        if k not in vistos:
+            vistos.add(k)
+            unicos.append(h)
+    hashtags_final = unicos[:qtd_hashtags]
+    if not titulo:
+        titulo = "Título sugerido"
+    if not legenda:
+        legenda = "Legenda sugerida."
+    return {"titulo": titulo, "legenda": legenda, "hashtags": hashtags_final}
+
+
+def _texto_valido(transcricao: str) -> str:
+    if not isinstance(transcricao, str):
+        raise ValueError("transcricao inválida")
+    texto = transcricao.strip()
+    if not texto:
+        raise ValueError("transcricao vazia")
+    return texto
+
+
+def _pedido(
+    texto: str, plataforma: str, tom: str, tamanho_legenda: str, qtd_hashtags: int, n: int, condensado: bool
+) -> Tuple[Dict[str, Any], int]:
+    """Parâmetros da chamada ao chat e a quantidade de hashtags já ajustada."""
+    if plataforma not in PLATAFORMAS_VALIDAS:
+        plataforma = "Instagram"
+    if tamanho_legenda == "media":
+        tamanho_legenda = "média"
+    if tamanho_legenda not in TAMANHOS_ACEITOS:
+        tamanho_legenda = "média"
+    if not isinstance(qtd_hashtags, int) or qtd_hashtags < 3:
+        qtd_hashtags = 10
+    if qtd_hashtags > 30:
+        qtd_hashtags = 30
+    instrucao = (
+        "Gere conteúdo para redes sociais em pt-BR com base na transcrição fornecida. "
+        "Adapte ao contexto da plataforma, mantendo alto potencial de engajamento e clareza. "
+        "Respeite o tamanho da legenda solicitado e a quantidade de hashtags. "
+        "Retorne exclusivamente um objeto JSON com as chaves: "
+        "titulo (string), legenda (string), hashtags (array de strings). "
+        + ("A transcrição foi condensada em resumos por parte; considere o conteúdo completo. " if condensado else "")
+        + "Regras: "
+        f"plataforma={plataforma}; tom={tom}; tamanho_legenda={tamanho_legenda}; qtd_hashtags={qtd_hashtags}. "
+        "Use hashtags relevantes, em minúsculas e sem acentos, com prefixo '#', sem espaços. "
+        "Evite clickbait enganoso; foque no benefício e na curiosidade legítima."
+    )
+    parametros = dict(
+        model=MODELO_CONTEUDO,
+        response_format={"type": "json_object"},
+        messages=[
+            {"role": "system", "content": instrucao},
+            {"role": "user", "content": f"Transcrição:\n{texto}"},
+        ],
+        temperature=0.7 if n == 1 else 0.9,
+        max_tokens=600,
+    )
+    return parametros, qtd_hashtags
+
+
+def _conteudos_da_resposta(resp: Any) -> List[str]:
+    return [
+        c.message.content if getattr(c, "message", None) and c.message.content else ""
+        for c in (getattr(resp, "choices", None) or [])
+    ]
+
+
+def _variantes(conteudos: List[str], qtd_hashtags: int, uso_tokens: Dict[str, int]) -> List[Dict[str, Any]]:
+    variantes = [normalizar_conteudo(ler_json(c), qtd_hashtags) for c in conteudos] or [
+        normalizar_conteudo({}, qtd_hashtags)
+    ]
+    variantes[0]["uso_tokens"] = uso_tokens
+    return variantes
+
+
+def gerar_variantes_conteudo(
+    client,
+    transcricao: str,
+    plataforma: str = "Instagram",
+    tom: str = "engajador",
+    tamanho_legenda: str = "média",
+    qtd_hashtags: int = 15,
+    n: int = 1,
+    ja_condensado: bool = False,
+) -> List[Dict[str, Any]]:
+    """Gera `n` variantes numa única chamada (choices); o uso de tokens vai na primeira."""
+    texto = _texto_valido(transcricao)
+    if ja_condensado:
+        uso_tokens = uso_zerado()
+    else:
+        texto, uso_tokens = condensar(client, texto)
+    parametros, qtd_hashtags = _pedido(
+        texto, plataforma, tom, tamanho_legenda, qtd_hashtags, n, ja_condensado or uso_tokens["chamadas"] > 0
+    )
+    resp = governador.executar(client.chat.completions, CATEGORIA_CONTEUDO, n=max(1, n), **parametros)
+    somar_uso(uso_tokens, resp)
+    return _variantes(_conteudos_da_resposta(resp), qtd_hashtags, uso_tokens)
+
+
+async def gerar_variantes_conteudo_async(
+    client,
+    transcricao: str,
+    plataforma: str = "Instagram",
+    tom: str = "engajador",
+    tamanho_legenda: str = "média",
+    qtd_hashtags: int = 15,
+    n: int = 1,
+    ao_token: Optional[Callable[[str], None]] = None,
+    ja_condensado: bool = False,
+) -> List[Dict[str, Any]]:
+    """Versão assíncrona; `ao_token` (streaming) só é usado com uma variante."""
+    texto = _texto_valido(transcricao)
+    if ja_condensado:
+        uso_tokens = uso_zerado()
+    else:
+        texto, uso_tokens = await condensar_async(client, texto)
+    parametros, qtd_hashtags = _pedido(
+        texto, plataforma, tom, tamanho_legenda, qtd_hashtags, n, ja_condensado or uso_tokens["chamadas"] > 0
+    )
+    if ao_token is not None and n == 1:
+        # Streaming: repassa cada pedaço do JSON gerado assim que chega
+        # Lido dentro do governador: a chamada ocupa a vaga até o último chunk
+        partes_conteudo: List[str] = []
+        ultimo_chunk = None
+        async with aclosing(governador.stream_async(
+            client.chat.completions, CATEGORIA_CONTEUDO, stream_options={"include_usage": True}, **parametros
+        )) as stream:
+            async for chunk in stream:
+                ultimo_chunk = chunk
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    partes_conteudo.append(delta)
+                    ao_token(delta)
+        conteudos = ["".join(partes_conteudo)]
+        somar_uso(uso_tokens, ultimo_chunk)
+    else:
+        resp = await governador.executar_async(
+            client.chat.completions, CATEGORIA_CONTEUDO, n=max(1, n), **parametros
+        )
+        somar_uso(uso_tokens, resp)
+        conteudos = _conteudos_da_resposta(resp)
+    return _variantes(conteudos, qtd_hashtags, uso_tokens)
+
+
+def gerar_conteudo_social(
+    client,
+    transcricao: str,
+    plataforma: str = "Instagram",
+    tom: str = "engajador",
+    tamanho_legenda: str = "média",
+    qtd_hashtags: int = 15,
+    ja_condensado: bool = False,
+) -> Dict[str, Any]:
+    return gerar_variantes_conteudo(
+        client, transcricao, plataforma, tom, tamanho_legenda, qtd_hashtags, ja_condensado=ja_condensado
+    )[0]
+
+
+async def gerar_conteudo_social_async(
+    client,
+    transcricao: str,
+    plataforma: str = "Instagram",
+    tom: str = "engajador",
+    tamanho_legenda: str = "média",
+    qtd_hashtags: int = 15,
+    ao_token: Optional[Callable[[str], None]] = None,
+    ja_condensado: bool = False,
+) -> Dict[str, Any]:
+    variantes = await gerar_variantes_conteudo_async(
+        client, transcricao, plataforma, tom, tamanho_legenda, qtd_hashtags,
+        ao_token=ao_token, ja_condensado=ja_condensado,
+    )
+    return variantes[0]
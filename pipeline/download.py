@@ -0,0 +1,308 @@
+"""Download de mídia por URL com sessão reaproveitada, segmentos paralelos e retomada.
+
+Uma requisição `Range: bytes=0-0` descobre o tamanho e se o servidor aceita
+Range. Arquivos grandes são baixados em segmentos paralelos, gravados
+direto na posição final do arquivo; cada segmento (ou o download único)
+continua de onde parou após uma falha de rede. O limite de bytes é checado
+antes e durante a transferência. O tipo da mídia vem dos bytes iniciais
+(assinaturas), do `Content-Type` e, em último caso, do ffprobe, não do texto
+da URL.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .sob_demanda import requests
+
+SEGMENTOS = int(os.getenv("DOWNLOAD_SEGMENTOS", "4"))
+# Abaixo desse tamanho um único stream é mais rápido que abrir várias conexões
+MIN_BYTES_SEGMENTADO = int(os.getenv("DOWNLOAD_MIN_MB_SEGMENTADO", "8")) * 1024 * 1024
+MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_MB", "1024")) * 1024 * 1024
+TENTATIVAS = int(os.getenv("DOWNLOAD_TENTATIVAS", "5"))
+TIMEOUT = (10, 60)  # conexão, leitura
+TAMANHO_BLOCO = 1024 * 1024
+
+_RE_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)")
+
+TIPOS_POR_CONTENT_TYPE = {
+    "video/mp4": ".mp4", "video/quicktime": ".mov", "video/webm": ".webm", "video/x-matroska": ".mkv",
+    "video/x-msvideo": ".avi", "audio/mpeg": ".mp3", "audio/mp3": ".mp3", "audio/wav": ".wav",
+    "audio/x-wav": ".wav", "audio/wave": ".wav", "audio/mp4": ".m4a", "audio/x-m4a": ".m4a",
+    "audio/aac": ".m4a", "audio/ogg": ".ogg", "audio/opus": ".ogg", "audio/webm": ".webm",
+}
+# format_name do ffprobe (primeiro nome da lista) -> extensão
+TIPOS_POR_FORMATO_FFPROBE = {
+    "mov": ".mp4", "matroska": ".mkv", "avi": ".avi", "mp3": ".mp3", "wav": ".wav", "ogg": ".ogg",
+}
+
+
+def _erros_rede() -> Tuple[type, ...]:
+    # Função (e não constante) para o `requests` só ser importado no primeiro download
+    return (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+
+class ErroDownload(RuntimeError):
+    """Falha no download; `status` é o código HTTP sugerido para a resposta da API."""
+
+    def __init__(self, mensagem: str, status: int = 400) -> None:
+        super().__init__(mensagem)
+        self.status = status
+
+
+_sessao: Optional[requests.Session] = None
+_lock_sessao = threading.Lock()
+
+
+def sessao() -> requests.Session:
+    """Sessão compartilhada (keep-alive e pool de conexões por host)."""
+    global _sessao
+    with _lock_sessao:
+        if _sessao is None:
+            _sessao = requests.Session()
+            adaptador = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=max(16, SEGMENTOS * 4))
+            _sessao.mount("http://", adaptador)
+            _sessao.mount("https://", adaptador)
+        return _sessao
+
+
+def extensao_por_assinatura(cabecalho: bytes) -> Optional[str]:
+    """Extensão a partir dos primeiros bytes do arquivo (None se não reconhecer)."""
+    if len(cabecalho) >= 12 and cabecalho[4:8] == b"ftyp":
+        marca = cabecalho[8:12]
+        if marca in (b"M4A ", b"M4B "):
+            return ".m4a"
+        if marca == b"qt  ":
+            return ".mov"
+        return ".mp4"
+    if cabecalho.startswith(b"\x1a\x45\xdf\xa3"):
+        return ".webm" if b"webm" in cabecalho[:64] else ".mkv"
+    if cabecalho.startswith(b"RIFF") and cabecalho[8:12] == b"WAVE":
+        return ".wav"
+    if cabecalho.startswith(b"RIFF") and cabecalho[8:12] == b"AVI ":
+        return ".avi"
+    if cabecalho.startswith(b"OggS"):
+        return ".ogg"
+    if cabecalho.startswith(b"ID3"):
+        return ".mp3"
+    if len(cabecalho) >= 2 and cabecalho[0] == 0xFF and cabecalho[1] & 0xE0 == 0xE0 and cabecalho[1] & 0x06:
+        # Sincronismo MPEG com camada != 0 (camada 0 é ADTS/AAC cru, que a API não aceita assim)
+        return ".mp3"
+    return None
+
+
+def extensao_por_ffprobe(caminho: str) -> Optional[str]:
+    try:
+        resultado = subprocess.run(
+            ["ffprobe", "-v", "error", "-show_entries", "format=format_name", "-of", "json", caminho],
+            capture_output=True, text=True, timeout=60,
+        )
+        formato = json.loads(resultado.stdout or "{}").get("format", {}).get("format_name", "")
+    except (OSError, subprocess.TimeoutExpired, json.JSONDecodeError):
+        return None
+    return TIPOS_POR_FORMATO_FFPROBE.get(formato.split(",")[0])
+
+
+def detectar_extensao(caminho: str, content_type: str = "") -> Optional[str]:
+    """Assinatura > Content-Type > ffprobe."""
+    with open(caminho, "rb") as f:
+        cabecalho = f.read(64)
+    tipo = content_type.split(";")[0].strip().lower()
+    return (
+        extensao_por_assinatura(cabecalho)
+        or TIPOS_POR_CONTENT_TYPE.get(tipo)
+        or extensao_por_ffprobe(caminho)
+    )
+
+
+def _sondar(url: str) -> Tuple[requests.Response, Optional[int], bool]:
+    """GET com `Range: bytes=0-0`: retorna (resposta, tamanho total, aceita Range).
+
+    Se o servidor ignorar o Range (200), a resposta já é o download completo.
+    Um 206 aceita Range mesmo sem o total (`bytes 0-0/*`): o corpo é só o byte 0.
+    """
+    resposta = sessao().get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=TIMEOUT)
+    if resposta.status_code == 206:
+        casamento = _RE_CONTENT_RANGE.match(resposta.headers.get("Content-Range", ""))
+        total = int(casamento.group(3)) if casamento and casamento.group(3) != "*" else None
+        return resposta, total, True
+    if resposta.status_code >= 400:
+        resposta.close()
+        raise ErroDownload(f"HTTP {resposta.status_code} ao acessar a URL.")
+    tamanho = resposta.headers.get("Content-Length")
+    return resposta, int(tamanho) if tamanho and tamanho.isdigit() else None, False
+
+
+class _Contador:
+    """Soma os bytes recebidos por todas as threads e aplica o limite.
+
+    `interromper()` faz os outros segmentos pararem no próximo bloco quando um falha.
+    """
+
+    def __init__(self, limite: int) -> None:
+        self.limite = limite
+        self.total = 0
+        self.retomadas = 0
+        self._lock = threading.Lock()
+        self._interrompido = threading.Event()
+
+    def interromper(self) -> None:
+        self._interrompido.set()
+
+    def verificar(self) -> None:
+        if self._interrompido.is_set():
+            raise ErroDownload("Download interrompido: outro segmento falhou.")
+
+    def somar(self, quantidade: int) -> None:
+        self.verificar()
+        with self._lock:
+            self.total += quantidade
+            if self.total > self.limite:
+                raise ErroDownload(f"Arquivo maior que {self.limite // (1024 * 1024)} MB.", status=413)
+
+    def retomar(self, do_zero: bool = False) -> None:
+        with self._lock:
+            self.retomadas += 1
+            if do_zero:
+                self.total = 0
+
+
+def _baixar_intervalo(
+    url: str, caminho: Path, inicio: int, fim: Optional[int], contador: _Contador,
+    resposta: Optional[requests.Response] = None, aceita_range: bool = True,
+) -> None:
+    """Baixa [inicio, fim] (fim None = até o final), retomando após falhas de rede."""
+    posicao = inicio
+    for tentativa in range(TENTATIVAS):
+        contador.verificar()
+        try:
+            if resposta is None:
+                cabecalhos = {}
+                if aceita_range:
+                    cabecalhos["Range"] = f"bytes={posicao}-" + ("" if fim is None else str(fim))
+                resposta = sessao().get(url, headers=cabecalhos, stream=True, timeout=TIMEOUT)
+                if resposta.status_code >= 500:
+                    resposta.close()
+                    raise requests.ConnectionError(f"HTTP {resposta.status_code}")
+                if resposta.status_code >= 400:
+                    raise ErroDownload(f"HTTP {resposta.status_code} ao baixar a URL.")
+                if aceita_range and resposta.status_code != 206:
+                    raise ErroDownload("O servidor deixou de aceitar Range no meio do download.")
+            with resposta, open(caminho, "r+b") as f:
+                f.seek(posicao)
+                for bloco in resposta.iter_content(chunk_size=TAMANHO_BLOCO):
+                    if fim is not None:
+                        bloco = bloco[:fim + 1 - posicao]
+                    contador.somar(len(bloco))
+                    f.write(bloco)
+                    # Avança a cada bloco: uma falha no meio retoma daqui
+                    posicao += len(bloco)
+            if fim is None or posicao > fim:
+                return
+            raise requests.exceptions.ChunkedEncodingError("conexão encerrada antes do fim do segmento")
+        except _erros_rede():
+            resposta = None
+            if tentativa == TENTATIVAS - 1:
+                raise ErroDownload("Falha de rede ao baixar a URL (tentativas esgotadas).")
+            if not aceita_range:
+                # Sem Range não há como retomar: recomeça do zero (só ocorre com download único)
+                posicao = inicio
+            contador.retomar(do_zero=not aceita_range)
+            time.sleep(min(8.0, 0.5 * 2 ** tentativa))
+
+
+def _segmentos(total: int, quantidade: int) -> List[Tuple[int, int]]:
+    tamanho = -(-total // quantidade)
+    return [(i, min(total, i + tamanho) - 1) for i in range(0, total, tamanho)]
+
+
+def baixar(
+    url: str,
+    destino_base: Path,
+    hasher: Optional["hashlib._Hash"] = None,
+    max_bytes: int = MAX_BYTES,
+    segmentos: int = SEGMENTOS,
+) -> Dict[str, Any]:
+    """Baixa `url` para `destino_base` + extensão detectada.
+
+    Retorna {caminho, bytes, segmentos, retomadas, tipo}. Levanta ErroDownload
+    (status 413 acima de `max_bytes`, 400 nos demais casos).
+    """
+    parcial = Path(str(destino_base) + ".parcial")
+    try:
+        resposta, total, aceita_range = _sondar(url)
+    except _erros_rede() as e:
+        raise ErroDownload(f"Falha ao acessar a URL: {e}")
+    content_type = resposta.headers.get("Content-Type", "")
+    if total is not None and total > max_bytes:
+        resposta.close()
+        raise ErroDownload(f"Arquivo maior que {max_bytes // (1024 * 1024)} MB.", status=413)
+    if total == 0:
+        # Sem bytes a pedir: um Range "bytes=0--1" seria inválido
+        resposta.close()
+        raise ErroDownload("A URL não tem conteúdo (0 bytes).")
+    contador = _Contador(max_bytes)
+    partes = 1
+    try:
+        with open(parcial, "wb") as f:
+            if total:
+                f.truncate(total)
+        if aceita_range and total and total >= MIN_BYTES_SEGMENTADO and segmentos > 1:
+            resposta.close()
+            intervalos = _segmentos(total, segmentos)
+            partes = len(intervalos)
+            with ThreadPoolExecutor(max_workers=partes) as executor:
+                futuros = [
+                    executor.submit(_baixar_intervalo, url, parcial, inicio, fim, contador)
+                    for inicio, fim in intervalos
+                ]
+                concluidos, _ = wait(futuros, return_when=FIRST_EXCEPTION)
+                erro = next((f.exception() for f in futuros if f in concluidos and f.exception()), None)
+                if erro is not None:
+                    # Os demais segmentos param no próximo bloco em vez de baixar o resto à toa
+                    contador.interromper()
+                    raise erro
+        elif aceita_range:
+            # A sonda só traz o byte 0 (nunca é gravada); o arquivo vem num único stream
+            # retomável, até o fim quando o servidor não informa o total
+            resposta.close()
+            _baixar_intervalo(url, parcial, 0, None if total is None else total - 1, contador)
+        else:
+            fim = total - 1 if total else None
+            _baixar_intervalo(url, parcial, 0, fim, contador, resposta=resposta, aceita_range=False)
+        # O arquivo foi pré-alocado com `total` bytes: o tamanho dele não prova nada,
+        # o que conta é o que os segmentos gravaram
+        recebidos = contador.total
+        if total is not None and recebidos != total:
+            raise ErroDownload(f"Download incompleto ({recebidos} de {total} bytes).")
+        if total is None:
+            # Um recomeço do zero (sem Range) pode deixar sobra de uma tentativa mais longa
+            with open(parcial, "r+b") as f:
+                f.truncate(recebidos)
+        if hasher is not None:
+            with open(parcial, "rb") as f:
+                while bloco := f.read(TAMANHO_BLOCO):
+                    hasher.update(bloco)
+        extensao = detectar_extensao(str(parcial), content_type)
+        if extensao is None:
+            raise ErroDownload("Não foi possível identificar o formato da mídia baixada.")
+        caminho = Path(str(destino_base) + extensao)
+        os.replace(parcial, caminho)
+    except BaseException:
+        parcial.unlink(missing_ok=True)
+        raise
+    return {
+        "caminho": caminho,
+        "bytes": recebidos,
+        "segmentos": partes,
+        "retomadas": contador.retomadas,
+        "tipo": content_type,
+    }
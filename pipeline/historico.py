@@ -0,0 +1,247 @@
+"""Histórico de transcrições em SQLite com busca de texto completo (FTS5).
+
+Cada resultado do pipeline (transcrição + conteúdo social) é guardado uma vez
+por chave do cache (mídia + prompt + idioma + modelo): processar de novo a
+mesma mídia só atualiza o conteúdo gerado. O índice FTS5 usa a própria tabela
+como conteúdo externo (sem duplicar o texto) e é mantido por triggers.
+
+A busca ordena por relevância (bm25) e pagina por cursor (keyset): a próxima
+página continua depois do último (rank, id) devolvido, sem OFFSET, então o
+custo de cada página não cresce com a profundidade da paginação.
+"""
+import base64
+import html
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+# Palavras de contexto em volta dos termos encontrados no trecho destacado
+PALAVRAS_TRECHO = 24
+# Marcadores internos do snippet(); trocados por <mark> depois de escapar o HTML
+_INICIO, _FIM = "\x02", "\x03"
+_RE_TERMO = re.compile(r'"([^"]+)"|(\S+)')
+
+
+class ErroBusca(ValueError):
+    """Consulta ou cursor inválido (HTTP 400)."""
+
+
+def consulta_fts(texto: str) -> str:
+    """Converte a busca do usuário numa consulta FTS5 segura.
+
+    Cada palavra vira um termo entre aspas (operadores e pontuação não quebram
+    a sintaxe), trechos "entre aspas" viram frases, e a última palavra aceita
+    prefixo para a busca funcionar enquanto se digita.
+    """
+    termos: List[Tuple[str, bool]] = []
+    for frase, palavra in _RE_TERMO.findall(texto):
+        valor = (frase or palavra).replace('"', "").strip()
+        if valor:
+            termos.append((f'"{valor}"', bool(palavra)))
+    if not termos:
+        return ""
+    *iniciais, (ultimo, e_palavra) = termos
+    return " ".join([t for t, _ in iniciais] + [ultimo + ("*" if e_palavra else "")])
+
+
+def _texto_conteudo(conteudo: Dict[str, Any]) -> str:
+    """Título, legenda e hashtags de todas as plataformas, para o índice."""
+    blocos = [conteudo.get("conteudo_social") or {}, *(conteudo.get("conteudos") or {}).values()]
+    partes: List[str] = []
+    for bloco in blocos:
+        if isinstance(bloco, dict):
+            partes += [str(bloco.get("titulo", "")), str(bloco.get("legenda", "")), " ".join(bloco.get("hashtags") or [])]
+    return "\n".join(p for p in partes if p)
+
+
+def _destacar(trecho: str) -> str:
+    return html.escape(trecho).replace(_INICIO, "<mark>").replace(_FIM, "</mark>")
+
+
+def _codificar_cursor(rank: float, ident: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps([rank, ident]).encode()).decode().rstrip("=")
+
+
+def _decodificar_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, ident = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return float(rank), int(ident)
+    except (ValueError, TypeError):
+        raise ErroBusca("Cursor inválido.")
+
+
+class RepositorioTranscricoes:
+    """Transcrições e conteúdos gerados, com índice FTS5."""
+
+    def __init__(self, caminho_db: Path) -> None:
+        self.caminho_db = Path(caminho_db)
+        self.caminho_db.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS transcricoes (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    chave TEXT NOT NULL UNIQUE,
+                    origem TEXT NOT NULL,
+                    hash_midia TEXT NOT NULL,
+                    prompt TEXT NOT NULL,
+                    modelo TEXT NOT NULL,
+                    transcricao TEXT NOT NULL,
+                    conteudo_texto TEXT NOT NULL,
+                    conteudo TEXT NOT NULL,
+                    criado REAL NOT NULL,
+                    atualizado REAL NOT NULL
+                );
+                CREATE VIRTUAL TABLE IF NOT EXISTS transcricoes_fts USING fts5(
+                    transcricao, conteudo_texto, origem,
+                    content='transcricoes', content_rowid='id',
+                    tokenize='unicode61 remove_diacritics 2'
+                );
+                CREATE TRIGGER IF NOT EXISTS transcricoes_ai AFTER INSERT ON transcricoes BEGIN
+                    INSERT INTO transcricoes_fts (rowid, transcricao, conteudo_texto, origem)
+                    VALUES (new.id, new.transcricao, new.conteudo_texto, new.origem);
+                END;
+                CREATE TRIGGER IF NOT EXISTS transcricoes_ad AFTER DELETE ON transcricoes BEGIN
+                    INSERT INTO transcricoes_fts (transcricoes_fts, rowid, transcricao, conteudo_texto, origem)
+                    VALUES ('delete', old.id, old.transcricao, old.conteudo_texto, old.origem);
+                END;
+                CREATE TRIGGER IF NOT EXISTS transcricoes_au AFTER UPDATE ON transcricoes BEGIN
+                    INSERT INTO transcricoes_fts (transcricoes_fts, rowid, transcricao, conteudo_texto, origem)
+                    VALUES ('delete', old.id, old.transcricao, old.conteudo_texto, old.origem);
+                    INSERT INTO transcricoes_fts (rowid, transcricao, conteudo_texto, origem)
+                    VALUES (new.id, new.transcricao, new.conteudo_texto, new.origem);
+                END;
+                """
+            )
+
+    def _conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.caminho_db, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def salvar(
+        self,
+        chave: str,
+        origem: str,
+        hash_midia: str,
+        prompt: str,
+        modelo: str,
+        transcricao: str,
+        conteudo: Dict[str, Any],
+    ) -> int:
+        """Grava (ou atualiza, pela chave) e retorna o id da transcrição.
+
+        `conteudo` é {"conteudo_social": ...} ou {"conteudos": {plataforma: ...}}.
+        """
+        agora = time.time()
+        with self._lock, self._conectar() as conn:
+            linha = conn.execute(
+                """
+                INSERT INTO transcricoes (
+                    chave, origem, hash_midia, prompt, modelo, transcricao, conteudo_texto, conteudo, criado, atualizado
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (chave) DO UPDATE SET
+                    origem = excluded.origem,
+                    conteudo_texto = excluded.conteudo_texto,
+                    conteudo = excluded.conteudo,
+                    atualizado = excluded.atualizado
+                RETURNING id
+                """,
+                (
+                    chave, origem, hash_midia, prompt, modelo, transcricao, _texto_conteudo(conteudo),
+                    json.dumps(conteudo, ensure_ascii=False), agora, agora,
+                ),
+            ).fetchone()
+        return int(linha["id"])
+
+    def obter(self, ident: int) -> Optional[Dict[str, Any]]:
+        with self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT id, origem, hash_midia, prompt, modelo, transcricao, conteudo, criado, atualizado "
+                "FROM transcricoes WHERE id = ?",
+                (ident,),
+            ).fetchone()
+        if linha is None:
+            return None
+        registro = dict(linha)
+        registro.update(json.loads(registro.pop("conteudo")))
+        return registro
+
+    def buscar(
+        self, texto: str = "", limite: int = LIMITE_PADRAO, cursor: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Página de resultados: `itens` e `proximo` (cursor da página seguinte ou None).
+
+        Sem `texto`, lista as mais recentes. Com `texto`, ordena por relevância
+        e traz `trecho` com os termos em <mark> (HTML já escapado).
+        """
+        limite = max(1, min(int(limite), LIMITE_MAXIMO))
+        consulta = consulta_fts(texto)
+        with self._conectar() as conn:
+            if not consulta:
+                parametros: List[Any] = []
+                filtro = ""
+                if cursor:
+                    filtro = "WHERE id < ?"
+                    parametros.append(_decodificar_cursor(cursor)[1])
+                linhas = conn.execute(
+                    f"SELECT id, origem, modelo, criado, substr(transcricao, 1, 240) AS trecho, 0.0 AS rank "
+                    f"FROM transcricoes {filtro} ORDER BY id DESC LIMIT ?",
+                    (*parametros, limite + 1),
+                ).fetchall()
+                itens = [{**dict(l), "trecho": html.escape(l["trecho"])} for l in linhas]
+            else:
+                parametros = [consulta]
+                filtro = ""
+                if cursor:
+                    rank, ultimo = _decodificar_cursor(cursor)
+                    filtro = "AND (rank > ? OR (rank = ? AND rowid > ?))"
+                    parametros += [rank, rank, ultimo]
+                try:
+                    # Ordenar só com (rowid, rank) e montar os trechos apenas da página:
+                    # snippet() na mesma consulta seria calculado para todas as linhas encontradas
+                    pagina = conn.execute(
+                        f"SELECT rowid, rank FROM transcricoes_fts WHERE transcricoes_fts MATCH ? {filtro} "
+                        f"ORDER BY rank, rowid LIMIT ?",
+                        (*parametros, limite + 1),
+                    ).fetchall()
+                    marcadores = ", ".join("?" for _ in pagina)
+                    detalhes = {
+                        linha["id"]: linha
+                        for linha in conn.execute(
+                            f"""
+                            SELECT t.id, t.origem, t.modelo, t.criado,
+                                   snippet(transcricoes_fts, -1, ?, ?, '…', ?) AS trecho
+                            FROM transcricoes_fts AS f JOIN transcricoes AS t ON t.id = f.rowid
+                            WHERE transcricoes_fts MATCH ? AND f.rowid IN ({marcadores})
+                            """,
+                            (_INICIO, _FIM, PALAVRAS_TRECHO, consulta, *(linha["rowid"] for linha in pagina)),
+                        ).fetchall()
+                    } if pagina else {}
+                except sqlite3.OperationalError as e:
+                    raise ErroBusca(f"Busca inválida: {e}")
+                itens = [
+                    {**dict(detalhes[l["rowid"]]), "rank": l["rank"], "trecho": _destacar(detalhes[l["rowid"]]["trecho"])}
+                    for l in pagina
+                ]
+        proximo = None
+        if len(itens) > limite:
+            itens = itens[:limite]
+            proximo = _codificar_cursor(itens[-1]["rank"], itens[-1]["id"])
+        for item in itens:
+            item["relevancia"] = round(-item.pop("rank"), 4) or 0.0
+        return {"itens": itens, "proximo": proximo}
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._conectar() as conn:
+            total = conn.execute("SELECT COUNT(*) FROM transcricoes").fetchone()[0]
+        return {"transcricoes": total, "tamanho_bytes": self.caminho_db.stat().st_size}
@@ -0,0 +1,272 @@
+"""Ingestão em streaming: o corpo multipart vai direto para o stdin do FFmpeg.
+
+Para contêineres que o FFmpeg consegue ler sequencialmente (WebM/MKV e MP4/MOV
+com o átomo `moov` antes do `mdat`), a extração de áudio acontece enquanto o
+upload chega, sem gravar o vídeo em disco. Demais formatos (ex.: MP4 com `moov`
+no final) caem para um arquivo temporário, como no fluxo tradicional.
+"""
+import asyncio
+import struct
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, AsyncContextManager, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+try:
+    from python_multipart.multipart import MultipartParser, parse_options_header
+except ImportError:  # versões antigas publicam o pacote como `multipart`
+    from multipart.multipart import MultipartParser, parse_options_header
+
+# Quantos bytes iniciais olhar no máximo para decidir se um MP4 é "faststart"
+LIMITE_CABECALHO = 4 * 1024 * 1024
+EXTENSOES_SEQUENCIAIS = {".webm", ".mkv"}
+EXTENSOES_ISO_BMFF = {".mp4", ".mov", ".m4v"}
+
+
+def e_streamavel(cabecalho: bytes, sufixo: str) -> Optional[bool]:
+    """Indica se a mídia pode ser lida pelo FFmpeg a partir de um pipe.
+
+    Retorna None quando ainda faltam bytes para decidir (MP4 cujo primeiro
+    átomo grande ainda não terminou de chegar).
+    """
+    sufixo = sufixo.lower()
+    if sufixo in EXTENSOES_SEQUENCIAIS:
+        return True
+    if sufixo not in EXTENSOES_ISO_BMFF:
+        return False
+    pos = 0
+    while pos + 8 <= len(cabecalho):
+        tamanho, tipo = struct.unpack(">I4s", cabecalho[pos:pos + 8])
+        if tipo == b"moov":
+            return True
+        if tipo == b"mdat":
+            return False
+        if tamanho == 1:
+            if pos + 16 > len(cabecalho):
+                break
+            tamanho = struct.unpack(">Q", cabecalho[pos + 8:pos + 16])[0]
+        if tamanho < 8:
+            return False
+        pos += tamanho
+    return None if len(cabecalho) < LIMITE_CABECALHO else False
+
+
+class LeitorMultipart:
+    """Adapta o parser de python-multipart (callbacks) para uma sequência de eventos.
+
+    Eventos: ("campo", nome, valor), ("arquivo", nome_campo, nome_arquivo),
+    ("dados", bytes) e ("fim_arquivo",).
+    """
+
+    def __init__(self, content_type: str) -> None:
+        _, opcoes = parse_options_header(content_type)
+        boundary = opcoes.get(b"boundary")
+        if not boundary:
+            raise ValueError("Requisição multipart sem boundary.")
+        self._eventos: List[Tuple[Any, ...]] = []
+        self._cabecalhos: Dict[bytes, bytes] = {}
+        self._campo_atual = b""
+        self._valor_atual = b""
+        self._nome_campo = ""
+        self._e_arquivo = False
+        self._valor_campo: List[bytes] = []
+        self._parser = MultipartParser(
+            boundary,
+            {
+                "on_part_begin": self._inicio_parte,
+                "on_header_field": self._campo_cabecalho,
+                "on_header_value": self._valor_cabecalho,
+                "on_header_end": self._fim_cabecalho,
+                "on_headers_finished": self._fim_cabecalhos,
+                "on_part_data": self._dados_parte,
+                "on_part_end": self._fim_parte,
+            },
+        )
+
+    def _inicio_parte(self) -> None:
+        self._cabecalhos = {}
+        self._valor_campo = []
+
+    def _campo_cabecalho(self, dados: bytes, inicio: int, fim: int) -> None:
+        self._campo_atual += dados[inicio:fim]
+
+    def _valor_cabecalho(self, dados: bytes, inicio: int, fim: int) -> None:
+        self._valor_atual += dados[inicio:fim]
+
+    def _fim_cabecalho(self) -> None:
+        self._cabecalhos[self._campo_atual.lower()] = self._valor_atual
+        self._campo_atual = b""
+        self._valor_atual = b""
+
+    def _fim_cabecalhos(self) -> None:
+        _, opcoes = parse_options_header(self._cabecalhos.get(b"content-disposition", b""))
+        self._nome_campo = opcoes.get(b"name", b"").decode("utf-8", "replace")
+        nome_arquivo = opcoes.get(b"filename")
+        self._e_arquivo = nome_arquivo is not None
+        if self._e_arquivo:
+            self._eventos.append(("arquivo", self._nome_campo, nome_arquivo.decode("utf-8", "replace")))
+
+    def _dados_parte(self, dados: bytes, inicio: int, fim: int) -> None:
+        if self._e_arquivo:
+            self._eventos.append(("dados", bytes(dados[inicio:fim])))
+        else:
+            self._valor_campo.append(bytes(dados[inicio:fim]))
+
+    def _fim_parte(self) -> None:
+        if self._e_arquivo:
+            self._eventos.append(("fim_arquivo",))
+        else:
+            self._eventos.append(("campo", self._nome_campo, b"".join(self._valor_campo).decode("utf-8", "replace")))
+
+    async def eventos(self, corpo: AsyncIterator[bytes]) -> AsyncIterator[Tuple[Any, ...]]:
+        async for bloco in corpo:
+            if not bloco:
+                continue
+            self._parser.write(bloco)
+            eventos, self._eventos = self._eventos, []
+            for evento in eventos:
+                yield evento
+        self._parser.finalize()
+        for evento in self._eventos:
+            yield evento
+        self._eventos = []
+
+
+class ExtratorStdin:
+    """Processo FFmpeg que lê a mídia do stdin e grava o áudio extraído."""
+
+    def __init__(self, comando: List[str]) -> None:
+        self.comando = comando
+        self._processo: Optional[asyncio.subprocess.Process] = None
+        self._leitura_stderr: Optional[asyncio.Task] = None
+        self._stdin_fechado = False
+
+    async def iniciar(self) -> None:
+        self._processo = await asyncio.create_subprocess_exec(
+            *self.comando,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        self._leitura_stderr = asyncio.ensure_future(self._processo.stderr.read())
+
+    async def escrever(self, dados: bytes) -> None:
+        """Envia um bloco ao FFmpeg; `drain` aplica contrapressão ao upload."""
+        if self._stdin_fechado:
+            return
+        try:
+            self._processo.stdin.write(dados)
+            await self._processo.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            # FFmpeg encerrou antes do fim do upload; o erro aparece em `finalizar`
+            self._stdin_fechado = True
+
+    async def finalizar(self, timeout: float = 1800) -> Tuple[int, str]:
+        if not self._stdin_fechado:
+            self._processo.stdin.close()
+        try:
+            stderr = await asyncio.wait_for(self._leitura_stderr, timeout)
+            codigo = await asyncio.wait_for(self._processo.wait(), timeout)
+        except BaseException:
+            self.abortar()
+            raise
+        return codigo, stderr.decode(errors="replace")
+
+    def abortar(self) -> None:
+        if self._processo is not None and self._processo.returncode is None:
+            self._processo.kill()
+        if self._leitura_stderr is not None:
+            self._leitura_stderr.cancel()
+
+
+async def receber_em_streaming(
+    content_type: str,
+    corpo: AsyncIterator[bytes],
+    pasta: Path,
+    hasher,
+    comando_extracao,
+    limite_bytes: int,
+    vaga_extracao: Optional[Callable[[], AsyncContextManager[None]]] = None,
+) -> Dict[str, Any]:
+    """Consome o corpo multipart, extraindo o áudio durante o upload quando possível.
+
+    `comando_extracao(pasta)` retorna o comando FFmpeg que lê de `pipe:0` e o
+    caminho do áudio que ele vai gravar. `vaga_extracao()` (ex.: vaga de
+    admissão) só é ocupada quando o FFmpeg vai de fato começar, e liberada
+    quando ele termina: o resto do upload, gravado em disco, não ocupa CPU.
+    Retorna os campos do formulário e `arquivo_path` (mídia em disco) ou
+    `audio_path` (áudio já extraído do stream), além de `streaming` (bool) e
+    `nome_arquivo` (nome enviado pelo cliente).
+    """
+    leitor = LeitorMultipart(content_type)
+    campos: Dict[str, str] = {}
+    resultado: Dict[str, Any] = {
+        "campos": campos, "arquivo_path": None, "audio_path": None, "streaming": False, "nome_arquivo": "",
+    }
+    cabecalho = bytearray()
+    sufixo = ""
+    decidido = False
+    extrator: Optional[ExtratorStdin] = None
+    spool = None
+    recebidos = 0
+    pilha = AsyncExitStack()
+
+    async def _decidir(forcar: bool) -> None:
+        nonlocal decidido, extrator, spool
+        streamavel = e_streamavel(bytes(cabecalho), sufixo)
+        if streamavel is None and not forcar:
+            return
+        decidido = True
+        if streamavel:
+            comando, audio_path = comando_extracao(pasta)
+            resultado["audio_path"] = Path(audio_path)
+            resultado["streaming"] = True
+            if vaga_extracao is not None:
+                await pilha.enter_async_context(vaga_extracao())
+            extrator = ExtratorStdin(comando)
+            await extrator.iniciar()
+            await extrator.escrever(bytes(cabecalho))
+        else:
+            resultado["arquivo_path"] = pasta / f"upload{sufixo or '.tmp'}"
+            spool = await asyncio.to_thread(open, resultado["arquivo_path"], "wb")
+            await asyncio.to_thread(spool.write, bytes(cabecalho))
+
+    try:
+        async for evento in leitor.eventos(corpo):
+            tipo = evento[0]
+            if tipo == "campo":
+                campos[evento[1]] = evento[2]
+            elif tipo == "arquivo":
+                if evento[1] != "arquivo" or decidido or cabecalho:
+                    raise ValueError("Envie um único campo 'arquivo'.")
+                sufixo = Path(evento[2]).suffix
+                resultado["nome_arquivo"] = evento[2]
+            elif tipo == "dados":
+                dados = evento[1]
+                recebidos += len(dados)
+                if recebidos > limite_bytes:
+                    raise OverflowError("Arquivo maior que o limite permitido.")
+                hasher.update(dados)
+                if not decidido:
+                    cabecalho.extend(dados)
+                    await _decidir(forcar=False)
+                elif extrator is not None:
+                    await extrator.escrever(dados)
+                else:
+                    await asyncio.to_thread(spool.write, dados)
+            elif tipo == "fim_arquivo" and not decidido:
+                await _decidir(forcar=True)
+        if not decidido:
+            raise ValueError("Nenhum arquivo enviado.")
+        if extrator is not None:
+            codigo, stderr = await extrator.finalizar()
+            if codigo != 0:
+                raise RuntimeError(f"Erro ao extrair áudio: {stderr}")
+    except BaseException:
+        if extrator is not None:
+            extrator.abortar()
+        raise
+    finally:
+        await pilha.aclose()
+        if spool is not None:
+            await asyncio.to_thread(spool.close)
+    return resultado
@@ -0,0 +1,237 @@
+"""Fila de jobs de transcrição com estado persistido em SQLite.
+
+Cada job guarda os parâmetros do formulário, a etapa atual, o tempo gasto em
+cada etapa e o resultado. Jobs não finalizados voltam para a fila quando o
+processo reinicia.
+"""
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+ETAPA_NA_FILA = "na_fila"
+ETAPAS_FINAIS = {"concluido", "erro", "cancelado"}
+
+
+class RepositorioJobs:
+    """Persistência dos jobs (um registro por job, tempos e resultado em JSON)."""
+
+    def __init__(self, caminho_db: Path) -> None:
+        self.caminho_db = Path(caminho_db)
+        self.caminho_db.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    etapa TEXT NOT NULL,
+                    params TEXT NOT NULL,
+                    hash_midia TEXT,
+                    caminho_midia TEXT,
+                    tempos TEXT NOT NULL,
+                    resultado TEXT,
+                    erro TEXT,
+                    criado REAL NOT NULL,
+                    etapa_inicio REAL NOT NULL,
+                    atualizado REAL NOT NULL
+                )
+                """
+            )
+
+    def _conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.caminho_db, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def criar(self, params: Dict[str, Any]) -> str:
+        job_id = uuid.uuid4().hex
+        agora = time.time()
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, etapa, params, tempos, criado, etapa_inicio, atualizado) "
+                "VALUES (?, ?, ?, '{}', ?, ?, ?)",
+                (job_id, ETAPA_NA_FILA, json.dumps(params), agora, agora, agora),
+            )
+        return job_id
+
+    def obter(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._conectar() as conn:
+            linha = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if linha is None:
+            return None
+        job = dict(linha)
+        job["params"] = json.loads(job["params"])
+        job["tempos"] = json.loads(job["tempos"])
+        job["resultado"] = json.loads(job["resultado"]) if job["resultado"] else None
+        return job
+
+    def _atualizar(self, job_id: str, etapa: str, instante: Optional[float] = None, **campos: Any) -> None:
+        """Fecha o tempo da etapa atual e passa o job para `etapa` (em `instante`, padrão agora)."""
+        agora = instante or time.time()
+        with self._lock, self._conectar() as conn:
+            linha = conn.execute(
+                "SELECT etapa, tempos, etapa_inicio FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if linha is None or linha["etapa"] in ETAPAS_FINAIS:
+                return
+            tempos = json.loads(linha["tempos"])
+            anterior = linha["etapa"]
+            tempos[anterior] = round(tempos.get(anterior, 0.0) + agora - linha["etapa_inicio"], 3)
+            sets = ["etapa = ?", "tempos = ?", "etapa_inicio = ?", "atualizado = ?"]
+            valores: List[Any] = [etapa, json.dumps(tempos), agora, agora]
+            for nome, valor in campos.items():
+                sets.append(f"{nome} = ?")
+                valores.append(valor)
+            conn.execute(f"UPDATE jobs SET {', '.join(sets)} WHERE id = ?", (*valores, job_id))
+
+    def mudar_etapa(self, job_id: str, etapa: str, instante: Optional[float] = None) -> None:
+        self._atualizar(job_id, etapa, instante)
+
+    def anexar_midia(self, job_id: str, hash_midia: str, caminho_midia: str) -> None:
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "UPDATE jobs SET hash_midia = ?, caminho_midia = ? WHERE id = ?",
+                (hash_midia, caminho_midia, job_id),
+            )
+
+    def concluir(self, job_id: str, resultado: Dict[str, Any]) -> None:
+        self._atualizar(job_id, "concluido", resultado=json.dumps(resultado, ensure_ascii=False))
+
+    def falhar(self, job_id: str, erro: str) -> None:
+        self._atualizar(job_id, "erro", erro=erro)
+
+    def cancelar(self, job_id: str) -> None:
+        self._atualizar(job_id, "cancelado")
+
+    def reiniciar_pendentes(self) -> List[str]:
+        """Devolve à fila os jobs interrompidos (ex.: reinício do worker) e retorna seus ids."""
+        with self._lock, self._conectar() as conn:
+            finais = ", ".join("?" for _ in ETAPAS_FINAIS)
+            ids = [
+                linha["id"]
+                for linha in conn.execute(
+                    f"SELECT id FROM jobs WHERE etapa NOT IN ({finais}) ORDER BY criado",
+                    tuple(ETAPAS_FINAIS),
+                ).fetchall()
+            ]
+            agora = time.time()
+            conn.executemany(
+                "UPDATE jobs SET etapa = ?, etapa_inicio = ?, atualizado = ? WHERE id = ?",
+                [(ETAPA_NA_FILA, agora, agora, job_id) for job_id in ids],
+            )
+        return ids
+
+
+class FilaJobs:
+    """Pool limitado de workers asyncio que executa os jobs do repositório.
+
+    `executar(job, notificar)` roda o pipeline e retorna o resultado;
+    `notificar(etapa)` registra a etapa corrente. `limpar(job)` é chamado
+    quando o job chega a um estado final.
+    """
+
+    def __init__(
+        self,
+        repositorio: RepositorioJobs,
+        executar: Callable[[Dict[str, Any], Callable[[str], None]], Awaitable[Dict[str, Any]]],
+        limpar: Callable[[Dict[str, Any]], None],
+        max_workers: int,
+    ) -> None:
+        self.repositorio = repositorio
+        self._executar = executar
+        self._limpar = limpar
+        self.max_workers = max_workers
+        self._fila: "asyncio.Queue[str]" = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._em_execucao: Dict[str, asyncio.Task] = {}
+        self._cancelados: Set[str] = set()
+
+    async def iniciar(self) -> None:
+        for job_id in await asyncio.to_thread(self.repositorio.reiniciar_pendentes):
+            self._fila.put_nowait(job_id)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.max_workers)]
+
+    async def parar(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def enviar(self, job_id: str) -> None:
+        self._fila.put_nowait(job_id)
+
+    def tamanho_fila(self) -> int:
+        return self._fila.qsize()
+
+    async def cancelar(self, job_id: str) -> bool:
+        """Cancela o job; se estiver rodando, a tarefa é cancelada (e o FFmpeg encerrado)."""
+        job = await asyncio.to_thread(self.repositorio.obter, job_id)
+        if job is None or job["etapa"] in ETAPAS_FINAIS:
+            return False
+        tarefa = self._em_execucao.get(job_id)
+        if tarefa is not None:
+            self._cancelados.add(job_id)
+            tarefa.cancel()
+        else:
+            await asyncio.to_thread(self.repositorio.cancelar, job_id)
+            await asyncio.to_thread(self._limpar, job)
+        return True
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._fila.get()
+            try:
+                await self._processar(job_id)
+            finally:
+                self._fila.task_done()
+
+    async def _processar(self, job_id: str) -> None:
+        job = await asyncio.to_thread(self.repositorio.obter, job_id)
+        if job is None or job["etapa"] in ETAPAS_FINAIS:
+            return
+
+        # Só mudanças de etapa vão ao SQLite, numa thread e em ordem: uma tarefa grava a
+        # etapa mais recente e repete enquanto chegam outras (notificar roda no event loop)
+        estado: Dict[str, Any] = {"etapa": job["etapa"], "instante": 0.0, "gravacao": None}
+
+        async def _gravar_etapas() -> None:
+            while True:
+                etapa, instante = estado["etapa"], estado["instante"]
+                await asyncio.to_thread(self.repositorio.mudar_etapa, job_id, etapa, instante)
+                if estado["etapa"] == etapa:
+                    return
+
+        def notificar(etapa: str) -> None:
+            if etapa == estado["etapa"]:
+                return
+            estado["etapa"], estado["instante"] = etapa, time.time()
+            if estado["gravacao"] is None or estado["gravacao"].done():
+                estado["gravacao"] = asyncio.ensure_future(_gravar_etapas())
+
+        tarefa = asyncio.create_task(self._executar(job, notificar))
+        self._em_execucao[job_id] = tarefa
+        try:
+            try:
+                resultado = await tarefa
+            finally:
+                # A etapa final não pode ser sobrescrita por uma gravação atrasada
+                if estado["gravacao"] is not None:
+                    await asyncio.gather(estado["gravacao"], return_exceptions=True)
+        except asyncio.CancelledError:
+            if job_id not in self._cancelados:
+                # Worker encerrado (desligamento): o job continua pendente e é retomado no próximo início
+                raise
+            self._cancelados.discard(job_id)
+            await asyncio.to_thread(self.repositorio.cancelar, job_id)
+        except Exception as e:
+            await asyncio.to_thread(self.repositorio.falhar, job_id, str(getattr(e, "detail", e)))
+        else:
+            await asyncio.to_thread(self.repositorio.concluir, job_id, resultado)
+        finally:
+            self._em_execucao.pop(job_id, None)
+        await asyncio.to_thread(self._limpar, job)
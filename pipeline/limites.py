@@ -0,0 +1,401 @@
+"""Governador de chamadas à OpenAI: limites por minuto, fila com prioridade e retentativas.
+
+Todas as chamadas (Whisper e chat) passam por um único `Governador`, que
+mantém baldes de requisições e tokens por minuto para cada categoria,
+ajustados pelos cabeçalhos `x-ratelimit-*` das respostas. Em vez de falhar,
+as chamadas esperam na fila (transcrição antes de geração de conteúdo) e
+erros 429/5xx/conexão são repetidos com backoff exponencial com jitter.
+Funciona tanto com o cliente síncrono (Streamlit) quanto com o assíncrono.
+"""
+import asyncio
+import itertools
+import os
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .sob_demanda import openai
+
+CATEGORIA_TRANSCRICAO = "transcricao"
+CATEGORIA_CONTEUDO = "conteudo"
+# Menor número = maior prioridade
+PRIORIDADES = {CATEGORIA_TRANSCRICAO: 0, CATEGORIA_CONTEUDO: 1}
+
+LIMITES_PADRAO = {
+    CATEGORIA_TRANSCRICAO: (
+        int(os.getenv("OPENAI_RPM_TRANSCRICAO", "50")),
+        0,  # Whisper não é limitado por tokens
+    ),
+    CATEGORIA_CONTEUDO: (
+        int(os.getenv("OPENAI_RPM_CONTEUDO", "500")),
+        int(os.getenv("OPENAI_TPM_CONTEUDO", "200000")),
+    ),
+}
+MAX_SIMULTANEAS = int(os.getenv("OPENAI_MAX_SIMULTANEAS", "16"))
+MAX_TENTATIVAS = int(os.getenv("OPENAI_MAX_TENTATIVAS", "6"))
+BACKOFF_BASE_S = float(os.getenv("OPENAI_BACKOFF_BASE_S", "1.0"))
+BACKOFF_MAX_S = float(os.getenv("OPENAI_BACKOFF_MAX_S", "30"))
+INTERVALO_VERIFICACAO_S = 0.05
+# Estimativa grosseira para pt-BR; evita depender de um tokenizador local
+CARACTERES_POR_TOKEN = 4
+
+_RE_DURACAO = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_FATOR_DURACAO = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def estimar_tokens(texto: str) -> int:
+    return len(texto) // CARACTERES_POR_TOKEN + 1
+
+
+def ler_duracao(valor: Optional[str]) -> Optional[float]:
+    """Converte durações no formato da OpenAI ("1s", "6m0s", "120ms") para segundos."""
+    if not valor:
+        return None
+    partes = _RE_DURACAO.findall(valor)
+    if not partes:
+        try:
+            return float(valor)
+        except ValueError:
+            return None
+    return sum(float(numero) * _FATOR_DURACAO[unidade] for numero, unidade in partes)
+
+
+class BaldeTokens:
+    """Balde que se reabastece continuamente até `capacidade` por minuto (0 = ilimitado)."""
+
+    def __init__(self, capacidade_por_minuto: int) -> None:
+        self.capacidade = float(capacidade_por_minuto)
+        self.disponivel = self.capacidade
+        self._ultimo = time.monotonic()
+
+    def _repor(self, agora: float) -> None:
+        if self.capacidade > 0:
+            self.disponivel = min(self.capacidade, self.disponivel + (agora - self._ultimo) * self.capacidade / 60)
+        self._ultimo = agora
+
+    def espera(self, quantidade: float, agora: float) -> float:
+        if self.capacidade <= 0:
+            return 0.0
+        self._repor(agora)
+        # Pedido maior que o balde inteiro: espera encher e deixa passar
+        quantidade = min(quantidade, self.capacidade)
+        if self.disponivel >= quantidade:
+            return 0.0
+        return (quantidade - self.disponivel) * 60 / self.capacidade
+
+    def consumir(self, quantidade: float) -> None:
+        if self.capacidade > 0:
+            self.disponivel -= quantidade
+
+    def ajustar(self, limite: Optional[int], restante: Optional[int], agora: float) -> None:
+        """Sincroniza com os cabeçalhos da API (valores autoritativos)."""
+        if limite:
+            self.capacidade = float(limite)
+        if restante is not None and self.capacidade > 0:
+            self._repor(agora)
+            self.disponivel = min(self.disponivel, float(restante))
+
+
+class _Ticket:
+    __slots__ = ("categoria", "prioridade", "seq", "tokens", "entrada")
+
+    def __init__(self, categoria: str, seq: int, tokens: int) -> None:
+        self.categoria = categoria
+        self.prioridade = PRIORIDADES.get(categoria, len(PRIORIDADES))
+        self.seq = seq
+        self.tokens = tokens
+        self.entrada = time.monotonic()
+
+
+def _inteiro(valor: Optional[str]) -> Optional[int]:
+    try:
+        return int(valor) if valor is not None else None
+    except ValueError:
+        return None
+
+
+def _e_transitorio(erro: Exception) -> bool:
+    if isinstance(erro, (openai.RateLimitError, openai.APIConnectionError, openai.APITimeoutError)):
+        return True
+    return isinstance(erro, openai.APIStatusError) and erro.status_code >= 500
+
+
+class Governador:
+    """Fila única para as chamadas à OpenAI de todo o processo."""
+
+    def __init__(
+        self,
+        limites: Optional[Dict[str, Tuple[int, int]]] = None,
+        max_simultaneas: int = MAX_SIMULTANEAS,
+        max_tentativas: int = MAX_TENTATIVAS,
+    ) -> None:
+        self.max_simultaneas = max_simultaneas
+        self.max_tentativas = max_tentativas
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._fila: List[_Ticket] = []
+        self._em_execucao = 0
+        self._baldes: Dict[str, Tuple[BaldeTokens, BaldeTokens]] = {
+            categoria: (BaldeTokens(rpm), BaldeTokens(tpm))
+            for categoria, (rpm, tpm) in (limites or LIMITES_PADRAO).items()
+        }
+        self._bloqueado_ate: Dict[str, float] = {}
+        self._stats: Dict[str, Dict[str, float]] = {
+            categoria: {"chamadas": 0, "retentativas": 0, "limitadas_429": 0, "falhas": 0,
+                        "espera_total_s": 0.0, "espera_max_s": 0.0}
+            for categoria in self._baldes
+        }
+
+    # --- Reserva de capacidade -------------------------------------------------
+
+    def _espera_ticket(self, ticket: _Ticket, agora: float) -> float:
+        rpm, tpm = self._baldes[ticket.categoria]
+        return max(
+            self._bloqueado_ate.get(ticket.categoria, 0.0) - agora,
+            rpm.espera(1, agora),
+            tpm.espera(ticket.tokens, agora),
+            0.0,
+        )
+
+    def _tentar_reservar(self, ticket: _Ticket) -> float:
+        """Reserva a vez do ticket e retorna 0, ou quanto esperar antes de tentar de novo.
+
+        Dentro de uma categoria a ordem é FIFO; uma vaga livre vai primeiro
+        para a categoria de maior prioridade que já possa ser atendida.
+        """
+        agora = time.monotonic()
+        with self._lock:
+            if self._em_execucao >= self.max_simultaneas:
+                return INTERVALO_VERIFICACAO_S
+            espera = self._espera_ticket(ticket, agora)
+            primeiro = min(
+                (t for t in self._fila if t.categoria == ticket.categoria), key=lambda t: t.seq
+            )
+            if primeiro is not ticket:
+                return max(espera, INTERVALO_VERIFICACAO_S)
+            if espera > 0:
+                # Revisita a cada segundo: cabeçalhos novos podem liberar antes
+                return min(espera, 1.0)
+            if any(
+                outro.prioridade < ticket.prioridade and self._espera_ticket(outro, agora) == 0
+                for outro in self._fila
+            ):
+                return INTERVALO_VERIFICACAO_S
+            rpm, tpm = self._baldes[ticket.categoria]
+            rpm.consumir(1)
+            tpm.consumir(ticket.tokens)
+            self._fila.remove(ticket)
+            self._em_execucao += 1
+            esperado = agora - ticket.entrada
+            stats = self._stats[ticket.categoria]
+            stats["chamadas"] += 1
+            stats["espera_total_s"] += esperado
+            stats["espera_max_s"] = max(stats["espera_max_s"], esperado)
+            return 0.0
+
+    def _entrar(self, categoria: str, tokens: int) -> _Ticket:
+        if categoria not in self._baldes:
+            raise ValueError(f"Categoria desconhecida: {categoria}")
+        ticket = _Ticket(categoria, next(self._seq), tokens)
+        with self._lock:
+            self._fila.append(ticket)
+        return ticket
+
+    def _desistir(self, ticket: _Ticket) -> None:
+        with self._lock:
+            if ticket in self._fila:
+                self._fila.remove(ticket)
+
+    def _liberar(self) -> None:
+        with self._lock:
+            self._em_execucao -= 1
+
+    # --- Retorno da API --------------------------------------------------------
+
+    def _registrar_cabecalhos(self, categoria: str, cabecalhos: Any) -> None:
+        if cabecalhos is None:
+            return
+        agora = time.monotonic()
+        rpm, tpm = self._baldes[categoria]
+        with self._lock:
+            rpm.ajustar(
+                _inteiro(cabecalhos.get("x-ratelimit-limit-requests")),
+                _inteiro(cabecalhos.get("x-ratelimit-remaining-requests")),
+                agora,
+            )
+            tpm.ajustar(
+                _inteiro(cabecalhos.get("x-ratelimit-limit-tokens")),
+                _inteiro(cabecalhos.get("x-ratelimit-remaining-tokens")),
+                agora,
+            )
+
+    def _espera_retentativa(self, categoria: str, erro: Exception, tentativa: int) -> float:
+        """Backoff exponencial com jitter; um 429 pausa a categoria inteira."""
+        espera = random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** tentativa))
+        resposta = getattr(erro, "response", None)
+        cabecalhos = getattr(resposta, "headers", None)
+        with self._lock:
+            stats = self._stats[categoria]
+            stats["retentativas"] += 1
+            if isinstance(erro, openai.RateLimitError):
+                stats["limitadas_429"] += 1
+                sugerido = None
+                if cabecalhos is not None:
+                    sugerido = ler_duracao(cabecalhos.get("retry-after")) or max(
+                        ler_duracao(cabecalhos.get("x-ratelimit-reset-requests")) or 0,
+                        ler_duracao(cabecalhos.get("x-ratelimit-reset-tokens")) or 0,
+                    )
+                if sugerido:
+                    espera = sugerido + random.uniform(0, BACKOFF_BASE_S)
+                self._bloqueado_ate[categoria] = max(
+                    self._bloqueado_ate.get(categoria, 0.0), time.monotonic() + espera
+                )
+        return espera
+
+    def _pode_repetir(self, categoria: str, erro: Exception, tentativa: int) -> bool:
+        if _e_transitorio(erro) and tentativa + 1 < self.max_tentativas:
+            return True
+        self._registrar_falha(categoria)
+        return False
+
+    def _registrar_falha(self, categoria: str) -> None:
+        with self._lock:
+            self._stats[categoria]["falhas"] += 1
+
+    @staticmethod
+    def _tokens_estimados(kwargs: Dict[str, Any]) -> int:
+        mensagens = kwargs.get("messages") or []
+        texto = "".join(str(m.get("content", "")) for m in mensagens if isinstance(m, dict))
+        return estimar_tokens(texto) + int(kwargs.get("max_tokens") or 0) * int(kwargs.get("n") or 1)
+
+    @staticmethod
+    def _rebobinar(kwargs: Dict[str, Any]) -> None:
+        # Arquivo de áudio já lido na tentativa anterior
+        arquivo = kwargs.get("file")
+        if hasattr(arquivo, "seek"):
+            arquivo.seek(0)
+
+    # --- Execução --------------------------------------------------------------
+
+    def executar(self, recurso: Any, categoria: str, **kwargs: Any) -> Any:
+        """Chama `recurso.create(**kwargs)` (cliente síncrono) respeitando limites e retentativas."""
+        tokens = self._tokens_estimados(kwargs)
+        tentativa = 0
+        while True:
+            ticket = self._entrar(categoria, tokens)
+            try:
+                while (espera := self._tentar_reservar(ticket)) > 0:
+                    time.sleep(espera)
+            except BaseException:
+                self._desistir(ticket)
+                raise
+            try:
+                bruta = recurso.with_raw_response.create(**kwargs)
+                self._registrar_cabecalhos(categoria, bruta.headers)
+                return bruta.parse()
+            except Exception as erro:
+                if not self._pode_repetir(categoria, erro, tentativa):
+                    raise
+                espera = self._espera_retentativa(categoria, erro, tentativa)
+            finally:
+                self._liberar()
+            time.sleep(espera)
+            self._rebobinar(kwargs)
+            tentativa += 1
+
+    async def _aguardar_vez_async(self, categoria: str, tokens: int) -> None:
+        """Entra na fila e espera a vaga sem bloquear o event loop; quem sai depois chama `_liberar`."""
+        ticket = self._entrar(categoria, tokens)
+        try:
+            while (espera := self._tentar_reservar(ticket)) > 0:
+                await asyncio.sleep(espera)
+        except BaseException:
+            self._desistir(ticket)
+            raise
+
+    async def executar_async(self, recurso: Any, categoria: str, **kwargs: Any) -> Any:
+        """Versão para o cliente assíncrono; a espera na fila não bloqueia o event loop."""
+        tokens = self._tokens_estimados(kwargs)
+        tentativa = 0
+        while True:
+            await self._aguardar_vez_async(categoria, tokens)
+            try:
+                bruta = await recurso.with_raw_response.create(**kwargs)
+                self._registrar_cabecalhos(categoria, bruta.headers)
+                return bruta.parse()
+            except Exception as erro:
+                if not self._pode_repetir(categoria, erro, tentativa):
+                    raise
+                espera = self._espera_retentativa(categoria, erro, tentativa)
+            finally:
+                self._liberar()
+            await asyncio.sleep(espera)
+            self._rebobinar(kwargs)
+            tentativa += 1
+
+    async def stream_async(self, recurso: Any, categoria: str, **kwargs: Any) -> AsyncIterator[Any]:
+        """`recurso.create(stream=True, **kwargs)` rendendo os chunks, com a vaga ocupada até o fim do stream.
+
+        Use com `contextlib.aclosing` para liberar a vaga se parar antes do fim.
+        Falhas antes do primeiro chunk são repetidas como em `executar_async`;
+        depois dele só são contadas (o que já foi entregue não volta).
+        """
+        tokens = self._tokens_estimados(kwargs)
+        tentativa = 0
+        while True:
+            await self._aguardar_vez_async(categoria, tokens)
+            entregou = False
+            try:
+                bruta = await recurso.with_raw_response.create(stream=True, **kwargs)
+                self._registrar_cabecalhos(categoria, bruta.headers)
+                stream = bruta.parse()
+                try:
+                    async for chunk in stream:
+                        entregou = True
+                        yield chunk
+                finally:
+                    fechar = getattr(stream, "close", None)
+                    if fechar is not None:
+                        await fechar()
+                return
+            except Exception as erro:
+                if entregou:
+                    self._registrar_falha(categoria)
+                    raise
+                if not self._pode_repetir(categoria, erro, tentativa):
+                    raise
+                espera = self._espera_retentativa(categoria, erro, tentativa)
+            finally:
+                self._liberar()
+            await asyncio.sleep(espera)
+            tentativa += 1
+
+    def estatisticas(self) -> Dict[str, Any]:
+        agora = time.monotonic()
+        with self._lock:
+            categorias: Dict[str, Any] = {}
+            for categoria, (rpm, tpm) in self._baldes.items():
+                na_fila = [t for t in self._fila if t.categoria == categoria]
+                stats = dict(self._stats[categoria])
+                atendidas = stats["chamadas"]
+                stats["espera_media_s"] = round(stats.pop("espera_total_s") / atendidas, 3) if atendidas else 0.0
+                stats["espera_max_s"] = round(stats["espera_max_s"], 3)
+                categorias[categoria] = {
+                    **stats,
+                    "na_fila": len(na_fila),
+                    "espera_atual_max_s": round(max((agora - t.entrada for t in na_fila), default=0.0), 3),
+                    "limite_rpm": int(rpm.capacidade),
+                    "limite_tpm": int(tpm.capacidade),
+                    "bloqueado_por_s": round(max(0.0, self._bloqueado_ate.get(categoria, 0.0) - agora), 3),
+                }
+            return {
+                "em_execucao": self._em_execucao,
+                "max_simultaneas": self.max_simultaneas,
+                "na_fila": len(self._fila),
+                "categorias": categorias,
+            }
+
+
+governador = Governador()
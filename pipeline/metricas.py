@@ -0,0 +1,240 @@
+"""Métricas do pipeline no formato de texto do Prometheus (sem dependências externas).
+
+Cada etapa (upload, download, extração, VAD, transcrição, geração) registra
+sua duração num histograma, bytes de entrada/saída, erros por etapa e as
+requisições em andamento. `medir(etapa, tempos)` cuida disso e também anota
+a duração em `tempos`, que volta na resposta da API e no painel de debug do
+Streamlit.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+Rotulos = Tuple[Tuple[str, str], ...]
+
+BUCKETS_SEGUNDOS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+BUCKETS_AUDIO_SEGUNDOS = (10, 30, 60, 300, 600, 1200, 1800, 3600, 7200)
+
+
+def _rotulos(valores: Dict[str, str]) -> Rotulos:
+    return tuple(sorted((k, str(v)) for k, v in valores.items()))
+
+
+def _escapar(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatar_rotulos(rotulos: Rotulos, extra: Optional[Tuple[str, str]] = None) -> str:
+    pares = list(rotulos) + ([extra] if extra else [])
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+def _numero(valor: float) -> str:
+    return str(int(valor)) if float(valor).is_integer() else repr(float(valor))
+
+
+class _Metrica:
+    tipo = ""
+
+    def __init__(self, nome: str, ajuda: str) -> None:
+        self.nome = nome
+        self.ajuda = ajuda
+        self._lock = threading.Lock()
+
+    def _cabecalho(self) -> List[str]:
+        return [f"# HELP {self.nome} {self.ajuda}", f"# TYPE {self.nome} {self.tipo}"]
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def __init__(self, nome: str, ajuda: str) -> None:
+        super().__init__(nome, ajuda)
+        self._valores: Dict[Rotulos, float] = {}
+
+    def inc(self, valor: float = 1, **rotulos: str) -> None:
+        chave = _rotulos(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    def exportar(self) -> List[str]:
+        with self._lock:
+            return self._cabecalho() + [
+                f"{self.nome}{_formatar_rotulos(r)} {_numero(v)}" for r, v in sorted(self._valores.items())
+            ]
+
+
+class Medidor(_Metrica):
+    tipo = "gauge"
+
+    def __init__(self, nome: str, ajuda: str) -> None:
+        super().__init__(nome, ajuda)
+        self._valores: Dict[Rotulos, float] = {}
+
+    def definir(self, valor: float, **rotulos: str) -> None:
+        with self._lock:
+            self._valores[_rotulos(rotulos)] = valor
+
+    def inc(self, valor: float = 1, **rotulos: str) -> None:
+        chave = _rotulos(rotulos)
+        with self._lock:
+            self._valores[chave] = self._valores.get(chave, 0.0) + valor
+
+    @contextmanager
+    def acompanhar(self, **rotulos: str) -> Iterator[None]:
+        """Incrementa durante o bloco (ex.: requisições em andamento)."""
+        self.inc(1, **rotulos)
+        try:
+            yield
+        finally:
+            self.inc(-1, **rotulos)
+
+    def exportar(self) -> List[str]:
+        with self._lock:
+            return self._cabecalho() + [
+                f"{self.nome}{_formatar_rotulos(r)} {_numero(v)}" for r, v in sorted(self._valores.items())
+            ]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nome: str, ajuda: str, buckets: Sequence[float] = BUCKETS_SEGUNDOS) -> None:
+        super().__init__(nome, ajuda)
+        self.buckets = tuple(sorted(buckets))
+        # rótulos -> (contagens por bucket, soma, total)
+        self._series: Dict[Rotulos, Tuple[List[int], float, int]] = {}
+
+    def observar(self, valor: float, **rotulos: str) -> None:
+        chave = _rotulos(rotulos)
+        with self._lock:
+            contagens, soma, total = self._series.get(chave, ([0] * len(self.buckets), 0.0, 0))
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    contagens[i] += 1
+            self._series[chave] = (contagens, soma + valor, total + 1)
+
+    def exportar(self) -> List[str]:
+        linhas = self._cabecalho()
+        with self._lock:
+            for rotulos, (contagens, soma, total) in sorted(self._series.items()):
+                for limite, contagem in zip(self.buckets, contagens):
+                    linhas.append(f"{self.nome}_bucket{_formatar_rotulos(rotulos, ('le', _numero(limite)))} {contagem}")
+                linhas.append(f"{self.nome}_bucket{_formatar_rotulos(rotulos, ('le', '+Inf'))} {total}")
+                linhas.append(f"{self.nome}_sum{_formatar_rotulos(rotulos)} {_numero(soma)}")
+                linhas.append(f"{self.nome}_count{_formatar_rotulos(rotulos)} {total}")
+        return linhas
+
+
+class Registro:
+    def __init__(self) -> None:
+        self._metricas: List[_Metrica] = []
+
+    def registrar(self, metrica: _Metrica) -> _Metrica:
+        self._metricas.append(metrica)
+        return metrica
+
+    def exportar(self) -> str:
+        linhas: List[str] = []
+        for metrica in self._metricas:
+            linhas.extend(metrica.exportar())
+        return "\n".join(linhas) + "\n"
+
+
+registro = Registro()
+
+duracao_etapa = registro.registrar(Histograma(
+    "transcricao_etapa_duracao_segundos", "Duração de cada etapa do pipeline."
+))
+bytes_etapa = registro.registrar(Contador(
+    "transcricao_etapa_bytes_total", "Bytes de entrada/saída por etapa."
+))
+duracao_audio = registro.registrar(Histograma(
+    "transcricao_audio_duracao_segundos", "Duração do áudio enviado para transcrição.", BUCKETS_AUDIO_SEGUNDOS
+))
+tokens = registro.registrar(Contador(
+    "openai_tokens_total", "Tokens consumidos nas chamadas de chat (resp.usage)."
+))
+erros_etapa = registro.registrar(Contador(
+    "transcricao_erros_total", "Erros por etapa do pipeline."
+))
+em_andamento = registro.registrar(Medidor(
+    "transcricao_requisicoes_em_andamento", "Requisições sendo processadas agora."
+))
+fila_openai = registro.registrar(Medidor(
+    "openai_fila_chamadas", "Chamadas à OpenAI aguardando na fila do governador."
+))
+espera_admissao = registro.registrar(Histograma(
+    "admissao_espera_segundos", "Tempo na fila de admissão até conseguir uma vaga, por recurso."
+))
+fila_admissao = registro.registrar(Medidor(
+    "admissao_fila", "Pedidos aguardando vaga na fila de admissão, por recurso."
+))
+vagas_em_uso = registro.registrar(Medidor(
+    "admissao_vagas_em_uso", "Vagas de admissão ocupadas, por recurso."
+))
+recusas_admissao = registro.registrar(Contador(
+    "admissao_recusas_total", "Pedidos recusados com 503 (fila cheia ou espera esgotada), por recurso."
+))
+requisicoes_coalescidas = registro.registrar(Contador(
+    "transcricao_requisicoes_coalescidas_total",
+    "Requisições que aproveitaram um processamento idêntico já em andamento, por tipo de mídia.",
+))
+uso_armazenamento = registro.registrar(Medidor(
+    "armazenamento_uso_bytes", "Bytes ocupados pelas pastas de trabalho, por local (disco ou memória)."
+))
+reserva_armazenamento = registro.registrar(Medidor(
+    "armazenamento_reservado_bytes", "Bytes reservados pelas áreas em uso e ainda não ocupados, por local."
+))
+cota_armazenamento = registro.registrar(Medidor(
+    "armazenamento_cota_bytes", "Cota das pastas de trabalho, por local."
+))
+areas_armazenamento = registro.registrar(Medidor(
+    "armazenamento_areas", "Áreas de trabalho abertas neste processo, por local."
+))
+faxina_itens = registro.registrar(Contador(
+    "armazenamento_faxina_itens_total", "Pastas e arquivos órfãos removidos pela faxina."
+))
+faxina_bytes = registro.registrar(Contador(
+    "armazenamento_faxina_bytes_total", "Bytes liberados pela faxina."
+))
+
+
+@contextmanager
+def medir(etapa: str, tempos: Optional[Dict[str, float]] = None) -> Iterator[None]:
+    """Cronometra a etapa; em caso de exceção conta um erro da etapa e repassa a exceção."""
+    inicio = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        # Cancelamento (cliente desconectou, job cancelado) não é erro da etapa
+        if isinstance(e, Exception):
+            erros_etapa.inc(etapa=etapa)
+        raise
+    finally:
+        duracao = time.perf_counter() - inicio
+        duracao_etapa.observar(duracao, etapa=etapa)
+        if tempos is not None:
+            tempos[etapa] = round(tempos.get(etapa, 0.0) + duracao, 3)
+
+
+def registrar_bytes(etapa: str, entrada: int = 0, saida: int = 0) -> None:
+    if entrada:
+        bytes_etapa.inc(entrada, etapa=etapa, direcao="entrada")
+    if saida:
+        bytes_etapa.inc(saida, etapa=etapa, direcao="saida")
+
+
+def registrar_uso(resposta) -> None:
+    """Conta os tokens de `resp.usage` (respostas de chat e chunk final de streaming)."""
+    uso = getattr(resposta, "usage", None)
+    if uso is None:
+        return
+    modelo = str(getattr(resposta, "model", "") or "")
+    for tipo in ("prompt_tokens", "completion_tokens"):
+        quantidade = int(getattr(uso, tipo, 0) or 0)
+        if quantidade:
+            tokens.inc(quantidade, tipo=tipo.replace("_tokens", ""), modelo=modelo)
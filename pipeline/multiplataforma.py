@@ -0,0 +1,134 @@
+"""Geração de conteúdo para várias plataformas a partir de uma única transcrição.
+
+A transcrição é condensada uma vez (ver `resumo_longo`) e as chamadas de
+`gerar_conteudo_social` de cada plataforma rodam em paralelo, com um pool
+limitado, de modo que a latência total fique perto de uma única geração.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Union
+
+from .resumo_longo import condensar, condensar_async
+
+PLATAFORMAS_VALIDAS = [
+    "Instagram", "TikTok", "YouTube Shorts", "LinkedIn", "Facebook", "X/Twitter", "Threads"
+]
+TAMANHOS_LEGENDA = ["curta", "média", "longa"]
+MAX_CONCORRENCIA = int(os.getenv("MULTIPLATAFORMA_MAX_CONCORRENCIA", str(len(PLATAFORMAS_VALIDAS))))
+
+Alvos = Dict[str, Dict[str, Any]]
+
+
+def _lista_plataformas(plataformas: Union[None, str, Iterable[str]]) -> list:
+    if plataformas is None:
+        return []
+    if isinstance(plataformas, str):
+        texto = plataformas.strip()
+        if texto.startswith("["):
+            return [str(p).strip() for p in json.loads(texto)]
+        return [p.strip() for p in texto.split(",") if p.strip()]
+    return [str(p).strip() for p in plataformas]
+
+
+def normalizar_alvos(
+    plataformas: Union[None, str, Iterable[str]] = None,
+    configuracoes: Union[None, str, Dict[str, Dict[str, Any]]] = None,
+    tom: str = "engajador",
+    tamanho_legenda: str = "média",
+    qtd_hashtags: int = 15,
+) -> Alvos:
+    """Monta {plataforma: {tom, tamanho_legenda, qtd_hashtags}}.
+
+    `plataformas` aceita lista, texto separado por vírgulas ou JSON; vazio
+    significa todas as `PLATAFORMAS_VALIDAS`. `configuracoes` (dict ou JSON)
+    sobrescreve os valores padrão por plataforma. Levanta ValueError para
+    plataformas desconhecidas.
+    """
+    if isinstance(configuracoes, str):
+        configuracoes = json.loads(configuracoes) if configuracoes.strip() else {}
+    configuracoes = configuracoes or {}
+    if not isinstance(configuracoes, dict):
+        raise ValueError("configuracoes deve ser um objeto {plataforma: {...}}.")
+    nomes = _lista_plataformas(plataformas) or list(PLATAFORMAS_VALIDAS)
+    desconhecidas = [p for p in list(nomes) + list(configuracoes) if p not in PLATAFORMAS_VALIDAS]
+    if desconhecidas:
+        raise ValueError(f"Plataformas inválidas: {', '.join(sorted(set(desconhecidas)))}.")
+    alvos: Alvos = {}
+    for nome in dict.fromkeys(nomes):
+        ajuste = configuracoes.get(nome) or {}
+        alvos[nome] = {
+            "tom": str(ajuste.get("tom", tom)),
+            "tamanho_legenda": str(ajuste.get("tamanho_legenda", tamanho_legenda)),
+            "qtd_hashtags": int(ajuste.get("qtd_hashtags", qtd_hashtags)),
+        }
+    return alvos
+
+
+def _somar(total: Dict[str, int], uso: Optional[Dict[str, int]]) -> None:
+    for campo, valor in (uso or {}).items():
+        total[campo] = total.get(campo, 0) + valor
+
+
+def _montar_resultado(conteudos: Dict[str, Dict[str, Any]], uso: Dict[str, int]) -> Dict[str, Any]:
+    for conteudo in conteudos.values():
+        _somar(uso, conteudo.pop("uso_tokens", None))
+    return {"conteudos": conteudos, "uso_tokens": uso}
+
+
+async def gerar_multiplataforma_async(
+    client,
+    transcricao: str,
+    alvos: Alvos,
+    gerar: Callable[..., Awaitable[Dict[str, Any]]],
+    max_concorrencia: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Retorna {"conteudos": {plataforma: conteúdo ou {"erro"}}, "uso_tokens": total}.
+
+    `gerar(texto, plataforma, tom, tamanho_legenda, qtd_hashtags, ja_condensado=...)`
+    é o `gerar_conteudo_social` assíncrono.
+    """
+    texto, uso = await condensar_async(client, transcricao.strip())
+    ja_condensado = uso["chamadas"] > 0
+    semaforo = asyncio.Semaphore(max_concorrencia or MAX_CONCORRENCIA)
+
+    async def _gerar(plataforma: str, ajuste: Dict[str, Any]) -> Dict[str, Any]:
+        async with semaforo:
+            try:
+                return await gerar(
+                    texto, plataforma, ajuste["tom"], ajuste["tamanho_legenda"], ajuste["qtd_hashtags"],
+                    ja_condensado=ja_condensado,
+                )
+            except Exception as e:
+                # Falha numa plataforma não derruba as outras
+                return {"erro": str(getattr(e, "detail", e))}
+
+    gerados = await asyncio.gather(*(_gerar(p, a) for p, a in alvos.items()))
+    return _montar_resultado(dict(zip(alvos, gerados)), uso)
+
+
+def gerar_multiplataforma(
+    client,
+    transcricao: str,
+    alvos: Alvos,
+    gerar: Callable[..., Dict[str, Any]],
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Versão síncrona (Streamlit) de `gerar_multiplataforma_async`, com threads."""
+    texto, uso = condensar(client, transcricao.strip())
+    ja_condensado = uso["chamadas"] > 0
+
+    def _gerar(item) -> Dict[str, Any]:
+        plataforma, ajuste = item
+        try:
+            return gerar(
+                texto, plataforma, ajuste["tom"], ajuste["tamanho_legenda"], ajuste["qtd_hashtags"],
+                ja_condensado=ja_condensado,
+            )
+        except Exception as e:
+            return {"erro": str(e)}
+
+    with ThreadPoolExecutor(max_workers=max_workers or MAX_CONCORRENCIA) as executor:
+        gerados = list(executor.map(_gerar, alvos.items()))
+    return _montar_resultado(dict(zip(alvos, gerados)), uso)
@@ -0,0 +1,342 @@
+"""Transcrição em partes para áudios acima do limite de 25 MB do Whisper.
+
+O áudio é cortado em trechos com sobreposição, preferindo cortar em silêncios
+detectados pelo FFmpeg. Os trechos são transcritos em paralelo e o texto é
+remontado na ordem original, removendo as palavras repetidas na sobreposição.
+"""
+import asyncio
+import os
+import re
+import subprocess
+import tempfile
+import threading
+from contextlib import nullcontext
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import AsyncContextManager, Callable, List, Optional, Tuple
+
+LIMITE_WHISPER_BYTES = 25 * 1024 * 1024
+DURACAO_PARTE_S = float(os.getenv("TRANSCRICAO_PARTE_SEGUNDOS", "600"))
+SOBREPOSICAO_S = float(os.getenv("TRANSCRICAO_SOBREPOSICAO_SEGUNDOS", "2"))
+JANELA_CORTE_S = float(os.getenv("TRANSCRICAO_JANELA_CORTE_SEGUNDOS", "60"))
+MAX_WORKERS = int(os.getenv("TRANSCRICAO_MAX_WORKERS", "4"))
+# Threads por processo FFmpeg; as vagas de extração (pipeline/admissao.py) dividem os núcleos por esse valor
+FFMPEG_THREADS = max(1, int(os.getenv("FFMPEG_THREADS", "1")))
+
+_RE_SILENCIO_INICIO = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_RE_SILENCIO_FIM = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+def _cmd_duracao(caminho: str) -> List[str]:
+    return [
+        "ffprobe", "-v", "error",
+        "-show_entries", "format=duration",
+        "-of", "default=noprint_wrappers=1:nokey=1",
+        caminho,
+    ]
+
+
+def _cmd_silencios(caminho: str, ruido_db: float, duracao_min: float) -> List[str]:
+    return [
+        "ffmpeg", "-hide_banner", "-nostats",
+        "-i", caminho,
+        "-af", f"silencedetect=noise={ruido_db}dB:d={duracao_min}",
+        "-threads", str(FFMPEG_THREADS),
+        "-f", "null", "-",
+    ]
+
+
+def _cmd_corte(origem: str, inicio: float, fim: float, destino: str) -> List[str]:
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-ss", f"{inicio:.3f}", "-t", f"{fim - inicio:.3f}",
+        "-i", origem,
+        "-vn", "-ac", "1", "-ar", "16000", "-b:a", "64k",
+        "-threads", str(FFMPEG_THREADS),
+        "-y", destino,
+    ]
+
+
+async def executar_async(
+    comando: List[str],
+    timeout: float,
+    ao_linha_stdout: Optional[Callable[[str], None]] = None,
+) -> Tuple[int, str, str]:
+    """Executa `comando` como subprocesso asyncio; mata o processo se cancelado ou no timeout.
+
+    Com `ao_linha_stdout`, cada linha do stdout é entregue assim que chega
+    (ex.: `-progress pipe:1` do FFmpeg) em vez de acumulada.
+    """
+    processo = await asyncio.create_subprocess_exec(
+        *comando,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+
+    async def _comunicar() -> Tuple[bytes, bytes]:
+        if ao_linha_stdout is None:
+            return await processo.communicate()
+        leitura_stderr = asyncio.ensure_future(processo.stderr.read())
+        try:
+            async for linha in processo.stdout:
+                ao_linha_stdout(linha.decode(errors="replace").strip())
+            stderr = await leitura_stderr
+        finally:
+            leitura_stderr.cancel()
+        await processo.wait()
+        return b"", stderr
+
+    try:
+        stdout, stderr = await asyncio.wait_for(_comunicar(), timeout)
+    except BaseException:
+        if processo.returncode is None:
+            processo.kill()
+            await processo.wait()
+        raise
+    return processo.returncode, stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+def duracao_midia(caminho: str) -> float:
+    """Retorna a duração (segundos) de um arquivo de mídia usando ffprobe."""
+    resultado = subprocess.run(_cmd_duracao(caminho), capture_output=True, text=True, timeout=120)
+    if resultado.returncode != 0:
+        raise RuntimeError(f"Erro ffprobe: {resultado.stderr.strip()}")
+    return float(resultado.stdout.strip())
+
+
+async def duracao_midia_async(caminho: str) -> float:
+    codigo, stdout, stderr = await executar_async(_cmd_duracao(caminho), 120)
+    if codigo != 0:
+        raise RuntimeError(f"Erro ffprobe: {stderr.strip()}")
+    return float(stdout.strip())
+
+
+def detectar_silencios(caminho: str, ruido_db: float = -35.0, duracao_min: float = 0.4) -> List[Tuple[float, float]]:
+    """Lista os intervalos (início, fim) de silêncio encontrados pelo filtro silencedetect."""
+    resultado = subprocess.run(
+        _cmd_silencios(caminho, ruido_db, duracao_min), capture_output=True, text=True, timeout=1800
+    )
+    return _ler_silencios(resultado.stderr)
+
+
+async def detectar_silencios_async(caminho: str, ruido_db: float = -35.0, duracao_min: float = 0.4) -> List[Tuple[float, float]]:
+    _, _, stderr = await executar_async(_cmd_silencios(caminho, ruido_db, duracao_min), 1800)
+    return _ler_silencios(stderr)
+
+
+def _ler_silencios(saida_ffmpeg: str) -> List[Tuple[float, float]]:
+    silencios: List[Tuple[float, float]] = []
+    inicio: Optional[float] = None
+    for linha in saida_ffmpeg.splitlines():
+        m = _RE_SILENCIO_INICIO.search(linha)
+        if m:
+            inicio = max(0.0, float(m.group(1)))
+            continue
+        m = _RE_SILENCIO_FIM.search(linha)
+        if m and inicio is not None:
+            silencios.append((inicio, float(m.group(1))))
+            inicio = None
+    return silencios
+
+
+def planejar_partes(
+    duracao: float,
+    silencios: List[Tuple[float, float]],
+    duracao_parte: float = DURACAO_PARTE_S,
+    sobreposicao: float = SOBREPOSICAO_S,
+    janela: float = JANELA_CORTE_S,
+) -> List[Tuple[float, float]]:
+    """Define os trechos (início, fim) a transcrever.
+
+    Cada corte é feito no meio do último silêncio dentro de `janela` segundos
+    antes do tamanho alvo; sem silêncio disponível, corta no tamanho alvo.
+    Cada trecho (exceto o primeiro) começa `sobreposicao` segundos antes do corte.
+    """
+    meios = sorted((s + e) / 2 for s, e in silencios)
+    cortes: List[float] = []
+    pos = 0.0
+    while duracao - pos > duracao_parte:
+        alvo = pos + duracao_parte
+        candidatos = [m for m in meios if max(pos + 1.0, alvo - janela) <= m <= alvo]
+        corte = candidatos[-1] if candidatos else alvo
+        cortes.append(corte)
+        pos = corte
+    limites = [0.0] + cortes + [duracao]
+    return [(max(0.0, a - sobreposicao) if i else 0.0, b) for i, (a, b) in enumerate(zip(limites, limites[1:]))]
+
+
+def cortar_parte(origem: str, inicio: float, fim: float, destino: str) -> None:
+    """Recorta um trecho do áudio em MP3 mono 16 kHz (bem abaixo do limite do Whisper)."""
+    resultado = subprocess.run(
+        _cmd_corte(origem, inicio, fim, destino), capture_output=True, text=True, timeout=1800
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"Erro FFmpeg ao cortar trecho: {resultado.stderr.strip()}")
+
+
+async def cortar_parte_async(origem: str, inicio: float, fim: float, destino: str) -> None:
+    codigo, _, stderr = await executar_async(_cmd_corte(origem, inicio, fim, destino), 1800)
+    if codigo != 0:
+        raise RuntimeError(f"Erro FFmpeg ao cortar trecho: {stderr.strip()}")
+
+
+def _normalizar_palavra(palavra: str) -> str:
+    return re.sub(r"[^\w]", "", palavra.lower())
+
+
+def juntar_sobreposicao(anterior: str, seguinte: str, max_palavras: int = 30) -> str:
+    """Remove do início de `seguinte` as palavras que repetem o final de `anterior`.
+
+    Procura a maior sequência (mínimo de 2 palavras) do fim do texto anterior
+    que reaparece no começo do seguinte, tolerando até 3 palavras cortadas
+    no início do trecho.
+    """
+    palavras_a = anterior.split()
+    palavras_b = seguinte.split()
+    norm_a = [_normalizar_palavra(p) for p in palavras_a[-max_palavras:]]
+    norm_b = [_normalizar_palavra(p) for p in palavras_b[:max_palavras + 3]]
+    for k in range(min(len(norm_a), max_palavras), 1, -1):
+        sufixo = norm_a[-k:]
+        if not any(sufixo):
+            continue
+        for deslocamento in range(0, 4):
+            if norm_b[deslocamento:deslocamento + k] == sufixo:
+                return " ".join(palavras_b[deslocamento + k:])
+    return seguinte
+
+
+def juntar_textos(textos: List[str]) -> str:
+    """Concatena as transcrições dos trechos, em ordem, sem as duplicatas da sobreposição."""
+    resultado = ""
+    for texto in textos:
+        texto = str(texto).strip()
+        if not texto:
+            continue
+        if resultado:
+            texto = juntar_sobreposicao(resultado, texto)
+            if texto:
+                resultado = f"{resultado} {texto}"
+        else:
+            resultado = texto
+    return resultado
+
+
+def precisa_particionar(caminho: str, duracao: Optional[float] = None) -> bool:
+    """Indica se o áudio deve ser dividido (acima de 25 MB ou mais longo que 1,5 trecho)."""
+    if os.path.getsize(caminho) > LIMITE_WHISPER_BYTES:
+        return True
+    return duracao is not None and duracao > DURACAO_PARTE_S * 1.5
+
+
+def transcrever_em_partes(
+    caminho_audio: str,
+    prompt: str,
+    transcrever: Callable,
+    max_workers: Optional[int] = None,
+) -> str:
+    """Transcreve `caminho_audio`, dividindo em trechos paralelos quando necessário.
+
+    `transcrever(arquivo, prompt)` é a função de transcrição de um único
+    arquivo aberto em modo binário (ex.: `transcreve_audio`).
+    """
+    try:
+        duracao: Optional[float] = duracao_midia(caminho_audio)
+    except (RuntimeError, ValueError, OSError):
+        duracao = None
+    if not precisa_particionar(caminho_audio, duracao):
+        with open(caminho_audio, "rb") as f:
+            return transcrever(f, prompt)
+    if duracao is None:
+        raise RuntimeError("Não foi possível obter a duração do áudio para dividi-lo em partes.")
+
+    partes = planejar_partes(duracao, detectar_silencios(caminho_audio))
+    # Depois da primeira falha nenhum trecho novo começa (cada um custa FFmpeg e uma chamada paga)
+    falhou = threading.Event()
+    with tempfile.TemporaryDirectory(dir=Path(caminho_audio).parent) as pasta:
+        def _processar(indice: int, inicio: float, fim: float) -> str:
+            if falhou.is_set():
+                raise RuntimeError("Transcrição interrompida: outro trecho falhou.")
+            try:
+                destino = str(Path(pasta) / f"parte_{indice:03d}.mp3")
+                cortar_parte(caminho_audio, inicio, fim, destino)
+                with open(destino, "rb") as f:
+                    return transcrever(f, prompt)
+            except BaseException:
+                falhou.set()
+                raise
+
+        # O `with` do executor espera os trechos já em andamento antes de a pasta ser removida
+        with ThreadPoolExecutor(max_workers=max_workers or MAX_WORKERS) as executor:
+            futuros = [executor.submit(_processar, i, inicio, fim) for i, (inicio, fim) in enumerate(partes)]
+            concluidos, _ = wait(futuros, return_when=FIRST_EXCEPTION)
+            erro = next((f.exception() for f in futuros if f in concluidos and f.exception()), None)
+            if erro is not None:
+                falhou.set()
+                for futuro in futuros:
+                    futuro.cancel()
+                raise erro
+            textos = [f.result() for f in futuros]
+    return juntar_textos(textos)
+
+
+async def transcrever_em_partes_async(
+    caminho_audio: str,
+    prompt: str,
+    transcrever: Callable,
+    max_concorrencia: Optional[int] = None,
+    ao_concluir_parte: Optional[Callable[[int, int, str], None]] = None,
+    vaga_extracao: Optional[Callable[[], AsyncContextManager[None]]] = None,
+) -> str:
+    """Versão asyncio de `transcrever_em_partes`.
+
+    `transcrever(arquivo, prompt)` deve ser uma corrotina; FFmpeg roda como
+    subprocesso asyncio e a concorrência é limitada por um semáforo.
+    `ao_concluir_parte(indice, total, texto)` é chamado a cada trecho
+    transcrito, na ordem em que terminam. `vaga_extracao()` (ex.: vaga de
+    admissão) é ocupada só enquanto o FFmpeg detecta silêncios ou corta um
+    trecho, e liberada antes da transcrição dele.
+    """
+    def _vaga():
+        return vaga_extracao() if vaga_extracao is not None else nullcontext()
+
+    def _avisar(indice: int, total: int, texto: str) -> None:
+        if ao_concluir_parte is not None:
+            ao_concluir_parte(indice, total, texto)
+
+    try:
+        duracao: Optional[float] = await duracao_midia_async(caminho_audio)
+    except (RuntimeError, ValueError, OSError):
+        duracao = None
+    if not precisa_particionar(caminho_audio, duracao):
+        with open(caminho_audio, "rb") as f:
+            texto = await transcrever(f, prompt)
+        _avisar(0, 1, str(texto))
+        return texto
+    if duracao is None:
+        raise RuntimeError("Não foi possível obter a duração do áudio para dividi-lo em partes.")
+
+    async with _vaga():
+        silencios = await detectar_silencios_async(caminho_audio)
+    partes = planejar_partes(duracao, silencios)
+    semaforo = asyncio.Semaphore(max_concorrencia or MAX_WORKERS)
+    with tempfile.TemporaryDirectory(dir=Path(caminho_audio).parent) as pasta:
+        async def _processar(indice: int, inicio: float, fim: float) -> str:
+            async with semaforo:
+                destino = str(Path(pasta) / f"parte_{indice:03d}.mp3")
+                async with _vaga():
+                    await cortar_parte_async(caminho_audio, inicio, fim, destino)
+                with open(destino, "rb") as f:
+                    texto = await transcrever(f, prompt)
+                _avisar(indice, len(partes), str(texto))
+                return texto
+
+        tarefas = [asyncio.ensure_future(_processar(i, inicio, fim)) for i, (inicio, fim) in enumerate(partes)]
+        try:
+            textos = await asyncio.gather(*tarefas)
+        finally:
+            # Um trecho falhou (ou o pedido foi cancelado): interrompe os outros, matando FFmpeg e
+            # chamadas em andamento, e espera que terminem antes de a pasta temporária sumir
+            for tarefa in tarefas:
+                tarefa.cancel()
+            await asyncio.gather(*tarefas, return_exceptions=True)
+    return juntar_textos(list(textos))
@@ -0,0 +1,220 @@
+"""Perfis de extração de áudio otimizados para fala, com cópia direta do codec.
+
+O Whisper reamostra tudo para 16 kHz mono, então extrair em 44,1 kHz estéreo
+a 192 kbps só aumenta o upload e o tempo de CPU. Quando o áudio de origem já
+está num codec aceito pela API, o stream é apenas remuxado (`-c:a copy`).
+"""
+import asyncio
+import json
+import os
+import shutil
+import subprocess
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .particionamento import FFMPEG_THREADS, LIMITE_WHISPER_BYTES, duracao_midia_async, executar_async
+
+PERFIS: Dict[str, Dict[str, Any]] = {
+    # Opus 24 kbps em Ogg: ~11 MB por hora de fala
+    "fala": {
+        "extensao": ".ogg",
+        "args": ["-ac", "1", "-ar", "16000", "-c:a", "libopus", "-b:a", "24k", "-application", "voip"],
+    },
+    # MP3 32 kbps: ~14 MB por hora, compatível com qualquer player
+    "fala_mp3": {
+        "extensao": ".mp3",
+        "args": ["-ac", "1", "-ar", "16000", "-c:a", "libmp3lame", "-b:a", "32k"],
+    },
+    # Configuração antiga do app.py (44,1 kHz, 192 kbps)
+    "compativel": {
+        "extensao": ".mp3",
+        "args": ["-c:a", "libmp3lame", "-b:a", "192k", "-ar", "44100"],
+    },
+}
+PERFIL_PADRAO = os.getenv("PERFIL_AUDIO", "fala_mp3")
+
+# Codecs aceitos pela API de transcrição e o contêiner usado no remux
+CODECS_ACEITOS = {"mp3": ".mp3", "aac": ".m4a", "opus": ".ogg", "vorbis": ".ogg", "flac": ".flac"}
+# Acima desse bitrate vale mais reencodar para fala do que copiar
+PASSTHROUGH_MAX_KBPS = int(os.getenv("PASSTHROUGH_MAX_KBPS", "160"))
+# Sem perda: só copia se o arquivo resultante couber num único envio à API
+CODECS_SEM_PERDA = {"flac"}
+
+MIME_POR_EXTENSAO = {
+    ".mp3": "audio/mpeg",
+    ".ogg": "audio/ogg",
+    ".m4a": "audio/mp4",
+    ".flac": "audio/flac",
+}
+
+
+def obter_perfil(nome: Optional[str] = None) -> Dict[str, Any]:
+    return PERFIS.get(nome or PERFIL_PADRAO, PERFIS["fala_mp3"])
+
+
+def _cmd_sonda(caminho: str) -> List[str]:
+    return [
+        "ffprobe", "-v", "error",
+        "-select_streams", "a:0",
+        "-show_entries", "stream=codec_name,bit_rate:format=duration,size,bit_rate",
+        "-of", "json",
+        caminho,
+    ]
+
+
+def ler_sonda(saida_json: str) -> Optional[Dict[str, Any]]:
+    """Stream de áudio com `formato` (duração, tamanho e bitrate do contêiner) anexado."""
+    try:
+        dados = json.loads(saida_json)
+        streams = dados.get("streams", [])
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    if not streams:
+        return None
+    return {**streams[0], "formato": dados.get("format") or {}}
+
+
+def _numero(valor: Any) -> float:
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def kbps_estimado(sonda: Dict[str, Any]) -> Optional[float]:
+    """Bitrate do stream de áudio; sem ele (comum em Opus/Vorbis/FLAC dentro de MKV/WebM),
+    o do contêiner, ou tamanho / duração. É um limite superior quando há vídeo junto.
+    None se nada disso estiver disponível."""
+    formato = sonda.get("formato") or {}
+    for bits in (_numero(sonda.get("bit_rate")), _numero(formato.get("bit_rate"))):
+        if bits > 0:
+            return bits / 1000
+    duracao, tamanho = _numero(formato.get("duration")), _numero(formato.get("size"))
+    if duracao > 0 and tamanho > 0:
+        return tamanho * 8 / duracao / 1000
+    return None
+
+
+def sondar_audio(caminho: str) -> Optional[Dict[str, Any]]:
+    """Retorna codec e bitrate do primeiro stream de áudio (ou None se não der para sondar)."""
+    try:
+        resultado = subprocess.run(_cmd_sonda(caminho), capture_output=True, text=True, timeout=120)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if resultado.returncode != 0:
+        return None
+    return ler_sonda(resultado.stdout)
+
+
+async def sondar_audio_async(caminho: str) -> Optional[Dict[str, Any]]:
+    try:
+        codigo, stdout, _ = await executar_async(_cmd_sonda(caminho), 120)
+    except (OSError, TimeoutError):
+        return None
+    return ler_sonda(stdout) if codigo == 0 else None
+
+
+def extensao_passthrough(sonda: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Extensão do contêiner para cópia direta, ou None se for preciso reencodar."""
+    if not sonda:
+        return None
+    codec = str(sonda.get("codec_name", ""))
+    extensao = CODECS_ACEITOS.get(codec)
+    if extensao is None:
+        return None
+    kbps = kbps_estimado(sonda)
+    # Bitrate desconhecido: reencodar é o seguro (copiar poderia gerar um envio enorme)
+    if kbps is None or kbps > PASSTHROUGH_MAX_KBPS:
+        return None
+    if codec in CODECS_SEM_PERDA:
+        duracao = _numero((sonda.get("formato") or {}).get("duration"))
+        if duracao <= 0 or kbps * 1000 / 8 * duracao > LIMITE_WHISPER_BYTES:
+            return None
+    return extensao
+
+
+def comando_extracao(
+    entrada: str,
+    saida_base: str,
+    perfil: Optional[str] = None,
+    sonda: Optional[Dict[str, Any]] = None,
+) -> Tuple[List[str], str]:
+    """Monta o comando FFmpeg e o caminho de saída (`saida_base` + extensão do perfil).
+
+    Com `sonda` indicando um codec aceito, copia o stream em vez de reencodar.
+    """
+    extensao = extensao_passthrough(sonda)
+    if extensao is not None:
+        args = ["-c:a", "copy"]
+    else:
+        dados = obter_perfil(perfil)
+        extensao = dados["extensao"]
+        args = dados["args"]
+    saida = f"{saida_base}{extensao}"
+    comando = [
+        "ffmpeg", "-hide_banner", "-nostats", "-i", entrada, "-vn", *args,
+        "-threads", str(FFMPEG_THREADS), "-y", saida,
+    ]
+    return comando, saida
+
+
+TIMEOUT_EXTRACAO_S = 1800
+_MSG_SEM_FFMPEG = "FFmpeg não encontrado no sistema"
+_MSG_TIMEOUT = "Timeout: Vídeo muito longo para processar (limite: 30 minutos)"
+
+
+def extrair_audio(entrada: str, saida_base: str, perfil: Optional[str] = None) -> Tuple[bool, str, str]:
+    """Extrai o áudio de `entrada`; retorna (sucesso, mensagem, caminho do áudio)."""
+    if not shutil.which("ffmpeg"):
+        return False, _MSG_SEM_FFMPEG, ""
+    comando, saida = comando_extracao(entrada, saida_base, perfil, sondar_audio(entrada))
+    try:
+        resultado = subprocess.run(comando, capture_output=True, text=True, timeout=TIMEOUT_EXTRACAO_S)
+    except subprocess.TimeoutExpired:
+        return False, _MSG_TIMEOUT, saida
+    except OSError as e:
+        return False, f"Erro inesperado: {str(e)}", saida
+    if resultado.returncode != 0:
+        return False, f"Erro FFmpeg: {resultado.stderr}", saida
+    return True, "Áudio extraído com sucesso", saida
+
+
+async def extrair_audio_async(
+    entrada: str,
+    saida_base: str,
+    ao_progresso: Optional[Callable[[float], None]] = None,
+    perfil: Optional[str] = None,
+) -> Tuple[bool, str, str]:
+    """Como `extrair_audio`, sem bloquear o event loop; `ao_progresso(fração)` acompanha o FFmpeg.
+
+    O subprocesso é encerrado se a tarefa for cancelada (ex.: cliente desconectou).
+    """
+    if not shutil.which("ffmpeg"):
+        return False, _MSG_SEM_FFMPEG, ""
+    sonda = await sondar_audio_async(entrada)
+    comando, saida = comando_extracao(entrada, saida_base, perfil, sonda)
+    ao_linha: Optional[Callable[[str], None]] = None
+    if ao_progresso is not None:
+        # -progress pipe:1 escreve "out_time_us=..." no stdout; convertido em fração da duração
+        comando = [comando[0], "-progress", "pipe:1", *comando[1:]]
+        try:
+            duracao = await duracao_midia_async(entrada)
+        except (RuntimeError, ValueError, OSError):
+            duracao = 0.0
+
+        def _ler_progresso(linha: str) -> None:
+            chave, _, valor = linha.partition("=")
+            if chave in ("out_time_us", "out_time_ms") and duracao > 0 and valor.isdigit():
+                ao_progresso(min(1.0, int(valor) / 1_000_000 / duracao))
+            elif chave == "progress" and valor == "end":
+                ao_progresso(1.0)
+
+        ao_linha = _ler_progresso
+    try:
+        codigo, _, stderr = await executar_async(comando, TIMEOUT_EXTRACAO_S, ao_linha)
+    except asyncio.TimeoutError:
+        return False, _MSG_TIMEOUT, saida
+    except OSError as e:
+        return False, f"Erro inesperado: {str(e)}", saida
+    if codigo != 0:
+        return False, f"Erro FFmpeg: {stderr}", saida
+    return True, "Áudio extraído com sucesso", saida
@@ -0,0 +1,154 @@
+"""Condensação map-reduce de transcrições longas antes da geração de conteúdo.
+
+Em vez de cortar a transcrição nos primeiros 8000 caracteres, o texto é
+dividido em blocos com orçamento de tokens, cada bloco é resumido em paralelo
+por um modelo barato (`OPENAI_RESUMO_MODEL`) e a geração de título, legenda e
+hashtags roda sobre a junção dos resumos. Se a junção ainda passar do limite
+(muitos blocos), ela é dividida e resumida de novo, em rodadas, até caber —
+nada é cortado. Cada rodada é concorrente, então a latência cresce com o
+logaritmo do tamanho da transcrição, não com o número de blocos.
+"""
+import asyncio
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from .limites import CARACTERES_POR_TOKEN, CATEGORIA_CONTEUDO, governador
+from .metricas import registrar_uso
+
+# Até esse tamanho a transcrição vai inteira para a geração de conteúdo
+LIMITE_DIRETO_CARACTERES = int(os.getenv("CONTEUDO_LIMITE_CARACTERES", "8000"))
+TOKENS_POR_BLOCO = int(os.getenv("RESUMO_TOKENS_POR_BLOCO", "3000"))
+MAX_CONCORRENCIA = int(os.getenv("RESUMO_MAX_CONCORRENCIA", "8"))
+MODELO_RESUMO = os.getenv("OPENAI_RESUMO_MODEL", "gpt-4o-mini")
+MIN_TOKENS_RESUMO = 120
+
+_RE_FIM_FRASE = re.compile(r"(?<=[.!?…])\s+")
+
+INSTRUCAO_RESUMO = (
+    "Você recebe um trecho de uma transcrição longa em pt-BR. "
+    "Resuma os pontos principais, exemplos marcantes, nomes e números citados, "
+    "em tópicos curtos e sem introdução. Não invente informações."
+)
+
+
+def precisa_condensar(texto: str, limite: int = LIMITE_DIRETO_CARACTERES) -> bool:
+    return len(texto) > limite
+
+
+def dividir_em_blocos(texto: str, tokens_por_bloco: int = TOKENS_POR_BLOCO) -> List[str]:
+    """Divide o texto em blocos de até `tokens_por_bloco`, quebrando em fim de frase."""
+    limite = tokens_por_bloco * CARACTERES_POR_TOKEN
+    blocos: List[str] = []
+    atual: List[str] = []
+    tamanho = 0
+    for frase in _RE_FIM_FRASE.split(texto.strip()):
+        # Frase sem pontuação maior que o bloco (ex.: transcrição sem pontos) é fatiada
+        pedacos = [frase[i:i + limite] for i in range(0, len(frase), limite)] or [""]
+        for pedaco in pedacos:
+            if atual and tamanho + len(pedaco) + 1 > limite:
+                blocos.append(" ".join(atual))
+                atual, tamanho = [], 0
+            atual.append(pedaco)
+            tamanho += len(pedaco) + 1
+    if atual:
+        blocos.append(" ".join(atual))
+    return [b for b in blocos if b.strip()]
+
+
+def tokens_por_resumo(total_blocos: int, limite: int = LIMITE_DIRETO_CARACTERES) -> int:
+    """Tamanho máximo de cada resumo para que a junção caiba no limite da geração final."""
+    return max(MIN_TOKENS_RESUMO, limite // CARACTERES_POR_TOKEN // max(1, total_blocos))
+
+
+def uso_zerado() -> Dict[str, int]:
+    return {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0, "chamadas": 0}
+
+
+def somar_uso(total: Dict[str, int], resposta: Any) -> Dict[str, int]:
+    """Acumula em `total` o `usage` de uma resposta (ou chunk final de streaming)."""
+    registrar_uso(resposta)
+    uso = getattr(resposta, "usage", None)
+    total["chamadas"] += 1
+    if uso is not None:
+        for campo in ("prompt_tokens", "completion_tokens", "total_tokens"):
+            total[campo] += int(getattr(uso, campo, 0) or 0)
+    return total
+
+
+def _parametros_resumo(bloco: str, indice: int, total: int) -> Dict[str, Any]:
+    return dict(
+        model=MODELO_RESUMO,
+        messages=[
+            {"role": "system", "content": INSTRUCAO_RESUMO},
+            {"role": "user", "content": f"Trecho {indice + 1} de {total}:\n{bloco}"},
+        ],
+        temperature=0.2,
+        max_tokens=tokens_por_resumo(total),
+    )
+
+
+def _texto_resposta(resposta: Any) -> str:
+    escolhas = getattr(resposta, "choices", None)
+    if not escolhas or not getattr(escolhas[0], "message", None):
+        return ""
+    return (escolhas[0].message.content or "").strip()
+
+
+def _juntar_resumos(resumos: List[str]) -> str:
+    total = len(resumos)
+    return "\n\n".join(f"[Parte {i + 1}/{total}]\n{r}" for i, r in enumerate(resumos) if r)
+
+
+def _encolheu(anterior: str, reduzido: str) -> bool:
+    """Uma rodada que não encolhe o texto não vai convergir; para em vez de repetir."""
+    return len(reduzido) < len(anterior)
+
+
+def condensar(client, texto: str, max_workers: Optional[int] = None) -> Tuple[str, Dict[str, int]]:
+    """Versão síncrona (Streamlit): retorna (texto para a geração final, uso de tokens)."""
+    uso = uso_zerado()
+    with ThreadPoolExecutor(max_workers=max_workers or MAX_CONCORRENCIA) as executor:
+        while precisa_condensar(texto):
+            blocos = dividir_em_blocos(texto)
+
+            def _resumir(indice_bloco: Tuple[int, str], total: int = len(blocos)) -> Any:
+                indice, bloco = indice_bloco
+                return governador.executar(
+                    client.chat.completions, CATEGORIA_CONTEUDO, **_parametros_resumo(bloco, indice, total)
+                )
+
+            respostas = list(executor.map(_resumir, enumerate(blocos)))
+            for resposta in respostas:
+                somar_uso(uso, resposta)
+            reduzido = _juntar_resumos([_texto_resposta(r) for r in respostas])
+            if not _encolheu(texto, reduzido):
+                break
+            texto = reduzido
+    return texto, uso
+
+
+async def condensar_async(
+    client, texto: str, max_concorrencia: Optional[int] = None
+) -> Tuple[str, Dict[str, int]]:
+    """Resume os blocos concorrentemente com o cliente assíncrono, em rodadas até caber."""
+    uso = uso_zerado()
+    semaforo = asyncio.Semaphore(max_concorrencia or MAX_CONCORRENCIA)
+
+    async def _resumir(indice: int, bloco: str, total: int) -> Any:
+        async with semaforo:
+            return await governador.executar_async(
+                client.chat.completions, CATEGORIA_CONTEUDO, **_parametros_resumo(bloco, indice, total)
+            )
+
+    while precisa_condensar(texto):
+        blocos = dividir_em_blocos(texto)
+        respostas = await asyncio.gather(*(_resumir(i, b, len(blocos)) for i, b in enumerate(blocos)))
+        for resposta in respostas:
+            somar_uso(uso, resposta)
+        reduzido = _juntar_resumos([_texto_resposta(r) for r in respostas])
+        if not _encolheu(texto, reduzido):
+            break
+        texto = reduzido
+    return texto, uso
@@ -0,0 +1,94 @@
+"""Dependências pesadas e clientes carregados só no primeiro uso.
+
+`openai`, `numpy` e `requests` somam boa parte do tempo de importação da API
+e do Streamlit, e nem todo processo usa os três (um worker que só atende
+cache não transcreve; o Streamlit não baixa URLs). Módulos e clientes daqui
+são proxies: o import (ou a criação do cliente) acontece no primeiro acesso
+a um atributo, uma única vez por processo, e o resto do código os usa como
+se fossem o objeto real.
+"""
+import importlib
+import os
+import threading
+from typing import Any, Callable, Optional, Union
+
+# Carregar as dependências numa thread logo após a inicialização: o servidor
+# já responde (health checks, páginas) e a primeira transcrição não paga o import
+PRE_CARREGAR = os.getenv("PRE_CARREGAR_DEPENDENCIAS", "1") == "1"
+
+
+class ModuloSobDemanda:
+    """`np = ModuloSobDemanda("numpy")`: importa no primeiro `np.algo`.
+
+    Anotações de tipo com o módulo (`np.ndarray`) precisam de
+    `from __future__ import annotations` para não forçar o import.
+    """
+
+    def __init__(self, nome: str) -> None:
+        self._nome = nome
+        self._modulo: Any = None
+        self._lock = threading.Lock()
+
+    def carregar(self) -> Any:
+        if self._modulo is None:
+            with self._lock:
+                if self._modulo is None:
+                    self._modulo = importlib.import_module(self._nome)
+        return self._modulo
+
+    @property
+    def carregado(self) -> bool:
+        return self._modulo is not None
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self.carregar(), nome)
+
+
+class ClienteSobDemanda:
+    """Cliente criado por `fabrica()` no primeiro acesso a um atributo.
+
+    `definir(cliente)` troca o cliente (benchmarks e scripts com a OpenAI
+    falsa); quem guardou o proxy passa a usar o novo cliente.
+    """
+
+    def __init__(self, fabrica: Callable[[], Any]) -> None:
+        self._fabrica = fabrica
+        self._cliente: Optional[Any] = None
+        self._lock = threading.Lock()
+
+    def obter(self) -> Any:
+        if self._cliente is None:
+            with self._lock:
+                if self._cliente is None:
+                    self._cliente = self._fabrica()
+        return self._cliente
+
+    def definir(self, cliente: Any) -> None:
+        with self._lock:
+            self._cliente = cliente
+
+    @property
+    def criado(self) -> bool:
+        return self._cliente is not None
+
+    def __getattr__(self, nome: str) -> Any:
+        return getattr(self.obter(), nome)
+
+
+openai = ModuloSobDemanda("openai")
+numpy = ModuloSobDemanda("numpy")
+requests = ModuloSobDemanda("requests")
+
+
+def pre_carregar(*itens: Union[ModuloSobDemanda, ClienteSobDemanda]) -> None:
+    """Carrega módulos e cria clientes agora; falhas ficam para o primeiro uso real relatar."""
+    for item in itens:
+        try:
+            item.carregar() if isinstance(item, ModuloSobDemanda) else item.obter()
+        except Exception:
+            pass
+
+
+# Retentativas ficam a cargo do governador (pipeline/limites.py), não do SDK
+openai_sync = ClienteSobDemanda(lambda: openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0))
+openai_async = ClienteSobDemanda(lambda: openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0))
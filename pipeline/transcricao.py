@@ -0,0 +1,308 @@
+"""Backends de transcrição: API da OpenAI ou motor local em CPU (faster-whisper int8).
+
+`TRANSCRICAO_BACKEND` escolhe o padrão ("openai" ou "local"); as rotas
+aceitam `backend` por requisição. Os dois expõem `transcrever(arquivo,
+prompt)` (síncrono, usado pelo Streamlit e por `transcrever_em_partes`) e
+`transcrever_async`, além de `modelo`, que entra na chave do cache.
+
+O motor local carrega o modelo CTranslate2 uma única vez por processo e o
+compartilha entre requisições. Trechos curtos (até uma janela do Whisper, 30 s)
+que chegam ao mesmo tempo são agrupados por alguns milissegundos e
+decodificados num único `generate` em lote; áudios mais longos passam por
+`WhisperModel.transcribe`, que percorre as janelas em sequência.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+from .limites import CATEGORIA_TRANSCRICAO, governador
+from .sob_demanda import numpy as np
+from .vad import TAXA_AMOSTRAGEM, decodificar_pcm
+
+BACKEND_PADRAO = os.getenv("TRANSCRICAO_BACKEND", "openai")
+MODELO_OPENAI = os.getenv("TRANSCRICAO_MODELO_OPENAI", "whisper-1")
+IDIOMA = "pt"
+# Motor local (faster-whisper): modelo, quantização e threads do CTranslate2
+MODELO_LOCAL = os.getenv("TRANSCRICAO_MODELO_LOCAL", "small")
+COMPUTE_TYPE_LOCAL = os.getenv("TRANSCRICAO_COMPUTE_TYPE", "int8")
+THREADS_LOCAL = int(os.getenv("TRANSCRICAO_LOCAL_THREADS", "0"))  # 0 = todos os núcleos
+WORKERS_LOCAL = int(os.getenv("TRANSCRICAO_LOCAL_WORKERS", "1"))
+BEAM_LOCAL = int(os.getenv("TRANSCRICAO_LOCAL_BEAM", "5"))
+# Micro-lotes de trechos curtos: tamanho máximo e quanto esperar por companhia
+LOTE_MAX = int(os.getenv("TRANSCRICAO_LOTE_MAX", "8"))
+LOTE_JANELA_S = float(os.getenv("TRANSCRICAO_LOTE_JANELA_MS", "25")) / 1000
+JANELA_WHISPER_S = 30
+# Tokens de prompt aceitos pelo Whisper (metade do contexto do decoder)
+MAX_TOKENS_PROMPT = 223
+MAX_TOKENS_SAIDA = 448
+
+
+class ErroTranscricao(RuntimeError):
+    """Backend inválido ou indisponível; `status` é o código HTTP sugerido."""
+
+    def __init__(self, mensagem: str, status: int = 400) -> None:
+        super().__init__(mensagem)
+        self.status = status
+
+
+class BackendOpenAI:
+    """Transcrição pela API (`whisper-1`), com fila e retentativas do governador."""
+
+    nome = "openai"
+
+    def __init__(self, cliente: Any, modelo: str = MODELO_OPENAI, idioma: str = IDIOMA) -> None:
+        self.cliente = cliente
+        self.modelo = modelo
+        self.idioma = idioma
+
+    def _parametros(self, arquivo, prompt: str) -> Dict[str, Any]:
+        return {
+            "model": self.modelo, "file": arquivo, "language": self.idioma,
+            "response_format": "text", "prompt": prompt,
+        }
+
+    def transcrever(self, arquivo, prompt: str = "") -> str:
+        """Cliente síncrono (`openai.OpenAI`)."""
+        return governador.executar(
+            self.cliente.audio.transcriptions, CATEGORIA_TRANSCRICAO, **self._parametros(arquivo, prompt)
+        )
+
+    async def transcrever_async(self, arquivo, prompt: str = "") -> str:
+        """Cliente assíncrono (`openai.AsyncOpenAI`)."""
+        return await governador.executar_async(
+            self.cliente.audio.transcriptions, CATEGORIA_TRANSCRICAO, **self._parametros(arquivo, prompt)
+        )
+
+
+def _audio_float(arquivo) -> np.ndarray:
+    """PCM 16 kHz mono em float32 a partir do arquivo aberto (usa o caminho em `.name`)."""
+    caminho = getattr(arquivo, "name", None)
+    if not isinstance(caminho, str) or not os.path.exists(caminho):
+        raise ErroTranscricao("O backend local precisa de um arquivo em disco.")
+    return decodificar_pcm(caminho).astype(np.float32) / 32768.0
+
+
+class MotorLocal:
+    """Modelo faster-whisper carregado sob demanda e compartilhado, com micro-lotes."""
+
+    def __init__(
+        self,
+        modelo: str = MODELO_LOCAL,
+        compute_type: str = COMPUTE_TYPE_LOCAL,
+        threads: int = THREADS_LOCAL,
+        workers: int = WORKERS_LOCAL,
+        lote_max: int = LOTE_MAX,
+        janela_s: float = LOTE_JANELA_S,
+        idioma: str = IDIOMA,
+    ) -> None:
+        self.nome_modelo = modelo
+        self.compute_type = compute_type
+        self.threads = threads
+        self.workers = workers
+        self.lote_max = max(1, lote_max)
+        self.janela_s = janela_s
+        self.idioma = idioma
+        self._lock = threading.Lock()
+        # Só serializa a carga (download + leitura do modelo, que leva minutos na
+        # primeira vez); estatísticas e lotes usam `_lock` e não esperam por ela
+        self._carga = threading.Lock()
+        self._modelo = None
+        self._tokenizer = None
+        self._pedidos: "queue.Queue[Tuple[np.ndarray, str, Future]]" = queue.Queue()
+        self._thread_lotes: Optional[threading.Thread] = None
+        self._stats = {"trechos_curtos": 0, "lotes": 0, "maior_lote": 0, "audios_longos": 0}
+
+    @property
+    def modelo(self) -> str:
+        return f"faster-whisper/{self.nome_modelo}-{self.compute_type}"
+
+    def carregar(self):
+        """Carrega o modelo na primeira chamada (download na primeira execução)."""
+        if self._modelo is not None:
+            return self._modelo
+        with self._carga:
+            if self._modelo is None:
+                try:
+                    from faster_whisper import WhisperModel
+                    from faster_whisper.tokenizer import Tokenizer
+                except ImportError:
+                    raise ErroTranscricao(
+                        "Backend local indisponível: instale o pacote faster-whisper.", status=503
+                    )
+                modelo = WhisperModel(
+                    self.nome_modelo,
+                    device="cpu",
+                    compute_type=self.compute_type,
+                    cpu_threads=self.threads,
+                    num_workers=self.workers,
+                )
+                self._tokenizer = Tokenizer(
+                    modelo.hf_tokenizer,
+                    modelo.model.is_multilingual,
+                    task="transcribe",
+                    language=self.idioma,
+                )
+                # Publicado por último: quem vê o modelo já encontra o tokenizer
+                self._modelo = modelo
+            return self._modelo
+
+    # --- Trechos longos ---------------------------------------------------------
+
+    def _transcrever_longo(self, audio: np.ndarray, prompt: str) -> str:
+        segmentos, _ = self.carregar().transcribe(
+            audio,
+            language=self.idioma,
+            initial_prompt=prompt or None,
+            beam_size=BEAM_LOCAL,
+            # O VAD do pipeline (pipeline/vad.py) já removeu os silêncios
+            vad_filter=False,
+        )
+        with self._lock:
+            self._stats["audios_longos"] += 1
+        return " ".join(s.text.strip() for s in segmentos).strip()
+
+    # --- Micro-lotes de trechos curtos ---------------------------------------------
+
+    def _tokens_iniciais(self, prompt: str) -> List[int]:
+        tokenizer = self._tokenizer
+        iniciais: List[int] = []
+        if prompt.strip():
+            tokens_prompt = tokenizer.encode(" " + prompt.strip())[-MAX_TOKENS_PROMPT:]
+            iniciais = [tokenizer.sot_prev, *tokens_prompt]
+        return iniciais + list(tokenizer.sot_sequence) + [tokenizer.no_timestamps]
+
+    def _caracteristicas(self, audio: np.ndarray) -> np.ndarray:
+        extrator = self._modelo.feature_extractor
+        mel = extrator(audio)
+        quadros = extrator.nb_max_frames
+        if mel.shape[-1] >= quadros:
+            return mel[:, :quadros]
+        return np.pad(mel, ((0, 0), (0, quadros - mel.shape[-1])))
+
+    def _gerar_lote(self, audios: List[np.ndarray], prompt: str) -> List[str]:
+        """Um único `generate` do CTranslate2 para vários trechos de até 30 s."""
+        import ctranslate2
+
+        modelo = self.carregar()
+        caracteristicas = np.ascontiguousarray(np.stack([self._caracteristicas(a) for a in audios]), np.float32)
+        iniciais = self._tokens_iniciais(prompt)
+        resultados = modelo.model.generate(
+            ctranslate2.StorageView.from_array(caracteristicas),
+            [iniciais] * len(audios),
+            beam_size=BEAM_LOCAL,
+            max_length=MAX_TOKENS_SAIDA,
+            suppress_blank=True,
+        )
+        fim = self._tokenizer.eot
+        return [
+            self._tokenizer.decode([t for t in r.sequences_ids[0] if t < fim]).strip() for r in resultados
+        ]
+
+    def _laco_lotes(self) -> None:
+        while True:
+            pedidos = [self._pedidos.get()]
+            prazo = time.monotonic() + self.janela_s
+            while len(pedidos) < self.lote_max:
+                try:
+                    pedidos.append(self._pedidos.get(timeout=max(0.0, prazo - time.monotonic())))
+                except queue.Empty:
+                    break
+            # Prompts diferentes não podem dividir o mesmo lote (o prompt vai nos tokens iniciais)
+            grupos: Dict[str, List[Tuple[np.ndarray, str, Future]]] = {}
+            for pedido in pedidos:
+                grupos.setdefault(pedido[1], []).append(pedido)
+            for prompt, grupo in grupos.items():
+                ativos = [p for p in grupo if p[2].set_running_or_notify_cancel()]
+                if not ativos:
+                    continue
+                try:
+                    textos = self._gerar_lote([p[0] for p in ativos], prompt)
+                except BaseException as e:
+                    for _, _, futuro in ativos:
+                        futuro.set_exception(e)
+                    continue
+                with self._lock:
+                    self._stats["trechos_curtos"] += len(ativos)
+                    self._stats["lotes"] += 1
+                    self._stats["maior_lote"] = max(self._stats["maior_lote"], len(ativos))
+                for (_, _, futuro), texto in zip(ativos, textos):
+                    futuro.set_result(texto)
+
+    def _enfileirar(self, audio: np.ndarray, prompt: str) -> Future:
+        self.carregar()
+        with self._lock:
+            if self._thread_lotes is None:
+                self._thread_lotes = threading.Thread(target=self._laco_lotes, name="lotes-whisper", daemon=True)
+                self._thread_lotes.start()
+        futuro: Future = Future()
+        self._pedidos.put((audio, prompt, futuro))
+        return futuro
+
+    def _e_curto(self, audio: np.ndarray) -> bool:
+        return self.lote_max > 1 and len(audio) <= JANELA_WHISPER_S * TAXA_AMOSTRAGEM
+
+    def transcrever(self, arquivo, prompt: str = "") -> str:
+        audio = _audio_float(arquivo)
+        if self._e_curto(audio):
+            return self._enfileirar(audio, prompt).result()
+        return self._transcrever_longo(audio, prompt)
+
+    async def transcrever_async(self, arquivo, prompt: str = "") -> str:
+        audio = await asyncio.to_thread(_audio_float, arquivo)
+        if self._e_curto(audio):
+            futuro = await asyncio.to_thread(self._enfileirar, audio, prompt)
+            return await asyncio.wrap_future(futuro)
+        return await asyncio.to_thread(self._transcrever_longo, audio, prompt)
+
+    def estatisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "modelo": self.modelo,
+                "carregado": self._modelo is not None,
+                "carregando": self._carga.locked(),
+                **self._stats,
+            }
+
+
+class BackendLocal:
+    """Adaptador do motor local compartilhado para a interface dos backends."""
+
+    nome = "local"
+
+    def __init__(self, motor: "MotorLocal") -> None:
+        self.motor = motor
+
+    @property
+    def modelo(self) -> str:
+        return self.motor.modelo
+
+    def transcrever(self, arquivo, prompt: str = "") -> str:
+        return self.motor.transcrever(arquivo, prompt)
+
+    async def transcrever_async(self, arquivo, prompt: str = "") -> str:
+        return await self.motor.transcrever_async(arquivo, prompt)
+
+
+# Um único motor por processo: o modelo ocupa centenas de MB
+motor_local = MotorLocal()
+
+BACKENDS_VALIDOS = ("openai", "local")
+
+
+def criar_backends(cliente_openai: Any) -> Dict[str, Any]:
+    """Backends disponíveis; `cliente_openai` pode ser o cliente síncrono ou o assíncrono."""
+    return {"openai": BackendOpenAI(cliente_openai), "local": BackendLocal(motor_local)}
+
+
+def escolher(backends: Dict[str, Any], nome: Optional[str] = None):
+    """Backend pedido (vazio = `TRANSCRICAO_BACKEND`); ErroTranscricao (400) se não existir."""
+    nome = (nome or BACKEND_PADRAO).strip().lower()
+    if nome not in backends:
+        raise ErroTranscricao(f"Backend de transcrição inválido: {nome}. Use um de: {', '.join(BACKENDS_VALIDOS)}.")
+    return backends[nome]
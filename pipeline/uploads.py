@@ -0,0 +1,255 @@
+"""Upload retomável em partes para arquivos de centenas de MB.
+
+O cliente cria o upload (nome e tamanho), envia as partes numeradas em
+qualquer ordem e em paralelo, cada uma com o SHA-256 do seu conteúdo, e
+consulta quais partes já chegaram para retomar após uma falha. As partes são
+gravadas direto na posição final de um único arquivo (sem pré-alocar: o
+espaço só é ocupado quando os bytes chegam); ao finalizar, esse arquivo é
+movido (rename, sem cópia) para a pasta do job.
+"""
+import hashlib
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+TAMANHO_PARTE = int(os.getenv("UPLOAD_PARTE_MB", "8")) * 1024 * 1024
+MAX_BYTES = int(os.getenv("UPLOAD_MAX_MB", "1024")) * 1024 * 1024
+# Uploads não finalizados são descartados depois desse tempo
+TTL_SEGUNDOS = float(os.getenv("UPLOAD_TTL_HORAS", "24")) * 3600
+EXTENSOES_ACEITAS = {".mp4", ".mov", ".avi", ".mkv", ".webm", ".mp3", ".wav", ".m4a", ".ogg"}
+# Formato de uuid4().hex; o id vira nome de pasta, então nada fora disso chega ao disco
+_RE_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+def id_valido(upload_id: str) -> bool:
+    return bool(_RE_ID.match(upload_id))
+
+
+class ErroUpload(RuntimeError):
+    """Falha no protocolo de upload; `status` é o código HTTP sugerido."""
+
+    def __init__(self, mensagem: str, status: int = 400) -> None:
+        super().__init__(mensagem)
+        self.status = status
+
+
+class RepositorioUploads:
+    """Uploads em andamento (SQLite) e seus arquivos em `pasta/<id>/dados`."""
+
+    def __init__(self, pasta: Path, tamanho_parte: int = TAMANHO_PARTE, max_bytes: int = MAX_BYTES) -> None:
+        self.pasta = Path(pasta)
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self.tamanho_parte = tamanho_parte
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        with self._conectar() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS uploads (
+                    id TEXT PRIMARY KEY,
+                    nome TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    tamanho_parte INTEGER NOT NULL,
+                    sha256 TEXT,
+                    criado REAL NOT NULL,
+                    atualizado REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS partes (
+                    upload_id TEXT NOT NULL,
+                    indice INTEGER NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    sha256 TEXT NOT NULL,
+                    PRIMARY KEY (upload_id, indice)
+                );
+                """
+            )
+
+    def _conectar(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.pasta / "uploads.db", timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def caminho_dados(self, upload_id: str) -> Path:
+        if not id_valido(upload_id):
+            raise ErroUpload("Upload não encontrado.", status=404)
+        return self.pasta / upload_id / "dados"
+
+    def criar(self, nome: str, tamanho: int, sha256: Optional[str] = None) -> Dict[str, Any]:
+        extensao = Path(nome).suffix.lower()
+        if extensao not in EXTENSOES_ACEITAS:
+            raise ErroUpload("Formato não suportado.")
+        if tamanho <= 0:
+            raise ErroUpload("Tamanho inválido.")
+        if tamanho > self.max_bytes:
+            raise ErroUpload(f"Arquivo maior que {self.max_bytes // (1024 * 1024)} MB.", status=413)
+        upload_id = uuid.uuid4().hex
+        dados = self.caminho_dados(upload_id)
+        dados.parent.mkdir(parents=True)
+        dados.touch()
+        agora = time.time()
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT INTO uploads (id, nome, tamanho, tamanho_parte, sha256, criado, atualizado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (upload_id, nome, tamanho, self.tamanho_parte, sha256.lower() if sha256 else None, agora, agora),
+            )
+        return self.obter(upload_id)
+
+    def obter(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Estado do upload: partes recebidas e `offset` (bytes contíguos desde o início)."""
+        if not id_valido(upload_id):
+            return None
+        with self._conectar() as conn:
+            linha = conn.execute("SELECT * FROM uploads WHERE id = ?", (upload_id,)).fetchone()
+            if linha is None:
+                return None
+            partes = conn.execute(
+                "SELECT indice, tamanho FROM partes WHERE upload_id = ? ORDER BY indice", (upload_id,)
+            ).fetchall()
+        upload = dict(linha)
+        upload["total_partes"] = -(-upload["tamanho"] // upload["tamanho_parte"])
+        upload["recebidas"] = [p["indice"] for p in partes]
+        upload["bytes_recebidos"] = sum(p["tamanho"] for p in partes)
+        offset = 0
+        for esperado, parte in enumerate(partes):
+            if parte["indice"] != esperado:
+                break
+            offset += parte["tamanho"]
+        upload["offset"] = offset
+        return upload
+
+    def _tamanho_esperado(self, upload: Dict[str, Any], indice: int) -> int:
+        if not 0 <= indice < upload["total_partes"]:
+            raise ErroUpload(f"Parte {indice} fora do intervalo (0 a {upload['total_partes'] - 1}).")
+        inicio = indice * upload["tamanho_parte"]
+        return min(upload["tamanho_parte"], upload["tamanho"] - inicio)
+
+    def abrir_parte(self, upload_id: str, indice: int) -> "GravacaoParte":
+        """Começa a receber a parte em blocos; reenviar a mesma parte a sobrescreve.
+
+        A parte deixa de constar como recebida até `concluir` conferir a nova
+        cópia: um reenvio com defeito não deixa dados ruins marcados como bons.
+        """
+        upload = self.obter(upload_id)
+        if upload is None:
+            raise ErroUpload("Upload não encontrado.", status=404)
+        esperado = self._tamanho_esperado(upload, indice)
+        with self._lock, self._conectar() as conn:
+            conn.execute("DELETE FROM partes WHERE upload_id = ? AND indice = ?", (upload_id, indice))
+        return GravacaoParte(self, upload_id, indice, indice * upload["tamanho_parte"], esperado)
+
+    def _registrar_parte(self, upload_id: str, indice: int, tamanho: int, sha256: str) -> None:
+        with self._lock, self._conectar() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO partes (upload_id, indice, tamanho, sha256) VALUES (?, ?, ?, ?)",
+                (upload_id, indice, tamanho, sha256),
+            )
+            conn.execute("UPDATE uploads SET atualizado = ? WHERE id = ?", (time.time(), upload_id))
+
+    def gravar_parte(self, upload_id: str, indice: int, dados: bytes, sha256: Optional[str]) -> Dict[str, Any]:
+        """Grava uma parte já inteira em memória (scripts e testes)."""
+        gravacao = self.abrir_parte(upload_id, indice)
+        try:
+            gravacao.escrever(dados)
+        except BaseException:
+            gravacao.descartar()
+            raise
+        return gravacao.concluir(sha256)
+
+    def verificar(self, upload_id: str) -> Dict[str, Any]:
+        """Retorna o upload se todas as partes chegaram; senão levanta ErroUpload (404/409)."""
+        upload = self.obter(upload_id)
+        if upload is None:
+            raise ErroUpload("Upload não encontrado.", status=404)
+        faltando = sorted(set(range(upload["total_partes"])) - set(upload["recebidas"]))
+        if faltando:
+            raise ErroUpload(f"Faltam {len(faltando)} partes (primeira: {faltando[0]}).", status=409)
+        return upload
+
+    def concluir(self, upload_id: str, destino: Path, hasher: "hashlib._Hash") -> Path:
+        """Confere as partes, calcula o hash completo e move o arquivo para `destino` + extensão."""
+        upload = self.verificar(upload_id)
+        dados = self.caminho_dados(upload_id)
+        # Leitura única para o hash do cache de transcrições; o arquivo em si não é copiado
+        with open(dados, "rb") as f:
+            while bloco := f.read(1024 * 1024):
+                hasher.update(bloco)
+        if upload["sha256"] and upload["sha256"] != hasher.hexdigest():
+            raise ErroUpload("Checksum do arquivo completo não confere.", status=422)
+        caminho = Path(str(destino) + Path(upload["nome"]).suffix.lower())
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(dados, caminho)
+        self.remover(upload_id)
+        return caminho
+
+    def remover(self, upload_id: str) -> bool:
+        if not id_valido(upload_id):
+            return False
+        with self._lock, self._conectar() as conn:
+            apagados = conn.execute("DELETE FROM uploads WHERE id = ?", (upload_id,)).rowcount
+            conn.execute("DELETE FROM partes WHERE upload_id = ?", (upload_id,))
+        if not apagados:
+            return False
+        shutil.rmtree(self.caminho_dados(upload_id).parent, ignore_errors=True)
+        return True
+
+    def expirar(self, ttl: float = TTL_SEGUNDOS) -> List[str]:
+        """Remove uploads sem atividade há mais de `ttl` segundos; retorna os ids removidos."""
+        with self._conectar() as conn:
+            ids = [
+                linha["id"]
+                for linha in conn.execute(
+                    "SELECT id FROM uploads WHERE atualizado < ?", (time.time() - ttl,)
+                ).fetchall()
+            ]
+        for upload_id in ids:
+            self.remover(upload_id)
+        return ids
+
+
+class GravacaoParte:
+    """Parte recebida em blocos, gravada direto na posição final do arquivo do upload.
+
+    O SHA-256 é calculado conforme os blocos chegam; `concluir` confere
+    tamanho e checksum e só então registra a parte. Sem `concluir`, chame
+    `descartar`.
+    """
+
+    def __init__(self, repositorio: RepositorioUploads, upload_id: str, indice: int, inicio: int, esperado: int) -> None:
+        self._repositorio = repositorio
+        self.upload_id = upload_id
+        self.indice = indice
+        self.esperado = esperado
+        self.recebidos = 0
+        self._inicio = inicio
+        self._hasher = hashlib.sha256()
+        self._fd: Optional[int] = os.open(repositorio.caminho_dados(upload_id), os.O_WRONLY)
+
+    def escrever(self, dados: bytes) -> None:
+        if self.recebidos + len(dados) > self.esperado:
+            raise ErroUpload(f"Parte {self.indice} maior que o esperado ({self.esperado} bytes).", status=413)
+        os.pwrite(self._fd, dados, self._inicio + self.recebidos)
+        self._hasher.update(dados)
+        self.recebidos += len(dados)
+
+    def descartar(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def concluir(self, sha256: Optional[str]) -> Dict[str, Any]:
+        """Confere a parte recebida e a registra; levanta ErroUpload (400/422) se não bater."""
+        self.descartar()
+        if self.recebidos != self.esperado:
+            raise ErroUpload(f"Parte {self.indice} com {self.recebidos} bytes; esperado {self.esperado}.")
+        calculado = self._hasher.hexdigest()
+        if sha256 and sha256.lower() != calculado:
+            raise ErroUpload(f"Checksum da parte {self.indice} não confere.", status=422)
+        self._repositorio._registrar_parte(self.upload_id, self.indice, self.recebidos, calculado)
+        return {"indice": self.indice, "tamanho": self.recebidos, "sha256": calculado}
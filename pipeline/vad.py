@@ -0,0 +1,407 @@
+"""Remoção local de silêncios (VAD por energia) antes de enviar o áudio ao Whisper.
+
+O áudio é decodificado para PCM 16 kHz mono, a energia de cada quadro de 30 ms
+é calculada com NumPy e os trechos silenciosos mais longos que
+`VAD_SILENCIO_MIN_S` são cortados (mantendo uma margem em volta da fala).
+O mapa de offsets permite converter tempos do áudio aparado para a mídia original.
+
+O PCM nunca fica inteiro na memória: a saída do FFmpeg é lida em blocos de
+tamanho fixo, primeiro para medir a energia (só um número por quadro fica
+guardado) e depois, numa segunda decodificação, para repassar ao encoder
+apenas os trechos com fala à medida que passam.
+"""
+from __future__ import annotations
+
+import asyncio
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .particionamento import FFMPEG_THREADS
+from .perfis_audio import obter_perfil
+from .sob_demanda import numpy as np
+
+TAXA_AMOSTRAGEM = 16000
+QUADRO_MS = 30
+VAD_ATIVO = os.getenv("VAD_ATIVO", "1") == "1"
+SILENCIO_MIN_S = float(os.getenv("VAD_SILENCIO_MIN_S", "1.0"))
+MARGEM_S = float(os.getenv("VAD_MARGEM_S", "0.25"))
+LIMIAR_DB = float(os.getenv("VAD_LIMIAR_DB", "-45"))
+# Abaixo dessa fração removida não compensa reencodar o áudio
+FRACAO_MINIMA = 0.02
+# Preço do whisper-1 por minuto (USD), usado só para estimar a economia
+PRECO_WHISPER_MINUTO = 0.006
+# Bytes lidos do FFmpeg por vez (~32 s de PCM 16 kHz mono)
+TAMANHO_BLOCO = 1024 * 1024
+TIMEOUT_S = 1800
+
+MapaOffsets = List[Tuple[float, float, float]]
+
+
+def decodificar_pcm(caminho: str, taxa: int = TAXA_AMOSTRAGEM) -> np.ndarray:
+    """Decodifica qualquer mídia para PCM int16 mono via FFmpeg."""
+    resultado = subprocess.run(
+        [
+            "ffmpeg", "-hide_banner", "-loglevel", "error",
+            "-i", caminho,
+            "-vn", "-ac", "1", "-ar", str(taxa), "-threads", str(FFMPEG_THREADS), "-f", "s16le", "pipe:1",
+        ],
+        capture_output=True,
+        timeout=1800,
+    )
+    if resultado.returncode != 0:
+        raise RuntimeError(f"Erro FFmpeg ao decodificar áudio: {resultado.stderr.decode(errors='replace')}")
+    return np.frombuffer(resultado.stdout, dtype=np.int16)
+
+
+def energia_db(amostras: np.ndarray, tamanho_quadro: int, bloco: int = 8192) -> np.ndarray:
+    """Energia RMS (dBFS) por quadro, processando blocos de quadros para limitar memória."""
+    n_quadros = len(amostras) // tamanho_quadro
+    quadros = amostras[: n_quadros * tamanho_quadro].reshape(n_quadros, tamanho_quadro)
+    saida = np.empty(n_quadros, dtype=np.float32)
+    for inicio in range(0, n_quadros, bloco):
+        parte = quadros[inicio:inicio + bloco].astype(np.float32) / 32768.0
+        rms = np.sqrt(np.mean(parte * parte, axis=1))
+        saida[inicio:inicio + bloco] = 20.0 * np.log10(rms + 1e-10)
+    return saida
+
+
+def quadros_com_fala(db: np.ndarray, limiar_db: float = LIMIAR_DB) -> np.ndarray:
+    """Marca quadros com fala; o limiar sobe para 10 dB acima do piso de ruído quando necessário."""
+    if db.size == 0:
+        return np.zeros(0, dtype=bool)
+    piso_ruido = float(np.percentile(db, 10))
+    return db > max(limiar_db, piso_ruido + 10.0)
+
+
+def trechos_mantidos(
+    fala: np.ndarray,
+    quadro_s: float,
+    duracao: float,
+    silencio_min_s: float = SILENCIO_MIN_S,
+    margem_s: float = MARGEM_S,
+) -> List[Tuple[float, float]]:
+    """Converte a máscara de fala em trechos (início, fim) a manter, em segundos."""
+    silencio = ~fala
+    bordas = np.diff(np.concatenate(([0], silencio.astype(np.int8), [0])))
+    inicios = np.flatnonzero(bordas == 1) * quadro_s
+    fins = np.flatnonzero(bordas == -1) * quadro_s
+    longos = (fins - inicios) >= silencio_min_s
+    cortes_ini = inicios[longos] + margem_s
+    cortes_fim = fins[longos] - margem_s
+    # Silêncio no começo/fim do arquivo pode ser removido sem margem
+    if cortes_ini.size and inicios[longos][0] == 0:
+        cortes_ini[0] = 0.0
+    if cortes_fim.size and fins[longos][-1] >= len(fala) * quadro_s:
+        cortes_fim[-1] = duracao
+    validos = cortes_fim > cortes_ini
+    cortes = list(zip(cortes_ini[validos].tolist(), cortes_fim[validos].tolist()))
+
+    mantidos: List[Tuple[float, float]] = []
+    pos = 0.0
+    for ini, fim in cortes:
+        if ini > pos:
+            mantidos.append((pos, ini))
+        pos = fim
+    if pos < duracao:
+        mantidos.append((pos, duracao))
+    return mantidos
+
+
+def mapa_offsets(trechos: List[Tuple[float, float]]) -> MapaOffsets:
+    """Lista (início no áudio aparado, início na mídia original, duração) de cada trecho mantido."""
+    mapa: MapaOffsets = []
+    acumulado = 0.0
+    for ini, fim in trechos:
+        mapa.append((round(acumulado, 3), round(ini, 3), round(fim - ini, 3)))
+        acumulado += fim - ini
+    return mapa
+
+
+def mapear_tempo(t: float, mapa: MapaOffsets) -> float:
+    """Converte um tempo do áudio aparado para o tempo correspondente na mídia original."""
+    for inicio_cortado, inicio_original, duracao in mapa:
+        if t < inicio_cortado + duracao:
+            return inicio_original + max(0.0, t - inicio_cortado)
+    if not mapa:
+        return t
+    inicio_cortado, inicio_original, duracao = mapa[-1]
+    return inicio_original + (t - inicio_cortado)
+
+
+def _cmd_decodificar(caminho: str, taxa: int) -> List[str]:
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-i", caminho,
+        "-vn", "-ac", "1", "-ar", str(taxa), "-threads", str(FFMPEG_THREADS), "-f", "s16le", "pipe:1",
+    ]
+
+
+def _cmd_codificar(saida: str, perfil: Optional[str], taxa: int) -> List[str]:
+    return [
+        "ffmpeg", "-hide_banner", "-loglevel", "error",
+        "-f", "s16le", "-ac", "1", "-ar", str(taxa), "-i", "pipe:0",
+        *obter_perfil(perfil)["args"], "-threads", str(FFMPEG_THREADS), "-y", saida,
+    ]
+
+
+class _MedidorEnergia:
+    """Recebe o PCM em blocos de qualquer tamanho e guarda só a energia de cada quadro completo."""
+
+    def __init__(self, tamanho_quadro: int) -> None:
+        self.tamanho_quadro = tamanho_quadro
+        self.bytes_recebidos = 0
+        self._resto = b""
+        self._energias: List[np.ndarray] = []
+
+    def alimentar(self, dados: bytes) -> None:
+        self.bytes_recebidos += len(dados)
+        buffer = self._resto + dados if self._resto else dados
+        completos = len(buffer) // (self.tamanho_quadro * 2) * self.tamanho_quadro * 2
+        if completos:
+            amostras = np.frombuffer(buffer, dtype=np.int16, count=completos // 2)
+            self._energias.append(energia_db(amostras, self.tamanho_quadro))
+        self._resto = buffer[completos:]
+
+    def db(self) -> np.ndarray:
+        return np.concatenate(self._energias) if self._energias else np.zeros(0, dtype=np.float32)
+
+
+class _Recortador:
+    """Devolve, de cada bloco de PCM que passa, só os bytes dentro dos trechos mantidos."""
+
+    def __init__(self, trechos: List[Tuple[float, float]], taxa: int) -> None:
+        # Offsets em bytes, sempre no início de uma amostra int16
+        self._trechos = [(int(ini * taxa) * 2, int(fim * taxa) * 2) for ini, fim in trechos]
+        self._indice = 0
+        self._posicao = 0
+
+    def alimentar(self, dados: bytes) -> bytes:
+        inicio, fim = self._posicao, self._posicao + len(dados)
+        self._posicao = fim
+        visao = memoryview(dados)
+        partes = []
+        while self._indice < len(self._trechos):
+            a, b = self._trechos[self._indice]
+            if a >= fim:
+                break
+            if b > inicio:
+                partes.append(visao[max(a, inicio) - inicio:min(b, fim) - inicio])
+            if b > fim:
+                break
+            self._indice += 1
+        return b"".join(partes)
+
+
+def _matar(*processos: subprocess.Popen) -> None:
+    for processo in processos:
+        if processo.poll() is None:
+            processo.kill()
+
+
+def _decodificar_em_blocos(caminho: str, taxa: int, ao_bloco: Callable[[bytes], None], *outros: subprocess.Popen) -> None:
+    """Decodifica `caminho` entregando o PCM em blocos a `ao_bloco`; mata tudo no timeout ou em erro."""
+    processo = subprocess.Popen(_cmd_decodificar(caminho, taxa), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    prazo = threading.Timer(TIMEOUT_S, _matar, (processo, *outros))
+    prazo.start()
+    try:
+        for bloco in iter(lambda: processo.stdout.read(TAMANHO_BLOCO), b""):
+            ao_bloco(bloco)
+        erro = processo.stderr.read()
+        processo.wait()
+    except BaseException:
+        _matar(processo, *outros)
+        processo.wait()
+        raise
+    finally:
+        prazo.cancel()
+        processo.stdout.close()
+        processo.stderr.close()
+    if processo.returncode != 0:
+        raise RuntimeError(f"Erro FFmpeg ao decodificar áudio: {erro.decode(errors='replace')}")
+
+
+def _medir_energia(caminho: str, tamanho_quadro: int, taxa: int) -> _MedidorEnergia:
+    medidor = _MedidorEnergia(tamanho_quadro)
+    _decodificar_em_blocos(caminho, taxa, medidor.alimentar)
+    return medidor
+
+
+def _gravar_trechos(
+    caminho: str, trechos: List[Tuple[float, float]], saida_base: str, perfil: Optional[str], taxa: int
+) -> str:
+    saida = f"{saida_base}{obter_perfil(perfil)['extensao']}"
+    recortador = _Recortador(trechos, taxa)
+    codificador = subprocess.Popen(
+        _cmd_codificar(saida, perfil, taxa), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        _decodificar_em_blocos(
+            caminho, taxa, lambda bloco: codificador.stdin.write(recortador.alimentar(bloco)), codificador
+        )
+        codificador.stdin.close()
+        erro = codificador.stderr.read()
+        codificador.wait(timeout=TIMEOUT_S)
+    except BaseException:
+        _matar(codificador)
+        codificador.wait()
+        raise
+    finally:
+        codificador.stderr.close()
+    if codificador.returncode != 0:
+        raise RuntimeError(f"Erro FFmpeg ao codificar áudio aparado: {erro.decode(errors='replace')}")
+    return saida
+
+
+async def _decodificar_em_blocos_async(
+    caminho: str, taxa: int, ao_bloco: Callable[[bytes], Awaitable[None]]
+) -> None:
+    """Como `_decodificar_em_blocos`, com subprocesso asyncio: cancelar mata o FFmpeg."""
+    processo = await asyncio.create_subprocess_exec(
+        *_cmd_decodificar(caminho, taxa), stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    leitura_erro = asyncio.ensure_future(processo.stderr.read())
+    try:
+        while True:
+            bloco = await processo.stdout.read(TAMANHO_BLOCO)
+            if not bloco:
+                break
+            await ao_bloco(bloco)
+        erro = await leitura_erro
+        await processo.wait()
+    except BaseException:
+        leitura_erro.cancel()
+        if processo.returncode is None:
+            processo.kill()
+            await processo.wait()
+        raise
+    if processo.returncode != 0:
+        raise RuntimeError(f"Erro FFmpeg ao decodificar áudio: {erro.decode(errors='replace')}")
+
+
+async def _medir_energia_async(caminho: str, tamanho_quadro: int, taxa: int) -> _MedidorEnergia:
+    medidor = _MedidorEnergia(tamanho_quadro)
+
+    async def _alimentar(bloco: bytes) -> None:
+        medidor.alimentar(bloco)
+
+    await _decodificar_em_blocos_async(caminho, taxa, _alimentar)
+    return medidor
+
+
+async def _gravar_trechos_async(
+    caminho: str, trechos: List[Tuple[float, float]], saida_base: str, perfil: Optional[str], taxa: int
+) -> str:
+    saida = f"{saida_base}{obter_perfil(perfil)['extensao']}"
+    recortador = _Recortador(trechos, taxa)
+    codificador = await asyncio.create_subprocess_exec(
+        *_cmd_codificar(saida, perfil, taxa),
+        stdin=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+    )
+    leitura_erro = asyncio.ensure_future(codificador.stderr.read())
+
+    async def _repassar(bloco: bytes) -> None:
+        dados = recortador.alimentar(bloco)
+        if dados:
+            codificador.stdin.write(dados)
+            await codificador.stdin.drain()
+
+    try:
+        await _decodificar_em_blocos_async(caminho, taxa, _repassar)
+        codificador.stdin.close()
+        erro = await leitura_erro
+        await codificador.wait()
+    except BaseException:
+        leitura_erro.cancel()
+        if codificador.returncode is None:
+            codificador.kill()
+            await codificador.wait()
+        raise
+    if codificador.returncode != 0:
+        raise RuntimeError(f"Erro FFmpeg ao codificar áudio aparado: {erro.decode(errors='replace')}")
+    return saida
+
+
+def _analisar(
+    caminho: str, medidor: _MedidorEnergia, taxa: int
+) -> Tuple[float, List[Tuple[float, float]], Dict[str, Any]]:
+    """Trechos a manter e as estatísticas de quando nada é aplicado."""
+    duracao = medidor.bytes_recebidos // 2 / taxa
+    fala = quadros_com_fala(medidor.db())
+    trechos = trechos_mantidos(fala, QUADRO_MS / 1000, duracao)
+    estatisticas: Dict[str, Any] = {
+        "caminho": caminho,
+        "aplicado": False,
+        "duracao_original_s": round(duracao, 3),
+        "duracao_final_s": round(duracao, 3),
+        "segundos_removidos": 0.0,
+        "fracao_removida": 0.0,
+        "mapa_offsets": [(0.0, 0.0, round(duracao, 3))],
+    }
+    return duracao, trechos, estatisticas
+
+
+def _vale_aparar(duracao: float, trechos: List[Tuple[float, float]]) -> bool:
+    removidos = duracao - sum(fim - ini for ini, fim in trechos)
+    return duracao > 0 and bool(trechos) and removidos / duracao >= FRACAO_MINIMA
+
+
+def _finalizar(
+    estatisticas: Dict[str, Any], duracao: float, trechos: List[Tuple[float, float]], saida: Optional[str], inicio: float
+) -> Dict[str, Any]:
+    if saida is not None:
+        duracao_final = sum(fim - ini for ini, fim in trechos)
+        removidos = duracao - duracao_final
+        estatisticas.update(
+            caminho=saida,
+            aplicado=True,
+            duracao_final_s=round(duracao_final, 3),
+            segundos_removidos=round(removidos, 3),
+            fracao_removida=round(removidos / duracao, 4),
+            mapa_offsets=mapa_offsets(trechos),
+        )
+    estatisticas["custo_economizado_usd"] = round(estatisticas["segundos_removidos"] / 60 * PRECO_WHISPER_MINUTO, 5)
+    estatisticas["tempo_vad_s"] = round(time.perf_counter() - inicio, 3)
+    return estatisticas
+
+
+def aparar_silencios(caminho: str, saida_base: str, perfil: Optional[str] = None) -> Dict[str, Any]:
+    """Remove silêncios longos de `caminho` e retorna o novo arquivo e as estatísticas.
+
+    Se quase nada for removido (ou o VAD estiver desligado), retorna o arquivo
+    original sem reencodar.
+    """
+    inicio = time.perf_counter()
+    if not VAD_ATIVO:
+        return {"caminho": caminho, "aplicado": False}
+    tamanho_quadro = TAXA_AMOSTRAGEM * QUADRO_MS // 1000
+    medidor = _medir_energia(caminho, tamanho_quadro, TAXA_AMOSTRAGEM)
+    duracao, trechos, estatisticas = _analisar(caminho, medidor, TAXA_AMOSTRAGEM)
+    saida = None
+    if _vale_aparar(duracao, trechos):
+        saida = _gravar_trechos(caminho, trechos, saida_base, perfil, TAXA_AMOSTRAGEM)
+    return _finalizar(estatisticas, duracao, trechos, saida, inicio)
+
+
+async def aparar_silencios_async(caminho: str, saida_base: str, perfil: Optional[str] = None) -> Dict[str, Any]:
+    """Versão asyncio de `aparar_silencios`: cancelar a tarefa (job cancelado, cliente que
+    desconectou) mata os FFmpeg em andamento."""
+    inicio = time.perf_counter()
+    if not VAD_ATIVO:
+        return {"caminho": caminho, "aplicado": False}
+    tamanho_quadro = TAXA_AMOSTRAGEM * QUADRO_MS // 1000
+
+    async def _aparar() -> Dict[str, Any]:
+        medidor = await _medir_energia_async(caminho, tamanho_quadro, TAXA_AMOSTRAGEM)
+        duracao, trechos, estatisticas = _analisar(caminho, medidor, TAXA_AMOSTRAGEM)
+        saida = None
+        if _vale_aparar(duracao, trechos):
+            saida = await _gravar_trechos_async(caminho, trechos, saida_base, perfil, TAXA_AMOSTRAGEM)
+        return _finalizar(estatisticas, duracao, trechos, saida, inicio)
+
+    try:
+        return await asyncio.wait_for(_aparar(), TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise RuntimeError(f"VAD excedeu {TIMEOUT_S:.0f} s.")
@@ -0,0 +1,103 @@
+"""Pool de variantes de conteúdo social pré-geradas.
+
+Uma única chamada ao modelo pede várias candidatas (`n` choices); as que não
+forem exibidas ficam guardadas por (hash da transcrição, plataforma, tom,
+tamanho da legenda, qtd de hashtags). "Regenerar" retira a próxima variante
+não usada e, quando o pool fica baixo, um novo lote é gerado em segundo plano.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+VARIANTES_POR_CHAMADA = int(os.getenv("VARIANTES_POR_CHAMADA", "3"))
+# Reabastece quando restarem até essa quantidade de variantes
+VARIANTES_MINIMO = int(os.getenv("VARIANTES_MINIMO", "1"))
+# Quantidade de combinações (transcrição + ajustes) mantidas em memória
+MAX_CHAVES = int(os.getenv("VARIANTES_MAX_CHAVES", "64"))
+
+ChaveVariantes = Tuple[str, str, str, str, int]
+Gerador = Callable[[], List[Dict[str, Any]]]
+
+
+class PoolVariantes:
+    """Pool em memória, seguro entre threads, com reabastecimento em segundo plano."""
+
+    def __init__(
+        self,
+        minimo: int = VARIANTES_MINIMO,
+        max_chaves: int = MAX_CHAVES,
+        max_workers: int = 2,
+    ) -> None:
+        self.minimo = minimo
+        self.max_chaves = max_chaves
+        self._lock = threading.Lock()
+        self._variantes: "OrderedDict[ChaveVariantes, Deque[Dict[str, Any]]]" = OrderedDict()
+        self._reabastecendo: Dict[ChaveVariantes, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="variantes")
+
+    @staticmethod
+    def chave(
+        transcricao: str, plataforma: str, tom: str, tamanho_legenda: str, qtd_hashtags: int
+    ) -> ChaveVariantes:
+        hash_transcricao = hashlib.sha256(transcricao.strip().encode("utf-8")).hexdigest()
+        return (hash_transcricao, plataforma, tom, tamanho_legenda, int(qtd_hashtags))
+
+    def tamanho(self, chave: ChaveVariantes) -> int:
+        with self._lock:
+            return len(self._variantes.get(chave, ()))
+
+    def adicionar(self, chave: ChaveVariantes, variantes: List[Dict[str, Any]]) -> None:
+        with self._lock:
+            fila = self._variantes.setdefault(chave, deque())
+            fila.extend(variantes)
+            self._variantes.move_to_end(chave)
+            while len(self._variantes) > self.max_chaves:
+                self._variantes.popitem(last=False)
+
+    def retirar(self, chave: ChaveVariantes) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            fila = self._variantes.get(chave)
+            if not fila:
+                return None
+            self._variantes.move_to_end(chave)
+            return fila.popleft()
+
+    def reabastecer(self, chave: ChaveVariantes, gerar: Gerador) -> Optional[Future]:
+        """Agenda um novo lote se o pool estiver baixo e não houver outro em andamento."""
+        with self._lock:
+            if len(self._variantes.get(chave, ())) > self.minimo or chave in self._reabastecendo:
+                return None
+            futuro = self._executor.submit(self._gerar_lote, chave, gerar)
+            self._reabastecendo[chave] = futuro
+            return futuro
+
+    def _gerar_lote(self, chave: ChaveVariantes, gerar: Gerador) -> None:
+        try:
+            # Falhas no lote em segundo plano são ignoradas: a próxima retirada gera na hora
+            self.adicionar(chave, gerar())
+        finally:
+            with self._lock:
+                self._reabastecendo.pop(chave, None)
+
+    def obter(self, chave: ChaveVariantes, gerar: Gerador) -> Dict[str, Any]:
+        """Retira a próxima variante; se o pool estiver vazio, gera um lote na hora.
+
+        Em seguida agenda o reabastecimento em segundo plano quando necessário.
+        """
+        variante = self.retirar(chave)
+        if variante is None:
+            with self._lock:
+                futuro = self._reabastecendo.get(chave)
+            if futuro is not None:
+                # Lote já em andamento: esperar por ele sai mais barato que pedir outro
+                futuro.exception()
+                variante = self.retirar(chave)
+        if variante is None:
+            lote = gerar()
+            variante, resto = lote[0], lote[1:]
+            self.adicionar(chave, resto)
+        self.reabastecer(chave, gerar)
+        return variante
@@ -0,0 +1,40 @@
+"""A página inicial continua respondendo rápido com transcrições em andamento.
+
+Versão reduzida de `benchmarks/latencia_concorrente.py`, com a mesma OpenAI
+falsa em memória: se algum passo síncrono voltar a bloquear o event loop, o
+p50 de `/` sob carga dispara e o teste falha.
+"""
+import asyncio
+import os
+import statistics
+
+os.environ.setdefault("OPENAI_API_KEY", "teste")
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from benchmarks.latencia_concorrente import _cliente_falso, _latencias_home, _transcrever  # noqa: E402
+
+TRANSCRICOES = 4
+LATENCIA_API_S = 0.5
+LIMITE_P50_MS = 50.0
+
+
+async def _medir():
+    main.client.definir(_cliente_falso(LATENCIA_API_S))
+    transporte = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transporte, base_url="http://teste") as http:
+        ocioso = await _latencias_home(http, 10, 0.01)
+        tarefas = [asyncio.create_task(_transcrever(http, 1)) for _ in range(TRANSCRICOES)]
+        await asyncio.sleep(0.05)
+        sob_carga = await _latencias_home(http, 20, 0.02)
+        pendentes = sum(not tarefa.done() for tarefa in tarefas)
+        await asyncio.gather(*tarefas)
+    return statistics.median(ocioso), statistics.median(sob_carga), pendentes
+
+
+def test_p50_da_home_com_transcricoes_concorrentes():
+    p50_ocioso, p50_carga, pendentes = asyncio.run(_medir())
+    # As medições precisam ter acontecido com as transcrições de fato em andamento
+    assert pendentes > 0
+    assert p50_carga <= max(LIMITE_P50_MS, p50_ocioso * 5), (p50_ocioso, p50_carga)